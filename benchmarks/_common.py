@@ -0,0 +1,46 @@
+# pylint: disable=C
+"""Shared helpers for todol's benchmarks"""
+import datetime
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+WORDS = (
+    "buy milk call mom pay invoice standup review code fix bug write docs "
+    "clean room book flight renew passport water plants email team"
+).split()
+
+
+def make_todos(amount, seed=0):
+    """Generate `amount` plausible todo dictionaries"""
+    rng = random.Random(seed)
+    start = datetime.date.today().toordinal()
+    return [
+        {
+            "todo": " ".join(rng.choices(WORDS, k=rng.randint(2, 6))) + f" #{number}",
+            "due_date": datetime.date.fromordinal(
+                start + rng.randrange(-60, 365)
+            ).isoformat(),
+        }
+        for number in range(amount)
+    ]
+
+
+def best_of(func, repeat=5):
+    """The best wall time of `repeat` calls to `func`, in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def report(name, seconds, baseline=None):
+    line = f"{name:<40} {seconds * 1000:>10.2f} ms"
+    if baseline:
+        line += f" ({baseline / seconds:.2f}x)"
+    print(line)
@@ -0,0 +1,58 @@
+# pylint: disable=C
+"""500 concurrent adds to 10k todos: a write per add vs coalesced async writes"""
+import asyncio
+import tempfile
+from pathlib import Path
+
+from _common import best_of, make_todos, report
+
+from todol import _generations, _store, aio
+
+AMOUNT = 10_000
+REQUESTS = 500
+
+
+def main():
+    directory = Path(tempfile.mkdtemp())
+    index = _store.index_path(directory)
+    todos = make_todos(AMOUNT)
+
+    def reset():
+        _store.write(index, {"todos": list(todos), "finished": []})
+
+    def sequential():
+        # What each request would do on its own, like the command line
+        reset()
+        for number in range(REQUESTS):
+            with _store.lock(index):
+                current = _store.read(index)
+                new_todo = {"todo": f"request {number}", "due_date": "2021-01-01"}
+                current["todos"].append(new_todo)
+                _store.write(index, current, [("add", "todos", new_todo)])
+
+    def coalesced():
+        reset()
+        store = aio.Store(directory)
+
+        async def requests():
+            await asyncio.gather(
+                *(
+                    store.add(f"request {number}", "2021-01-01")
+                    for number in range(REQUESTS)
+                )
+            )
+
+        loop = asyncio.new_event_loop()
+        first = _generations.current(index)
+        loop.run_until_complete(requests())
+        loop.close()
+        return _generations.current(index) - first
+
+    sequential_time = best_of(sequential, 1)
+    report("a write per add", sequential_time)
+    report("coalesced", best_of(coalesced, 3), sequential_time)
+    print(f"{coalesced()} write(s) for {REQUESTS} adds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# pylint: disable=C
+"""Finding duplicates of a new todo among 100k: LSH buckets vs fuzzy scan"""
+import tempfile
+from pathlib import Path
+
+from _common import best_of, make_todos, report
+
+from todol import _dedupe, _store, _utils, todo_objects
+
+AMOUNT = 100_000
+GROUPED = 5_000
+
+
+def main():
+    todos = make_todos(AMOUNT)
+    name = todos[AMOUNT // 2]["todo"] + "!"
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, "todos.json")
+        _store.write(path, {"todos": todos, "finished": []})
+        container = todo_objects.TodoContainer(todos)
+
+        def scan():
+            return [todo for todo in container if _utils.fuzzy_match(todo.name, name)]
+
+        scan_time = best_of(scan, 3)
+        report("fuzzy scan", scan_time)
+        report("build index", best_of(lambda: _dedupe.rebuild(path, todos), 1))
+        report(
+            "lsh lookup",
+            best_of(lambda: _dedupe.duplicates(path, name)),
+            scan_time,
+        )
+        print(f"{len(_dedupe.duplicates(path, name))} duplicates found")
+
+        # The generated names share few words, so buckets are unusually full
+        _store.write(path, {"todos": todos[:GROUPED], "finished": []})
+        _dedupe.rebuild(path, todos[:GROUPED])
+        report(f"groups of {GROUPED}", best_of(lambda: _dedupe.groups(path), 1))
+
+
+if __name__ == "__main__":
+    main()
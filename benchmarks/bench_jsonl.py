@@ -0,0 +1,36 @@
+# pylint: disable=C
+"""Writing 100k todos as JSON lines: json.dumps per line vs chunked writes"""
+import json
+import os
+
+from _common import best_of, make_todos, report
+
+from todol import _jsonl, todo_objects
+
+AMOUNT = 100_000
+
+
+def main():
+    container = todo_objects.TodoContainer(make_todos(AMOUNT))
+
+    # Line buffered like stdout on a terminal: every line is a write(2)
+    output = open(os.devnull, "w", buffering=1)
+
+    def per_line():
+        for todo in container:
+            print(json.dumps({"section": "todos", **todo.data}), file=output)
+
+    def chunked():
+        return _jsonl.write(
+            ({"section": "todos", **todo.data} for todo in container), output
+        )
+
+    line_time = best_of(per_line, 3)
+    report("json.dumps per line", line_time)
+    report("chunked", best_of(chunked, 3), line_time)
+    print(f"{chunked()} lines")
+    output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# pylint: disable=C
+"""Reading the first 20 active todos of a 100k item index"""
+import itertools
+import tempfile
+from pathlib import Path
+
+from _common import best_of, make_todos, report
+
+from todol import _mmap_index, _store
+
+AMOUNT = 100_000
+SHOWN = 20
+
+
+def main():
+    index = {"todos": make_todos(AMOUNT), "finished": make_todos(AMOUNT, seed=1)}
+    with tempfile.TemporaryDirectory() as directory:
+        path = _store.index_path(Path(directory), "json")
+        _store.write(path, index)
+
+        def full():
+            return list(itertools.islice(_store.read_containers(path)["todos"], SHOWN))
+
+        def mapped():
+            with _mmap_index.open_for(path) as todos:
+                return list(itertools.islice(todos["todos"], SHOWN))
+
+        assert [todo.data for todo in full()] == [todo.data for todo in mapped()]
+        full_time = best_of(full)
+        report(f"first {SHOWN} (full JSON load)", full_time)
+        report(f"first {SHOWN} (mmap sidecar)", best_of(mapped), full_time)
+
+
+if __name__ == "__main__":
+    main()
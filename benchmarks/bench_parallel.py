@@ -0,0 +1,29 @@
+# pylint: disable=C
+"""Fuzzy matching 50k names with a large limit: serial vs a process pool"""
+import os
+
+from _common import best_of, make_todos, report
+
+from todol import _parallel, todo_objects
+
+AMOUNT = 50_000
+QUERY = "no todo is called anything like this"  # Scans every name
+LIMIT = 12
+
+
+def main():
+    container = todo_objects.TodoContainer(make_todos(AMOUNT))
+    names = [name for name, _ in container._indexed_todos]  # pylint: disable=W0212
+
+    os.environ["TODOL_FUZZY_WORKERS"] = "0"
+    serial = best_of(lambda: container.get(QUERY, fuzzy_limit=LIMIT), 1)
+    report(f"serial ({len(names)} names)", serial)
+    for count in sorted({2, 4, os.cpu_count() or 1}):
+        _parallel.first_match(names[:10], QUERY, LIMIT, count)  # Start the pool
+        seconds = best_of(lambda: _parallel.first_match(names, QUERY, LIMIT, count), 1)
+        report(f"{count} processes", seconds, serial)
+        print(f"{'':<40} {serial / seconds / count:>10.2f} speedup per process")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# pylint: disable=C
+"""Searching a 100k item history: inverted index vs scanning every todo"""
+import tempfile
+from pathlib import Path
+
+from _common import best_of, make_todos, report
+
+from todol import _search, _store
+
+AMOUNT = 100_000
+QUERY = "renew passport"
+
+
+def main():
+    index = {"todos": make_todos(AMOUNT // 10), "finished": make_todos(AMOUNT, seed=1)}
+    with tempfile.TemporaryDirectory() as directory:
+        path = _store.index_path(Path(directory), "json")
+        _store.write(path, index)
+
+        def scan():
+            words = _search.tokenize(QUERY)
+            return [
+                data
+                for _, data in _store.iter_data(path)
+                if all(
+                    any(
+                        token.startswith(word)
+                        for token in _search.tokenize(data["todo"])
+                    )
+                    for word in words
+                )
+            ]
+
+        def indexed():
+            return [data for _, data in _search.search(path, QUERY)]
+
+        report(
+            "build index",
+            best_of(lambda: _search.rebuild(path, _store.iter_data(path)), 1),
+        )
+        assert scan() == indexed()
+        scan_time = best_of(scan, 3)
+        report(f"{QUERY!r} (scan)", scan_time)
+        report(f"{QUERY!r} (inverted index)", best_of(indexed), scan_time)
+        print(f"{len(indexed())} matches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# pylint: disable=C
+"""Cold load of a 100k item index: JSON vs binary snapshot"""
+import tempfile
+from pathlib import Path
+
+from _common import best_of, make_todos, report
+
+from todol import _store
+
+AMOUNT = 100_000
+
+
+def main():
+    index = {"todos": make_todos(AMOUNT), "finished": make_todos(AMOUNT, seed=1)}
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = _store.index_path(Path(directory), "json")
+        snap_path = _store.index_path(Path(directory), "snapshot")
+        print(f"JSON: {_store.write(json_path, index)} bytes")
+        print(f"Snapshot: {_store.write(snap_path, index)} bytes")
+
+        json_time = best_of(lambda: _store.read(json_path))
+        report("read (JSON)", json_time)
+        report("read (snapshot)", best_of(lambda: _store.read(snap_path)), json_time)
+
+        json_time = best_of(lambda: _store.read_containers(json_path))
+        report("read_containers (JSON)", json_time)
+        report(
+            "read_containers (snapshot)",
+            best_of(lambda: _store.read_containers(snap_path)),
+            json_time,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# pylint: disable=C
+"""Completion statistics of 200k finished todos: scanning vs the aggregates"""
+import datetime
+import random
+import tempfile
+from pathlib import Path
+
+from _common import best_of, make_todos, report
+
+from todol import _stats, _store
+
+AMOUNT = 200_000
+
+
+def main():
+    rng = random.Random(0)
+    today = datetime.date.today()
+    finished = make_todos(AMOUNT)
+    for data in finished:
+        data[_stats.FINISHED_ON] = str(today - datetime.timedelta(rng.randrange(1000)))
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, "todos.json")
+        _store.write(path, {"todos": [], "finished": finished})
+
+        def scan():
+            return _stats.Aggregates.scan(
+                data for _, data in _store.iter_data(path)
+            ).totals
+
+        scan_time = best_of(scan, 3)
+        report("scan finished todos", scan_time)
+        report("rebuild", best_of(lambda: _stats.rebuild(path, finished), 3))
+        report(
+            "summary from aggregates",
+            best_of(lambda: _stats.summary(path, days=7, weeks=4)),
+            scan_time,
+        )
+        print(f"{_stats.summary(path).finished} finished todos counted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# pylint: disable=C
+"""Listing 50k todos: a print per line vs a table rendered in one write"""
+import os
+
+from _common import best_of, make_todos, report
+
+from todol import _table, todo_objects
+
+AMOUNT = 50_000
+COLUMNS = 100
+
+
+def main():
+    container = todo_objects.TodoContainer(make_todos(AMOUNT))
+    container.add_todo({"todo": "買い物" * 40, "due_date": "2021-06-16"})
+
+    # Line buffered like stdout on a terminal: every line is a write(2)
+    output = open(os.devnull, "w", buffering=1)
+
+    def per_line():
+        for todo in container:
+            print(f" - {todo.name!r}, due at {todo.due_date}", file=output)
+
+    def table():
+        rows = (
+            (_table.printable(todo.name), f"due at {todo.due_date}")
+            for todo in container
+        )
+        rendered = _table.render(rows, COLUMNS, prefix=" - ")
+        output.write(rendered)
+        return rendered
+
+    line_time = best_of(per_line, 3)
+    report("print per line", line_time)
+    report("table", best_of(table, 3), line_time)
+    print(f"{len(table().splitlines())} rows")
+    output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# pylint: disable=C
+"""Filtering 100k todos by tags and priority: bitset index vs scanning
+
+Filtering once (like ``todol list --tag``) pays for building the index, so
+it is compared with a single scan; the index only wins when reused.
+"""
+import random
+
+from _common import best_of, make_todos, report
+
+from todol import _tags, todo_objects
+
+AMOUNT = 100_000
+TAGS = ("work", "home", "errand", "urgent", "someday", "reading")
+
+
+def main():
+    rng = random.Random(0)
+    todos = make_todos(AMOUNT)
+    for data in todos:
+        data["tags"] = rng.sample(TAGS, rng.randint(0, 3))
+        data["priority"] = rng.choice(_tags.PRIORITIES)
+    container = todo_objects.TodoContainer(todos)
+    query = (["work", "urgent"], ["someday"], ["high", "medium"])
+
+    def scan():
+        return [todo for todo in container if _tags.matches(todo.data, *query)]
+
+    def build_and_filter():
+        return _tags.TagIndex(container).filter(list(container), *query)
+
+    assert scan() == container.filter(*query) == build_and_filter()
+    scan_time = best_of(scan)
+    report("scan (once)", scan_time)
+    report("build index + filter (once)", best_of(build_and_filter, 3), scan_time)
+    container.filter(*query)  # Builds the index, kept by the container
+    report(
+        "bitset filter (reused)", best_of(lambda: container.filter(*query)), scan_time
+    )
+    print(f"{len(scan())} matches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# pylint: disable=C
+"""Collecting a subtree of 100k todos: adjacency index vs scanning per level"""
+import random
+
+from _common import best_of, make_todos, report
+
+from todol import _tree
+
+AMOUNT = 100_000
+
+
+def main():
+    rng = random.Random(0)
+    todos = make_todos(AMOUNT)
+    # Mostly roots, with projects of subtasks a few levels deep
+    for position, data in enumerate(todos):
+        if position and rng.random() < 0.3:
+            data["parent"] = todos[rng.randrange(max(position - 50, 0), position)][
+                "todo"
+            ]
+    index = _tree.TreeIndex(todos)
+    root = max(range(AMOUNT), key=lambda position: len(index.children(position)))
+
+    def scan():
+        found, level = [root], [todos[root]["todo"]]
+        while level:
+            names = set(level)
+            children = [
+                position
+                for position, data in enumerate(todos)
+                if data.get("parent") in names
+            ]
+            found.extend(children)
+            level = [todos[position]["todo"] for position in children]
+        return found
+
+    assert sorted(scan()) == sorted(index.subtree(root))
+    scan_time = best_of(scan)
+    report("scan per level", scan_time)
+    report("build index", best_of(lambda: _tree.TreeIndex(todos), 3))
+    report("indexed subtree", best_of(lambda: index.subtree(root)), scan_time)
+    print(f"{len(scan())} todos in the subtree")
+
+
+if __name__ == "__main__":
+    main()
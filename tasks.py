@@ -29,6 +29,13 @@ def test(command, coverage=True, verbosity=3, color=True):
     command.run(to_run)
 
 
+@task
+def bench(command, name=""):
+    for script in sorted(here.joinpath("benchmarks").glob(f"bench_{name}*.py")):
+        print(f"### {script.stem}")
+        command.run(f"poetry run python {script}")
+
+
 @task
 def clean(_, caches=True, hypo=True, cov=True):
     to_destroy = []
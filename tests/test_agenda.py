@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import datetime
+
+import hypothesis.strategies as st
+from hypothesis import given
+from todol import _agenda, _utils
+from todol.todo_objects import Todo
+
+WEDNESDAY = datetime.date(2021, 6, 16)
+
+
+def _todos(*offsets, today=WEDNESDAY):
+    return [
+        Todo({"todo": str(offset), "due_date": str(today + datetime.timedelta(offset))})
+        for offset in offsets
+    ]
+
+
+def _names(agenda):
+    return {bucket: [todo.name for todo in todos] for bucket, todos in agenda.items()}
+
+
+class TestAgenda:
+    def test_group(self):
+        agenda = _agenda.group(_todos(5, -1, 0, 1, 2, 4, 300, -30), WEDNESDAY)
+        assert _names(agenda) == {
+            "overdue": ["-1", "-30"],
+            "today": ["0"],
+            "tomorrow": ["1"],
+            "this week": ["2", "4"],
+            "later": ["5", "300"],
+        }
+
+    def test_weekend(self):
+        saturday = WEDNESDAY + datetime.timedelta(3)
+        agenda = _agenda.group(_todos(1, 2, today=saturday), saturday)
+        assert _names(agenda)["tomorrow"] == ["1"]
+        assert _names(agenda)["this week"] == []
+
+    @given(today=st.dates(), offset=st.integers(-1000, 1000))
+    def test_one_bucket(self, today, offset):
+        try:
+            todos = _todos(offset, today=today)
+        except OverflowError:
+            return
+        agenda = _agenda.group(todos, today)
+        assert sum(len(bucket) for bucket in agenda.values()) == 1
+        assert bool(agenda["overdue"]) == (offset < 0)
+
+    def test_lazy_today(self, monkeypatch):
+        monkeypatch.setattr(_utils, "today", lambda: WEDNESDAY)
+        assert _names(_agenda.group(_todos(0)))["today"] == ["0"]
+        assert _utils.tomorrow() == WEDNESDAY + datetime.timedelta(1)
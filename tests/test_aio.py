@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import asyncio
+
+import pytest
+from todol import __main__, _generations, _journal, _select, _stats, _utils, aio
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return aio.Store(tmp_path.joinpath("todol"))
+
+
+async def names(store, section="todos"):
+    return [todo.name async for todo in store.iterate(section)]
+
+
+def test_add_and_iterate(store):
+    async def scenario():
+        added = await store.add(" Buy Milk", "2021-01-02", tags=["#Errands"])
+        await store.add("call mum", priority="high", every="weekly")
+        return added, [todo async for todo in store]
+
+    added, todos = run(scenario())
+    assert added == {"todo": "buy milk", "due_date": "2021-01-02", "tags": ["errands"]}
+    assert [todo.name for todo in todos] == ["buy milk", "call mum"]
+    assert todos[1].priority == "high" and todos[1].every == "1w"
+    assert todos[1].due_date == _utils.tomorrow()
+
+
+def test_invalid_arguments(store):
+    with pytest.raises(ValueError):
+        run(store.add("a", "01/02/2021"))
+    with pytest.raises(ValueError):
+        run(store.add("a", priority="urgent"))
+    assert not store.index_path.exists()
+
+
+def test_finish_and_remove(store):
+    async def scenario():
+        await store.add("parent", "2021-01-01")
+        await store.add("child", "2021-01-01", parent="parent")
+        await store.add("recurring", "2021-01-01", every="1d")
+        await store.add("other", "2021-01-01")
+        finished = await store.finish("parent")
+        await store.finish("recurring")
+        removed = await store.remove(_select.selector("oth*"))
+        return finished, removed, await store.read()
+
+    finished, removed, todos = run(scenario())
+    assert [data["todo"] for data in finished] == ["parent", "child"]
+    assert [data["todo"] for data in removed] == ["other"]
+    assert [(todo.name, str(todo.due_date)) for todo in todos["todos"]] == [
+        ("recurring", "2021-01-02")
+    ]
+    assert [todo.data[_stats.FINISHED_ON] for todo in todos["finished"]] == [
+        str(_utils.today())
+    ] * 2
+
+
+def test_errors_only_fail_their_own_mutation(store):
+    async def scenario():
+        return await asyncio.gather(
+            store.add("a"),
+            store.finish("does not exist"),
+            store.add("b", parent="missing parent"),
+            store.remove(lambda todo: False),
+            store.add("c"),
+            return_exceptions=True,
+        )
+
+    added, *failed, last = run(scenario())
+    assert added["todo"] == "a" and last["todo"] == "c"
+    assert all(isinstance(error, IndexError) for error in failed)
+    assert run(names(store)) == ["a", "c"]
+
+
+def test_concurrent_mutations_coalesce(store):
+    async def scenario():
+        await asyncio.gather(*(store.add(f"todo {number}") for number in range(200)))
+        first = _generations.current(store.index_path)
+        # Finishing todos added in the same batch
+        await asyncio.gather(
+            store.add("later"),
+            *(store.finish(f"todo {number}") for number in range(0, 200, 2)),
+        )
+        return first, _generations.current(store.index_path)
+
+    first, second = run(scenario())
+    assert second - first <= 2
+    assert len(run(names(store))) == 101
+    assert len(run(names(store, "finished"))) == 100
+
+
+def test_undo_reverts_a_batch(store):
+    async def scenario():
+        await store.add("kept")
+        await asyncio.gather(*(store.add(f"todo {number}") for number in range(10)))
+
+    run(scenario())
+    entry = _journal._load(_journal.journal_path(store.index_path))["undo"][-1]
+    assert entry["command"] == "add" and len(entry["changes"]) == 10
+    assert __main__.main(["undo"], config_dir=str(store.index_path.parent)) == 0
+    assert run(names(store)) == ["kept"]
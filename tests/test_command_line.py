@@ -1,16 +1,18 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 # pylint: disable=C,R0201,R0903
-import copy
+import io
 import json
 import os
 import shutil
 import subprocess
 import sys
 from pathlib import Path
+from unittest import mock
 
 import hypothesis.strategies as st
 from hypothesis import assume, given, settings
+from todol.__main__ import main
 from todol._utils import sim_str
 
 project_dir = Path(__file__).parent.parent
@@ -29,8 +31,8 @@ def _clean():
 
 
 #########
-MODIFIED_ENV = copy.deepcopy(os.environ).update(
-    {"RC_FILE": str(todol_test_rc), "TODOL_CONFIG_DIR": str(todol_test_dir)}
+MODIFIED_ENV = dict(
+    os.environ, RC_FILE=str(todol_test_rc), TODOL_CONFIG_DIR=str(todol_test_dir)
 )
 PYTHON = sys.executable
 
@@ -41,30 +43,72 @@ def _run_cmd(cmd, input_=None, check=True):
     )
 
 
+def _run(*argv, input_=""):
+    """Run todol in-process, returning its exit code"""
+    with mock.patch.dict(os.environ, RC_FILE=str(todol_test_rc)), mock.patch(
+        "sys.stdin", io.StringIO(input_)
+    ):
+        return main(argv, stdout=io.StringIO(), config_dir=todol_test_dir)
+
+
 def test_meta():
     assert main_path.exists() and main_path.is_file()
 
 
 def test_version():
     assert _run_cmd((PYTHON, "-m", "todol", "--version")).returncode == 0
+    assert _run("--version") == 0
+
+
+def test_output():
+    _clean()
+    assert _run("init", "--no-shell") == 0
+    assert _run("add", "buy milk", "--due", "2021-06-16") == 0
+    output = io.StringIO()
+    assert main(["list"], stdout=output, config_dir=todol_test_dir) == 0
+    assert " - buy milk  due at 2021-06-16\n" in output.getvalue()
+
+
+def test_usage_error():
+    with mock.patch("sys.stderr", io.StringIO()):
+        assert _run("no-such-command") == 2
 
 
 def test_help():
-    for command in (None, "list", "add", "remove", "init", "finish", "complete"):
-        args = [PYTHON, "-m", "todol"]
+    for command in (
+        None,
+        "list",
+        "agenda",
+        "add",
+        "remove",
+        "init",
+        "finish",
+        "undo",
+        "redo",
+        "search",
+        "dedupe",
+        "sync",
+        "stats",
+        "lists",
+        "remind",
+        "export",
+        "import",
+        "complete",
+    ):
+        args = []
         if command:
             args.append(command)
         for color_option in (None, "--force-color", "--no-color"):
             if color_option:
                 args.append(color_option)
             args.append("--help")
-            assert _run_cmd(args).returncode == 0
+            assert _run(*args) == 0
 
 
 class TestInit:  # TODO: Write tests for subcommands
     def test_no_shell(self):
         _clean()
-        assert _run_cmd((PYTHON, "-m", "todol", "init", "--no-shell")).returncode == 0
+        assert _run("init", "--no-shell") == 0
         assert (
             todol_test_dir.joinpath("todos.json").exists()
             and todol_test_dir.joinpath("todos.json").is_file()
@@ -72,7 +116,7 @@ class TestInit:  # TODO: Write tests for subcommands
 
     def test_init(self):
         _clean()
-        assert _run_cmd((PYTHON, "-m", "todol", "init"), input_=b"y\n").returncode == 0
+        assert _run("init", input_="y\n") == 0
         assert (
             todol_test_dir.joinpath("todos.json").exists()
             and todol_test_dir.joinpath("todos.json").is_file()
@@ -81,7 +125,7 @@ class TestInit:  # TODO: Write tests for subcommands
 
     def test_init_default(self):
         _clean()
-        assert _run_cmd((PYTHON, "-m", "todol", "init"), input_=b"\n").returncode == 0
+        assert _run("init", input_="\n") == 0
         assert (
             todol_test_dir.joinpath("todos.json").exists()
             and todol_test_dir.joinpath("todos.json").is_file()
@@ -90,14 +134,7 @@ class TestInit:  # TODO: Write tests for subcommands
 
     def test_init_eof_cancel(self):
         _clean()
-        with subprocess.Popen(
-            (PYTHON, "-m", "todol", "init"),
-            cwd=str(project_dir),
-            env=MODIFIED_ENV,
-            stdin=subprocess.PIPE,
-        ) as process:
-            process.stdin.close()
-            assert process.wait() == 0
+        assert _run("init") == 0  # stdin is at EOF
 
         assert (
             todol_test_dir.joinpath("todos.json").exists()
@@ -111,12 +148,7 @@ class TestAdd:
     def test_with_init_no_shell(self, to_add):
         assume(to_add == sim_str(to_add))
         _clean()
-        assert (
-            _run_cmd(
-                (PYTHON, "-m", "todol", "add", repr(to_add)), input_=b"n\n"
-            ).returncode
-            == 0
-        )
+        assert _run("add", repr(to_add), input_="n\n") == 0
         assert (
             todol_test_dir.joinpath("todos.json").exists()
             and todol_test_dir.joinpath("todos.json").is_file()
@@ -130,12 +162,7 @@ class TestAdd:
     def test_with_init_and_shell(self, to_add):
         assume(to_add == sim_str(to_add))
         _clean()
-        assert (
-            _run_cmd(
-                (PYTHON, "-m", "todol", "add", repr(to_add)), input_=b"y\n"
-            ).returncode
-            == 0
-        )
+        assert _run("add", repr(to_add), input_="y\n") == 0
         assert (
             todol_test_dir.joinpath("todos.json").exists()
             and todol_test_dir.joinpath("todos.json").is_file()
@@ -152,16 +179,225 @@ class TestFinish:
     def test_finish_nonexisting(self, non_existing):
         assume(non_existing == sim_str(non_existing))
         _clean()
-        assert (
-            _run_cmd(
-                (PYTHON, "-m", "todol", "finish", repr(non_existing)),
-                input_=b"y\n",
-                check=False,
-            ).returncode
-            == 1
-        )
+        assert _run("finish", repr(non_existing), input_="y\n") == 1
         assert (
             todol_test_dir.joinpath("todos.json").exists()
             and todol_test_dir.joinpath("todos.json").is_file()
         )
         assert todol_test_rc.read_text()
+
+
+def test_import_invalid():
+    _clean()
+    assert _run("init", "--no-shell") == 0
+    assert _run("add", "kept", "--due", "2021-06-16") == 0
+    imported = todol_test_dir.joinpath("imported.jsonl")
+    imported.write_text(
+        '{"todo": "y", "due_date": "2021-01-01", "finished": true, '
+        '"finished_on": "garbage"}\n'
+    )
+    index = todol_test_dir.joinpath("todos.json")
+    before = index.read_text()
+    assert _run("import", str(imported)) == 1
+    assert index.read_text() == before  # Rejected before anything was written
+    assert _run("stats") == 0
+    assert _run("undo") == 0  # Undoes the add, not a half-written import
+    assert json.loads(index.read_text())["todos"] == []
+
+
+class TestSubtasks:
+    def _names(self, *argv):
+        """The indented names of the todos ``list --tree`` shows"""
+        output = io.StringIO()
+        assert (
+            main(["list", "--tree", *argv], stdout=output, config_dir=todol_test_dir)
+            == 0
+        )
+        lines = output.getvalue().splitlines()[1:-1]
+        return [line[3:].split("  due at")[0].rstrip() for line in lines]
+
+    def test_subtree(self):
+        _clean()
+        assert _run("init", "--no-shell") == 0
+        assert _run("add", "write report", "--due", "2021-06-16") == 0
+        assert _run("add", "groceries") == 0
+        assert _run("add", "outline", "--parent", "write report") == 0
+        assert _run("add", "sources", "-P", "outline") == 0
+        assert _run("add", "milk", "-P", "nothing like it at all") == 1
+        assert self._names() == [
+            "write report",
+            "  outline",
+            "    sources",
+            "groceries",
+        ]
+        assert _run("finish", "outline") == 0
+        todos = json.loads(todol_test_dir.joinpath("todos.json").read_text())
+        assert [data["todo"] for data in todos["todos"]] == [
+            "write report",
+            "groceries",
+        ]
+        assert [data["todo"] for data in todos["finished"]] == ["outline", "sources"]
+        assert self._names("--finished") == ["outline", "  sources"]
+        assert _run("remove", "write report") == 0
+        assert _run("undo") == 0
+        assert _run("undo") == 0
+        names = self._names()  # Undoing appends, but keeps the trees together
+        start = names.index("write report")
+        assert names[start : start + 3] == ["write report", "  outline", "    sources"]
+        assert len(names) == 4
+
+    def test_todotxt_roundtrip(self):
+        _clean()
+        assert _run("init", "--no-shell") == 0
+        assert _run("add", "write report") == 0
+        assert _run("add", "find sources: papers", "-P", "write report") == 0
+        assert _run("add", "read them", "-P", "find sources: papers") == 0
+        exported = str(todol_test_dir.joinpath("exported.txt"))
+        assert _run("export", exported, "--format", "todo.txt") == 0
+        assert _run("remove", "write report") == 0  # With its subtasks
+        assert _run("import", exported, "--format", "todo.txt") == 0
+        assert self._names() == [
+            "write report",
+            "  find sources: papers",
+            "    read them",
+        ]
+
+
+class TestDedupe:
+    def test_dedupe(self):
+        _clean()
+        assert _run("init", "--no-shell") == 0
+        assert _run("add", "pay the electricity bill", "--due", "2021-06-16") == 0
+        assert _run("add", "call mom") == 0
+        # Declined (at EOF), then added anyway
+        assert _run("add", "pay the electricity bill!", "--dedupe") == 1
+        assert (
+            _run("add", "pay the electricity bill!", "--dedupe", input_="n\ny\n") == 0
+        )
+        assert _run("add", "call dad", "--dedupe") == 0
+        assert _run("dedupe") == 0  # Declined
+        assert _run("dedupe", "--yes") == 0
+        todos = json.loads(todol_test_dir.joinpath("todos.json").read_text())
+        assert [data["todo"] for data in todos["todos"]] == [
+            "pay the electricity bill",
+            "call mom",
+            "call dad",
+        ]
+        assert _run("undo") == 0
+        todos = json.loads(todol_test_dir.joinpath("todos.json").read_text())
+        assert len(todos["todos"]) == 4
+
+    def test_add_merges(self):
+        _clean()
+        assert _run("init", "--no-shell") == 0
+        assert _run("add", "pay the electricity bill", "--tag", "home") == 0
+        assert _run("add", "call mom") == 0
+        assert _run("add", "pay the electricity bill.") == 0
+        # Every candidate is listed before asking
+        output = io.StringIO()
+        with mock.patch("sys.stdin", io.StringIO("y\n")):
+            code = main(
+                ["add", "pay the electricity bill!", "--dedupe", "--tag", "bills"],
+                stdout=output,
+                config_dir=todol_test_dir,
+            )
+        assert code == 0
+        assert "'pay the electricity bill'" in output.getvalue()
+        assert "'pay the electricity bill.'" in output.getvalue()
+        todos = json.loads(todol_test_dir.joinpath("todos.json").read_text())
+        assert [data["todo"] for data in todos["todos"]] == [
+            "pay the electricity bill",
+            "call mom",
+        ]
+        assert todos["todos"][0]["tags"] == ["home", "bills"]
+        assert _run("undo") == 0
+        todos = json.loads(todol_test_dir.joinpath("todos.json").read_text())
+        assert len(todos["todos"]) == 3
+
+
+class TestSelect:
+    def test_bulk(self):
+        _clean()
+        assert _run("init", "--no-shell") == 0
+        for name, due in (("standup", "2021-06-14"), ("review", "2021-06-14")):
+            assert _run("add", f"{name} 1", "--due", due) == 0
+        assert _run("add", "standup 2", "--due", "2021-06-15") == 0
+        assert _run("add", "standup 3", "--due", "2099-01-01") == 0
+        index = todol_test_dir.joinpath("todos.json")
+        before = index.read_text()
+        assert _run("finish", "--select", "'standup *' due:<today", "--dry-run") == 0
+        assert index.read_text() == before
+        assert _run("finish", "-s", "'standup *' due:<today") == 0
+        todos = json.loads(index.read_text())
+        assert [data["todo"] for data in todos["todos"]] == ["review 1", "standup 3"]
+        assert [data["todo"] for data in todos["finished"]] == [
+            "standup 1",
+            "standup 2",
+        ]
+        assert _run("remove", "-s", "nothing*") == 1
+        with mock.patch("sys.stderr", io.StringIO()):
+            assert _run("remove") == 2
+            assert _run("remove", "review 1", "-s", "review*") == 2
+        assert _run("remove", "-s", "re:view") == 0
+        assert _run("undo") == 0
+        assert len(json.loads(index.read_text())["todos"]) == 2
+
+
+class TestJson:
+    def _lines(self, *argv):
+        output = io.StringIO()
+        with mock.patch("sys.stderr", io.StringIO()) as errors:
+            code = main([*argv, "--json"], stdout=output, config_dir=todol_test_dir)
+        return (
+            code,
+            [json.loads(line) for line in output.getvalue().splitlines()],
+            [json.loads(line) for line in errors.getvalue().splitlines()],
+        )
+
+    def test_json(self):
+        _clean()
+        assert self._lines("init", "--no-shell") == (0, [], [])
+        todo = {"todo": "buy milk", "due_date": "2021-06-16", "tags": ["home"]}
+        assert self._lines("add", "buy milk", "--due", "2021-06-16", "-t", "home") == (
+            0,
+            [{"action": "add", "section": "todos", **todo}],
+            [],
+        )
+        assert self._lines("list") == (0, [{"section": "todos", **todo}], [])
+        assert self._lines("search", "milk") == (0, [{"section": "todos", **todo}], [])
+        code, changes, _ = self._lines("finish", "buy milk")
+        assert code == 0
+        assert [(change["action"], change["section"]) for change in changes] == [
+            ("remove", "todos"),
+            ("add", "finished"),
+        ]
+        assert self._lines("list")[1] == []
+        finished = {key: value for key, value in changes[1].items() if key != "action"}
+        assert self._lines("list", "--finished")[1] == [finished]
+        assert self._lines("finish", "buy milk") == (
+            1,
+            [],
+            [{"error": "Could not find todo!"}],
+        )
+        assert self._lines("lists")[1] == [
+            {"list": "default", "todos": 0, "finished": 1, "current": True}
+        ]
+
+    def test_complete(self):
+        _clean()
+        assert _run("init", "--no-shell") == 0
+        code, lines, errors = self._lines("complete", "bash")
+        assert (code, errors) == (0, [])
+        assert [line["shell"] for line in lines] == ["bash"]
+        assert "todol" in lines[0]["script"]
+
+    def test_global_flag(self):
+        _clean()
+        assert _run("init", "--no-shell") == 0
+        assert _run("add", "buy milk", "--due", "2021-06-16") == 0
+        output = io.StringIO()
+        # Before the command, like the other global options
+        assert main(["--json", "list"], stdout=output, config_dir=todol_test_dir) == 0
+        assert [json.loads(line) for line in output.getvalue().splitlines()] == [
+            {"section": "todos", "todo": "buy milk", "due_date": "2021-06-16"}
+        ]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import argparse
+
+import pytest
+from todol import _completion
+
+
+def _parser(*commands):
+    parser = argparse.ArgumentParser(prog="todol")
+    subparsers = parser.add_subparsers(dest="command")
+    for command in commands:
+        subparsers.add_parser(command).add_argument("todo")
+    return parser
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    calls = []
+
+    def render(parser, shell):
+        calls.append(shell)
+        return f"# {shell} {_completion.fingerprint(parser)}\n"
+
+    monkeypatch.setattr(_completion, "render", render)
+    return calls
+
+
+class TestRenderCached:
+    def test_cached(self, tmp_path, renders):
+        parser = _parser("add", "remove")
+        script = _completion.render_cached(parser, "bash", tmp_path)
+        assert _completion.render_cached(parser, "bash", tmp_path) == script
+        assert renders == ["bash"]
+        _completion.render_cached(parser, "zsh", tmp_path)
+        assert renders == ["bash", "zsh"]
+        assert len(list(tmp_path.glob("completion-*"))) == 2
+
+    def test_invalidated(self, tmp_path, renders, monkeypatch):
+        _completion.render_cached(_parser("add"), "bash", tmp_path)
+        _completion.render_cached(_parser("add", "remove"), "bash", tmp_path)
+        monkeypatch.setattr(_completion, "__version__", "99.0.0")
+        _completion.render_cached(_parser("add", "remove"), "bash", tmp_path)
+        assert renders == ["bash"] * 3
+        assert len(list(tmp_path.glob("completion-bash-*"))) == 1
+
+    def test_unwritable(self, tmp_path, renders):
+        cache_dir = tmp_path.joinpath("file")
+        cache_dir.touch()
+        assert _completion.render_cached(_parser(), "bash", cache_dir)
+        assert _completion.render_cached(_parser(), "bash", cache_dir)
+        assert renders == ["bash"] * 2
+
+    def test_fingerprint(self):
+        assert _completion.fingerprint(_parser("add")) == _completion.fingerprint(
+            _parser("add")
+        )
+        assert _completion.fingerprint(_parser("add")) != _completion.fingerprint(
+            _parser("ad")
+        )
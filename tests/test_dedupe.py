@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given
+from todol import _dedupe, _store
+
+
+def _todo(name, due_date="2021-01-01", **extra):
+    return dict({"todo": name, "due_date": due_date}, **extra)
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path.joinpath("todos.json")
+    _store.write(
+        path,
+        {
+            "todos": [
+                _todo("pay the electricity bill"),
+                _todo("call mom"),
+                _todo("Pay the  electricity bill!", "2020-12-01", tags=["home"]),
+                _todo("renew passport"),
+            ],
+            "finished": [_todo("call mom.")],
+        },
+    )
+    return path
+
+
+def _names(path, name):
+    todos = _store.read(path)["todos"]
+    return [data["todo"] for _, data in _dedupe.duplicates(path, name, todos)]
+
+
+@given(first=st.text(), second=st.text())
+def test_similarity(first, second):
+    score = _dedupe.similarity(first, second)
+    assert 0 <= score <= 1
+    assert score == _dedupe.similarity(second, first)
+    assert _dedupe.similarity(first, " ".join(first.split())) == 1
+
+
+@given(name=st.text())
+def test_signature(name):
+    assert _dedupe.signature(name) == _dedupe.signature(f"  {name.lower()} ")
+    assert len(_dedupe.buckets(name)) == _dedupe.BANDS
+
+
+class TestDuplicates:
+    def test_duplicates(self, store):
+        assert _names(store, "pay electricity bill") == [
+            "pay the electricity bill",
+            "Pay the  electricity bill!",
+        ]
+        assert _names(store, "call mom!") == ["call mom"]  # Not the finished one
+        assert _names(store, "something else") == []
+
+    def test_incremental(self, store):
+        _names(store, "")  # Build the index
+        todos = _store.read(store)
+        todos["todos"].pop(1)
+        todos["todos"].append(_todo("renew the passport"))
+        _store.write(
+            store,
+            todos,
+            [
+                ("remove", "todos", _todo("call mom")),
+                ("add", "todos", todos["todos"][-1]),
+            ],
+        )
+        assert _dedupe.duplicates(store, "call mom") == []
+        assert [
+            data["todo"] for _, data in _dedupe.duplicates(store, "renew passport")
+        ] == [
+            "renew passport",
+            "renew the passport",
+        ]
+
+    def test_stale(self, store):
+        _names(store, "")
+        store.write_text(
+            '{"todos": [{"todo": "edited", "due_date": "2021-01-01"}], "finished": []}'
+        )
+        with pytest.raises(ValueError):
+            _dedupe.duplicates(store, "edited")
+        assert _names(store, "edited!") == ["edited"]
+
+    def test_groups(self, store):
+        todos = _store.read(store)["todos"]
+        assert _dedupe.groups(store, todos) == [[todos[0], todos[2]]]
+        assert _dedupe.groups(store, threshold=1.01) == []
+
+
+def test_merge():
+    assert _dedupe.merge(
+        [
+            _todo("pay bill", tags=["home"], priority="low"),
+            _todo("pay bill!", "2020-12-01", tags=["money", "home"], priority="high"),
+            _todo("Pay bill", "2022-01-01"),
+        ]
+    ) == _todo("pay bill", "2020-12-01", tags=["home", "money"], priority="high")
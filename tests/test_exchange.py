@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import re
+
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given
+from todol import _exchange, _stats, _tags
+
+records = st.lists(
+    st.tuples(
+        st.sampled_from(("todos", "finished")),
+        st.fixed_dictionaries(
+            {
+                # Keep to what todo.txt can represent unambiguously
+                "todo": st.text(
+                    alphabet=st.characters(
+                        blacklist_categories=("C", "Z"), blacklist_characters=":"
+                    ),
+                    min_size=1,
+                ).filter(
+                    lambda name: not re.match(r"x$|\([A-Z]\)$|\d{4}-\d{2}-\d{2}$", name)
+                    and not name.startswith("+")
+                ),
+                "due_date": st.dates().map(str),
+            },
+            optional={
+                "id": st.from_regex(r"[a-z0-9]{1,8}", fullmatch=True),
+                "tags": st.lists(
+                    st.from_regex(r"[a-z0-9]{1,8}", fullmatch=True),
+                    min_size=1,
+                    unique=True,
+                ),
+                "priority": st.sampled_from(_tags.PRIORITIES),
+            },
+        ),
+    )
+)
+
+
+def _todotxt_name(name):
+    """Whether todo.txt reads `name` back as a name, and nothing else"""
+    words = name.split(" ")
+    return not re.match(r"x$|\([A-Z]\)$|\d{4}-\d{2}-\d{2}$", words[0]) and not any(
+        word.startswith("+")
+        or word.partition(":")[0] in ("due",) + _exchange.TODOTXT_KEYS
+        for word in words
+    )
+
+
+todotxt_records = st.lists(
+    st.tuples(
+        st.sampled_from(("todos", "finished")),
+        st.fixed_dictionaries(
+            {
+                # Words with colons, e.g. "meeting at 10:30"
+                "todo": st.lists(
+                    st.text(
+                        alphabet=st.characters(blacklist_categories=("C", "Z")),
+                        min_size=1,
+                    ),
+                    min_size=1,
+                )
+                .map(" ".join)
+                .filter(_todotxt_name),
+                "due_date": st.dates().map(str),
+            },
+            optional={
+                key: st.dates().map(str)
+                if key == _stats.FINISHED_ON
+                else st.text(
+                    alphabet=st.characters(blacklist_categories=("Cs",)), min_size=1
+                )
+                for key in _exchange.TODOTXT_KEYS
+            },
+        ),
+    )
+)
+
+
+class TestRoundtrip:
+    @pytest.mark.parametrize("file_format", sorted(_exchange.FORMATS))
+    @given(to_dump=records)
+    def test_roundtrip(self, file_format, to_dump):
+        lines = "".join(_exchange.dump(iter(to_dump), file_format)).splitlines(True)
+        assert list(_exchange.load(lines, file_format)) == to_dump
+
+    @given(to_dump=todotxt_records)
+    def test_todotxt_roundtrip(self, to_dump):
+        lines = "".join(_exchange.dump_todotxt(iter(to_dump))).splitlines(True)
+        assert list(_exchange.load_todotxt(lines)) == to_dump
+
+    def test_todotxt_skipped(self):
+        warnings = []
+        lines = list(
+            _exchange.dump(
+                [
+                    (
+                        "todos",
+                        {
+                            "todo": "a",
+                            "due_date": "2021-01-01",
+                            "unknown": "b",
+                            "id": ["c"],
+                        },
+                    )
+                ],
+                "todo.txt",
+                warnings.append,
+            )
+        )
+        assert lines == ["a due:2021-01-01\n"]
+        assert len(warnings) == 2
+        assert "unknown='b'" in warnings[0] and "id=['c']" in warnings[1]
+
+    def test_streaming(self):
+        def endless():
+            while True:
+                yield "todos", {"todo": "again", "due_date": "2021-01-01"}
+
+        lines = _exchange.dump(endless(), "jsonl")
+        assert [next(lines) for _ in range(3)] == [
+            '{"todo": "again", "due_date": "2021-01-01", "finished": false}\n'
+        ] * 3
+
+
+class TestLoad:
+    def test_todotxt(self):
+        loaded = list(
+            _exchange.load(
+                [
+                    "x 2021-01-02 2021-01-01 done thing due:2021-01-01\n",
+                    "meeting at 10:30 re:budget due:2021-01-01\n",
+                    "(A) 2021-01-01 read http://example.com due:2021-02-03 id:7\n",
+                    "\n",
+                ],
+                "todo.txt",
+            )
+        )
+        assert loaded == [
+            ("finished", {"todo": "done thing", "due_date": "2021-01-01"}),
+            (
+                "todos",
+                {"todo": "meeting at 10:30 re:budget", "due_date": "2021-01-01"},
+            ),
+            (
+                "todos",
+                {
+                    "priority": "high",
+                    "todo": "read http://example.com",
+                    "due_date": "2021-02-03",
+                    "id": "7",
+                },
+            ),
+        ]
+
+    def test_csv_minimal(self):
+        loaded = list(_exchange.load(["todo,finished\n", "a,1\n", "b,\n"], "csv"))
+        assert [(section, data["todo"]) for section, data in loaded] == [
+            ("finished", "a"),
+            ("todos", "b"),
+        ]
+
+    @pytest.mark.parametrize(
+        "file_format,line",
+        [
+            ("jsonl", "not json\n"),
+            ("jsonl", "[]\n"),
+            ("jsonl", '{"due_date": "2021-01-01"}\n'),
+            ("jsonl", '{"todo": "a", "due_date": "tomorrow"}\n'),
+            ("todo.txt", "a due:2021-13-01\n"),
+            ("todo.txt", "a due:2021-01-01 finished_on:garbage\n"),
+            (
+                "jsonl",
+                '{"todo": "a", "due_date": "2021-01-01", "finished": true, '
+                '"finished_on": "garbage"}\n',
+            ),
+        ],
+    )
+    def test_invalid(self, file_format, line):
+        with pytest.raises(ValueError, match="line 1"):
+            list(_exchange.load([line], file_format))
+
+
+def test_guess_format():
+    assert _exchange.guess_format("todos.CSV") == "csv"
+    assert _exchange.guess_format("todo.txt") == "todo.txt"
+    assert _exchange.guess_format("-") == "jsonl"
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import os
+import threading
+
+import pytest
+from todol import _generations, _store
+
+
+def _index(count):
+    return {
+        "todos": [
+            {"todo": str(number), "due_date": "2021-01-01"} for number in range(count)
+        ],
+        "finished": [],
+    }
+
+
+class TestPublish:
+    def test_numbered(self, tmp_path):
+        path = tmp_path.joinpath("todos.json")
+        assert _generations.current(path) == 0
+        assert _generations.publish(path, b"one") == 1
+        assert _generations.publish(path, b"two") == 2
+        assert _generations.current(path) == 2
+        assert os.readlink(str(path)) == os.path.join("generations", "todos.2.json")
+        assert path.read_bytes() == b"two"
+
+    def test_immutable(self, tmp_path):
+        path = tmp_path.joinpath("todos.json")
+        # Left over by a writer that crashed before pointing the index to it
+        tmp_path.joinpath("generations").mkdir()
+        tmp_path.joinpath("generations", "todos.1.json").write_bytes(b"crashed")
+        assert _generations.publish(path, b"new") == 2
+        assert path.read_bytes() == b"new"
+
+    def test_legacy_file(self, tmp_path):
+        path = tmp_path.joinpath("todos.json")
+        path.write_bytes(b"plain")
+        assert _generations.publish(path, b"linked") == 1
+        assert path.is_symlink() and path.read_bytes() == b"linked"
+
+    def test_collect(self, tmp_path):
+        path = tmp_path.joinpath("todos.snap")
+        for number in range(5):
+            _generations.publish(path, str(number).encode())
+        assert sorted(
+            entry.name for entry in _generations.generations_dir(path).iterdir()
+        ) == ["todos.4.snap", "todos.5.snap"]
+
+    def test_open_reader(self, tmp_path):
+        path = tmp_path.joinpath("todos.json")
+        _generations.publish(path, b"first")
+        with path.open("rb") as reader:
+            for _ in range(3):
+                _generations.publish(path, b"later")
+            assert reader.read() == b"first"  # Collected, but still readable
+
+
+def test_lock(tmp_path):
+    fcntl = pytest.importorskip("fcntl")
+    path = tmp_path.joinpath("todos.json")
+    with _generations.lock(path):
+        with open(str(tmp_path.joinpath("todos.lock"))) as other:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    with open(str(tmp_path.joinpath("todos.lock"))) as other:
+        fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def test_concurrent_reads(tmp_path):
+    path = tmp_path.joinpath("todos.json")
+    _store.write(path, _index(1))
+    done = threading.Event()
+
+    def write():
+        for count in range(2, 60):
+            with _store.lock(path):
+                _store.write(path, _index(count))
+        done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        while not done.is_set():
+            todos = _store.read(path)["todos"]  # Never a partial write
+            assert [data["todo"] for data in todos] == list(map(str, range(len(todos))))
+    finally:
+        writer.join()
+    assert len(_store.read(path)["todos"]) == 59
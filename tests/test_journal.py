@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given
+from todol import _journal, _store
+
+todo_dicts = st.fixed_dictionaries(
+    {"todo": st.text(), "due_date": st.just("2021-01-01")}
+)
+changes = st.lists(
+    st.tuples(st.just("add"), st.sampled_from(("todos", "finished")), todo_dicts)
+)
+
+
+def _todo(name):
+    return {"todo": name, "due_date": "2021-01-01"}
+
+
+@given(forward=changes)
+def test_invert(forward):
+    todos = {"todos": [_todo("kept")], "finished": []}
+    _journal.apply(todos, forward)
+    _journal.apply(todos, _journal.invert(forward))
+    assert todos == {"todos": [_todo("kept")], "finished": []}
+
+
+def test_apply_conflict():
+    todos = {"todos": [_todo("a")], "finished": []}
+    with pytest.raises(ValueError, match="no longer"):
+        _journal.apply(
+            todos, [("add", "finished", _todo("a")), ("remove", "todos", _todo("b"))]
+        )
+    assert todos == {"todos": [_todo("a")], "finished": []}
+
+
+class TestJournal:
+    def test_undo_redo(self, tmp_path):
+        index = tmp_path.joinpath("todos.json")
+        todos = {"todos": [], "finished": []}
+        added = [("add", "todos", _todo("a"))]
+        finished = [("remove", "todos", _todo("a")), ("add", "finished", _todo("a"))]
+        for command, change in (("add", added), ("finish", finished)):
+            _journal.apply(todos, change)
+            _journal.record(index, command, change)
+
+        entry, applied = _journal.step(index, todos)
+        assert entry["command"] == "finish"
+        assert applied == _journal.invert(finished)
+        assert todos == {"todos": [_todo("a")], "finished": []}
+        _journal.step(index, todos)
+        assert _journal.step(index, todos) is None
+        assert todos == {"todos": [], "finished": []}
+
+        _journal.step(index, todos, redo=True)
+        assert todos == {"todos": [_todo("a")], "finished": []}
+        _journal.record(index, "add", [("add", "todos", _todo("b"))])
+        assert _journal.step(index, todos, redo=True) is None
+
+    def test_depth(self, tmp_path, monkeypatch):
+        index = tmp_path.joinpath("todos.json")
+        monkeypatch.setenv("TODOL_UNDO_DEPTH", "2")
+        for name in "abc":
+            _journal.record(index, "add", [("add", "todos", _todo(name))])
+        todos = {"todos": [_todo(name) for name in "abc"], "finished": []}
+        assert _journal.step(index, todos) and _journal.step(index, todos)
+        assert _journal.step(index, todos) is None
+        assert todos["todos"] == [_todo("a")]
+
+        monkeypatch.setenv("TODOL_UNDO_DEPTH", "0")
+        _journal.record(index, "add", [("add", "todos", _todo("d"))])
+        assert _journal.step(index, todos) is None
+
+    @pytest.mark.parametrize("setting", ["abc", "", "2.5"])
+    def test_invalid_depth(self, tmp_path, monkeypatch, setting):
+        monkeypatch.setenv("TODOL_UNDO_DEPTH", setting)
+        assert _journal.depth() == _journal.DEFAULT_DEPTH
+        index = tmp_path.joinpath("todos.json")
+        _journal.record(index, "add", [("add", "todos", _todo("a"))])
+        assert _journal.step(index, {"todos": [_todo("a")], "finished": []})
+
+    def test_conflict(self, tmp_path):
+        index = tmp_path.joinpath("todos.json")
+        _journal.record(index, "add", [("add", "todos", _todo("a"))])
+        with pytest.raises(ValueError):
+            _journal.step(index, {"todos": [], "finished": []})
+        # Still there
+        assert _journal.step(index, {"todos": [_todo("a")], "finished": []})
+
+    def test_since(self, tmp_path, monkeypatch):
+        index = tmp_path.joinpath("todos.json")
+        todos = {"todos": [], "finished": []}
+        _store.write(index, todos)
+        start = _journal.stamp(index)
+        assert _journal.since(index, start) == []
+        written = []
+        for name in "ab":
+            change = [("add", "todos", _todo(name))]
+            _journal.apply(todos, change)
+            previous = _journal.stamp(index)
+            _store.write(index, todos, change)
+            _journal.record(index, "add", change, previous)
+            written.extend(change)
+        assert _journal.since(index, start) == written
+        middle = _journal.stamp(index)
+
+        # Undos are logged too
+        _, undone = _journal.step(index, todos)
+        previous = _journal.stamp(index)
+        _store.write(index, todos, undone)
+        _journal.log(index, undone, previous)
+        assert _journal.since(index, start) == written + undone
+        assert _journal.since(index, middle) == undone
+
+        # Trimmed past the stamp
+        monkeypatch.setenv("TODOL_UNDO_DEPTH", "1")
+        change = [("add", "todos", _todo("c"))]
+        previous = _journal.stamp(index)
+        _store.write(index, {"todos": [_todo("a"), _todo("c")], "finished": []})
+        _journal.record(index, "add", change, previous)
+        assert _journal.since(index, middle) is None
+        assert _journal.since(index, previous) == change
+
+        # Edited without being logged
+        _store.write(index, todos)
+        assert _journal.since(index, previous) is None
+        assert _journal.since(index, None) is None
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import datetime
+import io
+import json
+
+import hypothesis.strategies as st
+from hypothesis import given
+from todol import _jsonl
+
+objects = st.lists(
+    st.dictionaries(st.text(), st.one_of(st.text(), st.integers(), st.lists(st.text())))
+)
+
+
+class CountingIO(io.StringIO):
+    writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+@given(objects=objects, chunk_size=st.integers(min_value=1, max_value=200))
+def test_write(objects, chunk_size):
+    stream = CountingIO()
+    assert _jsonl.write(iter(objects), stream, chunk_size) == len(objects)
+    lines = stream.getvalue().splitlines()  # Splitting on any line boundary
+    assert [json.loads(line) for line in lines] == objects
+    assert stream.writes <= len(objects)
+
+
+def test_chunks():
+    stream = CountingIO()
+    _jsonl.write(({"todo": str(number)} for number in range(10_000)), stream)
+    assert stream.writes < 10
+
+
+def test_encode():
+    assert _jsonl.encode({"due_date": datetime.date(2021, 6, 16), "todo": "é"}) == (
+        '{"due_date":"2021-06-16","todo":"\\u00e9"}'
+    )
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import json
+
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given
+from todol import _metrics, todo_objects
+
+
+@pytest.fixture
+def records():
+    collected = []
+    _metrics.set_sink(collected.append)
+    yield collected
+    _metrics.set_sink(None)
+
+
+def test_disabled_is_noop():
+    _metrics.set_sink(None)
+    _metrics.incr("something")
+    _metrics.gauge("something", 1)
+    with _metrics.timer("something"):
+        pass
+    assert not _metrics.enabled()
+    assert _metrics.flush() is None
+    assert not (_metrics.counters or _metrics.gauges or _metrics.timers)
+
+
+def test_failing_sink(tmp_path, capsys):
+    _metrics.set_sink(_metrics.file_sink(tmp_path.joinpath("missing", "metrics")))
+    try:
+        _metrics.incr("something")
+        assert _metrics.flush()["counters"] == {"something": 1}
+    finally:
+        _metrics.set_sink(None)
+    assert "could not write metrics" in capsys.readouterr().err
+
+
+class TestCollection:
+    @given(amounts=st.lists(st.integers(min_value=0, max_value=1000)))
+    def test_counters(self, amounts):
+        collected = []
+        _metrics.set_sink(collected.append)
+        try:
+            for amount in amounts:
+                _metrics.incr("thing", amount)
+            record = _metrics.flush(command="test")
+        finally:
+            _metrics.set_sink(None)
+        assert collected == [record]
+        assert record["command"] == "test"
+        assert record["counters"].get("thing", 0) == sum(amounts)
+
+    def test_timer_and_reset(self, records):
+        with _metrics.timer("block"):
+            pass
+        _metrics.gauge("size", 3)
+        _metrics.flush()
+        _metrics.flush()
+        assert records[0]["timers"]["block"] >= 0
+        assert records[0]["gauges"] == {"size": 3}
+        assert records[1]["timers"] == records[1]["gauges"] == {}
+
+    def test_fuzzy_get(self, records):
+        container = todo_objects.TodoContainer(
+            [
+                {"todo": "a much longer todo name", "due_date": "2020-01-01"},
+                {"todo": "short", "due_date": "2020-01-01"},
+            ]
+        )
+        assert container.get("shirt").name == "short"
+        counters = _metrics.flush()["counters"]
+        assert counters["fuzzy.pruned"] == 1
+        assert counters["fuzzy.comparisons"] == 1
+
+
+def test_file_sink(tmp_path):
+    path = tmp_path.joinpath("metrics.jsonl")
+    sink = _metrics.file_sink(path)
+    sink({"a": 1})
+    sink({"b": 2})
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [
+        {"a": 1},
+        {"b": 2},
+    ]
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import os
+
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given
+from todol import _mmap_index, _store, _utils
+
+todo_dicts = st.lists(
+    st.fixed_dictionaries({"todo": st.text(), "due_date": st.dates().map(str)})
+)
+
+
+def _index(todos, finished):
+    return {"todos": todos, "finished": finished}
+
+
+class TestMappedIndex:
+    @given(todos=todo_dicts, finished=todo_dicts)
+    def test_sections(self, tmp_path_factory, todos, finished):
+        path = tmp_path_factory.mktemp("store").joinpath("todos.json")
+        _store.write(path, _index(todos, finished))
+        with _mmap_index.open_for(path) as mapped:
+            assert mapped.counts == {"todos": len(todos), "finished": len(finished)}
+            assert [_utils.deserialize(todo) for todo in mapped["todos"]] == todos
+            assert [_utils.deserialize(todo) for todo in mapped["finished"]] == finished
+            assert list(mapped["todos"].data()) == todos
+
+    def test_slicing(self, tmp_path):
+        todos = [
+            {"todo": str(number), "due_date": "2021-01-01"} for number in range(600)
+        ]
+        path = tmp_path.joinpath("todos.json")
+        _store.write(path, _index(todos, []))
+        with _mmap_index.open_for(path) as mapped:
+            section = mapped["todos"]
+            assert len(section) == 600
+            assert section[0].name == "0"
+            assert section[-1].name == "599"
+            assert [todo.name for todo in section[10:13]] == ["10", "11", "12"]
+            assert [todo.name for todo in section[590::4]] == ["590", "594", "598"]
+            assert list(section.data(599, 1000)) == todos[599:]
+            with pytest.raises(IndexError):
+                section[600]  # pylint: disable=pointless-statement
+            with pytest.raises(KeyError):
+                mapped["nothing"]  # pylint: disable=pointless-statement
+
+    def test_stale(self, tmp_path):
+        path = tmp_path.joinpath("todos.json")
+        _store.write(path, _store.empty())
+        assert _mmap_index.open_for(path) is not None
+        path.write_text('{"todos": [], "finished": []} ')  # Edited by hand
+        assert _mmap_index.open_for(path) is None
+        os.remove(_mmap_index.sidecar_path(path))
+        assert _mmap_index.open_for(path) is None
+
+    def test_invalid(self, tmp_path):
+        path = tmp_path.joinpath("todos.json")
+        _store.write(path, _store.empty())
+        _mmap_index.sidecar_path(path).write_bytes(b"garbage" * 10)
+        assert _mmap_index.open_for(path) is None
+
+    def test_read_counts(self, tmp_path):
+        path = tmp_path.joinpath("todos.json")
+        todo = {"todo": "count me", "due_date": "2021-01-01"}
+        _store.write(path, _index([todo] * 3, [todo]))
+        assert _mmap_index.read_counts(path) == {"todos": 3, "finished": 1}
+        path.write_text('{"todos": [], "finished": []}')
+        assert _mmap_index.read_counts(path) is None
+        assert _store.counts(path) == {"todos": 0, "finished": 0}
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import subprocess
+import sys
+
+import hypothesis.strategies as st
+from hypothesis import given
+from todol import _names, _store
+
+names = st.lists(st.text(min_size=1))
+
+
+def _todos(*todo_names, **ids):
+    todos = [{"todo": name, "due_date": "2021-01-01"} for name in todo_names]
+    todos += [
+        {"todo": name, "due_date": "2021-01-01", "id": id_} for id_, name in ids.items()
+    ]
+    return todos
+
+
+class TestNames:
+    @given(todo_names=names, prefix=st.text())
+    def test_complete(self, tmp_path_factory, todo_names, prefix):
+        path = tmp_path_factory.mktemp("store").joinpath("todos.json")
+        path.touch()
+        _names.write(path, _todos(*todo_names))
+        assert _names.complete(prefix, _names.sidecar_path(path)) == sorted(
+            {
+                name
+                for name in todo_names
+                if name.startswith(prefix) and "\n" not in name
+            }
+        )
+
+    def test_candidates(self):
+        assert _names.candidates(_todos("b", "a", "b", x7="c")) == ["a", "b", "c", "x7"]
+        assert _names.candidates(_todos("multi\nline", "")) == []
+
+    def test_store_writes_names(self, tmp_path):
+        path = tmp_path.joinpath("todos.json")
+        _store.write(path, {"todos": _todos("pay rent"), "finished": _todos("pay")})
+        assert _names.complete("pay", _names.sidecar_path(path)) == ["pay rent"]
+
+    def test_hook(self, tmp_path):
+        _store.write(
+            tmp_path.joinpath("todos.json"),
+            {"todos": _todos("pay rent", "pay bills", "call mom"), "finished": []},
+        )
+        output = subprocess.run(
+            (sys.executable, "-m", "todol._names", "--", "pay"),
+            env={"TODOL_CONFIG_DIR": str(tmp_path)},
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout
+        assert output.decode().splitlines() == ["pay bills", "pay rent"]
+
+    def test_hook_named_list(self, tmp_path):
+        tmp_path.joinpath("lists").mkdir()
+        _store.write(
+            _store.index_path(tmp_path, "json", "work"),
+            {"todos": _todos("ship it"), "finished": []},
+        )
+        output = subprocess.run(
+            (sys.executable, "-m", "todol._names", "--", "sh"),
+            env={"TODOL_CONFIG_DIR": str(tmp_path), "TODOL_LIST": "work"},
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout
+        assert output.decode().splitlines() == ["ship it"]
+
+    def test_missing(self, tmp_path):
+        assert _names.complete("", tmp_path.joinpath("todos.names")) == []
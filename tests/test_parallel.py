@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import hypothesis.strategies as st
+from hypothesis import given, settings
+from todol import _parallel, _utils
+from todol.todo_objects import TodoContainer
+
+names = st.lists(st.text(alphabet="abcde", max_size=8), max_size=60)
+
+
+def _serial(names, query, limit):
+    for index, name in enumerate(names):
+        if abs(len(name) - len(query)) > limit >= 0:
+            continue
+        if _utils.fuzzy_match(name, query, limit=limit):
+            return index
+    return -1
+
+
+@settings(deadline=None, max_examples=30)
+@given(
+    names=names, query=st.text(alphabet="abcde", max_size=8), limit=st.integers(0, 3)
+)
+def test_first_match(names, query, limit):
+    assert _parallel.first_match(names, query, limit, count=2)[0] == _serial(
+        names, query, limit
+    )
+
+
+def test_workers(monkeypatch):
+    monkeypatch.setenv("TODOL_FUZZY_WORKERS", "3")
+    assert _parallel.workers() == 3
+    monkeypatch.setenv("TODOL_FUZZY_WORKERS", "auto")
+    assert _parallel.workers() >= 1
+    monkeypatch.delenv("TODOL_FUZZY_WORKERS")
+    assert _parallel.workers() == 0
+    assert not _parallel.enabled(10**9)
+
+
+def test_container(monkeypatch):
+    todos = [
+        {"todo": f"todo {number}", "due_date": "2021-01-01"} for number in range(300)
+    ]
+    container = TodoContainer(todos)
+    queries = ("todo 250", "todo 42x", "nothing like it", todos[120], "todo")
+    serial = [container.get(query) for query in queries]
+    monkeypatch.setenv("TODOL_FUZZY_WORKERS", "2")
+    monkeypatch.setattr(_parallel, "THRESHOLD", 100)
+    assert _parallel.enabled(len(container))
+    assert [container.get(query) for query in queries] == serial
+    assert container.get(todos[120], fuzzy_limit=0) == todos[120]
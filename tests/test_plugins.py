@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import io
+import sys
+import textwrap
+
+import pytest
+from todol import _plugins, _store
+from todol.__main__ import main
+
+PLUGIN = """
+import json
+
+added = []
+
+
+def on_add(data):
+    added.append(data["todo"])
+
+
+def on_finish(data):
+    raise RuntimeError("broken")
+
+
+def column(data):
+    return data["todo"].upper()
+
+
+class Reversed:
+    @staticmethod
+    def dumps(todos):
+        return json.dumps(todos).encode()[::-1]
+
+    @staticmethod
+    def loads(raw):
+        return json.loads(raw[::-1])
+"""
+
+ENTRY_POINTS = """
+[todol.on_add]
+record = fake_todol_plugin:on_add
+
+[todol.on_finish]
+broken = fake_todol_plugin:on_finish
+
+[todol.columns]
+shout = fake_todol_plugin:column
+
+[todol.storage]
+rev = fake_todol_plugin:Reversed
+"""
+
+
+@pytest.fixture
+def installed(tmp_path, monkeypatch):
+    site = tmp_path.joinpath("site")
+    info = site.joinpath("fake_todol_plugin-0.1.dist-info")
+    info.mkdir(parents=True)
+    info.joinpath("METADATA").write_text(
+        "Metadata-Version: 2.1\nName: fake-todol-plugin\nVersion: 0.1\n"
+    )
+    info.joinpath("entry_points.txt").write_text(ENTRY_POINTS)
+    site.joinpath("fake_todol_plugin.py").write_text(textwrap.dedent(PLUGIN))
+    monkeypatch.syspath_prepend(str(site))
+    monkeypatch.setattr(_plugins, "_discovered", {})
+    monkeypatch.setattr(_plugins, "_loaded", {})
+    _plugins.set_cache_dir(tmp_path.joinpath("cache"))
+    yield site
+    _plugins.set_cache_dir(None)
+    sys.modules.pop("fake_todol_plugin", None)
+
+
+class TestDiscovery:
+    def test_discover(self, installed):
+        found = _plugins.discover()
+        assert found["on_add"] == [("record", "fake_todol_plugin:on_add")]
+        assert [plugin.name for plugin in _plugins.plugins("storage")] == ["rev"]
+
+    def test_lazy(self, installed):
+        assert _plugins.plugins("columns")
+        assert "fake_todol_plugin" not in sys.modules
+        loaded, failures = _plugins.load("columns")
+        assert loaded[0]({"todo": "milk"}) == "MILK" and not failures
+
+    def test_cached(self, installed, tmp_path, monkeypatch):
+        calls = []
+        discover = _plugins.discover
+        monkeypatch.setattr(
+            _plugins, "discover", lambda: calls.append(None) or discover()
+        )
+        _plugins.plugins("on_add")
+        monkeypatch.setattr(_plugins, "_discovered", {})  # A new process
+        assert _plugins.plugins("on_add")[0].name == "record"
+        assert len(calls) == 1
+        assert len(list(tmp_path.joinpath("cache").glob("plugins-*.json"))) == 1
+
+        # Installing a distribution changes its directory
+        installed.joinpath("another-0.1.dist-info").mkdir()
+        monkeypatch.setattr(_plugins, "_discovered", {})
+        _plugins.plugins("on_add")
+        assert len(calls) == 2
+        assert len(list(tmp_path.joinpath("cache").glob("plugins-*.json"))) == 1
+
+    def test_fire(self, installed):
+        assert _plugins.fire("on_add", {"todo": "milk"}) == []
+        assert sys.modules["fake_todol_plugin"].added == ["milk"]
+        [(name, exception)] = _plugins.fire("on_finish", {"todo": "milk"})
+        assert name == "broken" and str(exception) == "broken"
+
+
+def test_storage(installed, tmp_path):
+    path = _store.index_path(tmp_path, "rev")
+    assert path.name == "todos.rev"
+    todos = {"todos": [{"todo": "milk", "due_date": "2021-06-16"}], "finished": []}
+    _store.write(path, todos)
+    assert path.read_bytes().startswith(b"}")
+    assert _store.read(path) == todos
+    with pytest.raises(ValueError):
+        _store.index_path(tmp_path, "xml")
+
+
+def test_command_line(installed, tmp_path):
+    config_dir = tmp_path.joinpath("todol")
+    assert (
+        main(["init", "--no-shell"], stdout=io.StringIO(), config_dir=config_dir) == 0
+    )
+    assert main(["add", "milk"], stdout=io.StringIO(), config_dir=config_dir) == 0
+    assert sys.modules["fake_todol_plugin"].added == ["milk"]
+    output = io.StringIO()
+    assert main(["list"], stdout=output, config_dir=config_dir) == 0
+    assert "MILK" in output.getvalue()
+    output = io.StringIO()
+    assert main(["finish", "milk"], stdout=output, config_dir=config_dir) == 0
+    assert "Plugin 'broken' failed on on_finish: broken" in output.getvalue()
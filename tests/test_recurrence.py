@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import datetime
+import itertools
+
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given
+from todol import _recurrence
+from todol.todo_objects import Todo
+
+rules = st.builds(
+    "{}{}".format, st.integers(min_value=1, max_value=400), st.sampled_from("dwmy")
+)
+dates = st.dates(max_value=datetime.date(9000, 1, 1))
+
+
+class TestRecurrence:
+    def test_rule(self):
+        assert _recurrence.rule("weekly") == "1w"
+        assert _recurrence.rule(" 2D ") == "2d"
+        assert _recurrence.rule("m") == "1m"
+        for invalid in ("", "0d", "1h", "-1d", "every day"):
+            with pytest.raises(ValueError, match="recurrence rule"):
+                _recurrence.rule(invalid)
+
+    @given(start=dates, every=rules)
+    def test_occurrences(self, start, every):
+        first, second, third = itertools.islice(
+            _recurrence.occurrences(start, every), 3
+        )
+        assert first == start < second < third
+        assert second == _recurrence.advance(start, every)
+
+    def test_month_ends(self):
+        occurrences = _recurrence.occurrences(datetime.date(2024, 1, 31), "1m")
+        assert [str(date) for date in itertools.islice(occurrences, 4)] == [
+            "2024-01-31",
+            "2024-02-29",
+            "2024-03-31",
+            "2024-04-30",
+        ]
+        assert _recurrence.advance(datetime.date(2024, 2, 29), "1y") == (
+            datetime.date(2025, 2, 28)
+        )
+        assert _recurrence.advance(datetime.date(2024, 11, 15), "3m") == (
+            datetime.date(2025, 2, 15)
+        )
+
+    def test_todo(self):
+        once = Todo({"todo": "once", "due_date": "2021-01-01"})
+        assert once.every is None
+        assert list(once.occurrences()) == [datetime.date(2021, 1, 1)]
+        daily = Todo({"todo": "daily", "due_date": "2021-01-01", "every": "1d"})
+        assert daily.every == "1d"
+        assert list(itertools.islice(daily.occurrences(), 1000))[-1] == (
+            datetime.date(2023, 9, 27)
+        )
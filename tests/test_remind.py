@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import datetime
+import threading
+
+import pytest
+from todol import _remind, _store
+from todol.todo_objects import Todo
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _todos(*todos):
+    return [Todo({"todo": name, "due_date": due_date}) for name, due_date in todos]
+
+
+class TestScheduler:
+    def test_due(self):
+        clock = Clock(datetime.datetime(2021, 1, 1, 12))
+        scheduler = _remind.Scheduler(at=datetime.time(9), clock=clock)
+        scheduler.update(
+            _todos(("b", "2021-01-03"), ("a", "2021-01-02"), ("late", "2020-12-31"))
+        )
+        assert len(scheduler) == 2  # Not overdue ones
+        assert scheduler.next_deadline() == datetime.datetime(2021, 1, 2, 9)
+        assert scheduler.due() == []
+        clock.now = datetime.datetime(2021, 1, 5)
+        assert [reminder.name for reminder in scheduler.due()] == ["a", "b"]
+        assert scheduler.next_deadline() is None
+
+    def test_update(self):
+        clock = Clock(datetime.datetime(2021, 1, 1))
+        scheduler = _remind.Scheduler(clock=clock)
+        scheduler.update(_todos(("a", "2021-01-02"), ("b", "2021-01-03")))
+        clock.now = datetime.datetime(2021, 1, 2, 12)
+        assert [reminder.name for reminder in scheduler.due()] == ["a"]
+        # "a" stays reminded of, "b" was finished and "c" is new
+        scheduler.update(_todos(("a", "2021-01-02"), ("c", "2021-01-04")))
+        assert len(scheduler) == 1
+        assert scheduler.next_deadline() == datetime.datetime(2021, 1, 4, 9)
+
+    def test_overdue(self):
+        scheduler = _remind.Scheduler(
+            overdue=True, clock=Clock(datetime.datetime(2021, 1, 1))
+        )
+        scheduler.update(_todos(("late", "2020-12-31")))
+        assert [reminder.name for reminder in scheduler.due()] == ["late"]
+
+    def test_removed_entries_are_compacted(self):
+        scheduler = _remind.Scheduler(clock=Clock(datetime.datetime(2021, 1, 1)))
+        for number in range(200):
+            scheduler.update(_todos((str(number), "2021-02-01")))
+        assert len(scheduler) == 1
+        assert len(scheduler._heap) <= 2 + 64  # pylint: disable=protected-access
+
+
+def test_time_of_day():
+    assert _remind.time_of_day("7:30") == datetime.time(7, 30)
+    assert _remind.time_of_day("18") == datetime.time(18)
+    with pytest.raises(ValueError, match="time of day"):
+        _remind.time_of_day("25:00")
+
+
+def _index(name, due_date):
+    return {"todos": [{"todo": name, "due_date": due_date}], "finished": []}
+
+
+def test_run(tmp_path):
+    path = tmp_path.joinpath("todos.json")
+    _store.write(path, _index("late", "2020-01-01"))
+    stop = threading.Event()
+    reminded = []
+
+    def notify(reminder):
+        reminded.append(reminder.name)
+        if len(reminded) == 1:
+            _store.write(path, _index("later", "2020-01-02"))
+        else:
+            stop.set()
+
+    thread = threading.Thread(
+        target=_remind.run,
+        args=(path, notify, _remind.Scheduler(overdue=True)),
+        kwargs={"poll": 0.01, "stop": stop},
+    )
+    thread.start()
+    thread.join(10)
+    stop.set()
+    assert reminded == ["late", "later"]
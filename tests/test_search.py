@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given
+from todol import _search, _store
+
+
+def _todo(name):
+    return {"todo": name, "due_date": "2021-01-01"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path.joinpath("todos.json")
+    _store.write(
+        path,
+        {
+            "todos": [_todo("pay invoice 42"), _todo("call mom")],
+            "finished": [_todo("send invoice to bob")],
+        },
+    )
+    return path
+
+
+def _names(path, query):
+    return [
+        data["todo"] for _, data in _search.search(path, query, _store.iter_data(path))
+    ]
+
+
+@given(text=st.text())
+def test_tokenize(text):
+    tokens = _search.tokenize(text)
+    assert len(tokens) == len(set(tokens))
+    assert all(token == token.lower() and token in text.lower() for token in tokens)
+
+
+class TestSearch:
+    def test_search(self, store):
+        assert _names(store, "invoice") == ["pay invoice 42", "send invoice to bob"]
+        assert _names(store, "INV bo") == ["send invoice to bob"]
+        assert _names(store, "nothing") == []
+        assert _names(store, "") == []
+
+    def test_incremental(self, store):
+        _names(store, "")  # Build the index
+        todos = _store.read(store)
+        todos["finished"].append(todos["todos"].pop(0))
+        todos["todos"].append(_todo("invoice again"))
+        _store.write(
+            store,
+            todos,
+            [
+                ("remove", "todos", _todo("pay invoice 42")),
+                ("add", "finished", _todo("pay invoice 42")),
+                ("add", "todos", _todo("invoice again")),
+            ],
+        )
+        assert list(_search.search(store, "invoice")) == [
+            ("finished", _todo("send invoice to bob")),
+            ("finished", _todo("pay invoice 42")),
+            ("todos", _todo("invoice again")),
+        ]
+
+    def test_stale(self, store):
+        _names(store, "")
+        store.write_text(
+            '{"todos": [{"todo": "edited", "due_date": "2021-01-01"}], "finished": []}'
+        )
+        with pytest.raises(ValueError):
+            list(_search.search(store, "edited"))
+        assert _names(store, "edited") == ["edited"]
+
+    def test_not_built(self, store):
+        _store.write(store, _store.read(store), [("add", "todos", _todo("invoice"))])
+        assert not _search.index_path(store).exists()
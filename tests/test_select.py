@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import datetime
+import fnmatch
+
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given
+from todol import _select, _utils
+from todol.todo_objects import Todo, TodoContainer
+
+names = st.text(alphabet="abc *?")
+dates = st.dates(datetime.date(2020, 1, 1), datetime.date(2020, 12, 31))
+
+
+def _todo(name, due_date="2021-01-01", **extra):
+    return Todo(dict({"todo": name, "due_date": str(due_date)}, **extra))
+
+
+@given(name=names, pattern=st.text(alphabet="abc*?"))
+def test_glob(name, pattern):
+    selector = _select.selector(f"name:{pattern!r}" if pattern else "name:''")
+    assert selector(_todo(name)) == fnmatch.fnmatchcase(name, pattern)
+
+
+@given(due=dates, start=dates, end=dates)
+def test_due(due, start, end):
+    todo = _todo("x", due)
+    assert _select.selector(f"due:{start}..{end}")(todo) == (start <= due <= end)
+    assert _select.selector(f"due:<{start}")(todo) == (due < start)
+    assert _select.selector(f"due:<={start}")(todo) == (due <= start)
+    assert _select.selector(f"due:>{start}")(todo) == (due > start)
+    assert _select.selector(f"due:>={start} due:..{end}")(todo) == (start <= due <= end)
+    assert _select.selector(f"due:{start}")(todo) == (due == start)
+
+
+def test_terms():
+    today = _utils.today()
+    standup = _todo("Standup notes", today - datetime.timedelta(days=1), id="7")
+    selector = _select.selector("'standup *' due:<today")
+    assert selector(standup)
+    assert not selector(_todo("standup notes", today))
+    assert not selector(_todo("weekly standup", "2020-01-01"))
+    assert _select.selector("re:'up\\b' id:3,7")(standup)
+    assert not _select.selector("id:3,7 id:3")(standup)
+    assert _select.selector("due:yesterday")(standup)
+    assert _select.selector("unknown:prefix*")(_todo("unknown:prefix!"))
+    for invalid in ("", "  ", "re:(", "due:someday", "due:<", "id:", "'unclosed"):
+        with pytest.raises(ValueError):
+            _select.selector(invalid)
+
+
+def test_pop_matching():
+    container = TodoContainer(
+        [_todo("standup 1"), _todo("review"), _todo("standup 2"), _todo("lunch")]
+    )
+    popped = container.pop_matching(_select.selector("standup*"))
+    assert [todo.name for todo in popped] == ["standup 1", "standup 2"]
+    assert [todo.name for todo in container] == ["review", "lunch"]
+    assert container.pop_matching(_select.selector("nothing")) == []
+    assert len(container) == 2
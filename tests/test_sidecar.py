@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+from contextlib import closing
+
+from todol import _sidecar, _store
+
+SIDECAR = _sidecar.Sidecar(
+    "test",
+    ".test",
+    1,
+    "CREATE TABLE IF NOT EXISTS names (section TEXT, name TEXT);",
+    ("names",),
+)
+
+
+def _add(connection, section, data):
+    connection.execute("INSERT INTO names VALUES (?, ?)", (section, data["todo"]))
+
+
+def _remove(connection, section, data):
+    connection.execute(
+        "DELETE FROM names WHERE section = ? AND name = ?", (section, data["todo"])
+    )
+
+
+def _names(store):
+    with closing(SIDECAR.connect(store)) as connection:
+        return connection.execute("SELECT section, name FROM names").fetchall()
+
+
+def _write(store, todos, changes):
+    previous = store.stat()
+    _store.write(store, todos, changes)
+    SIDECAR.apply(
+        store,
+        (previous.st_size, previous.st_mtime_ns),
+        changes,
+        _add,
+        _remove,
+        ("todos",),
+    )
+
+
+def test_sidecar(tmp_path):
+    store = tmp_path.joinpath("todos.json")
+    todo = {"todo": "a", "due_date": "2021-01-01"}
+    _store.write(store, {"todos": [todo], "finished": []})
+    _write(store, {"todos": [], "finished": []}, [("remove", "todos", todo)])
+    assert not SIDECAR.path(store).exists()  # Only built on demand
+
+    with SIDECAR.rebuilding(store) as connection:
+        _add(connection, "todos", todo)
+    with closing(SIDECAR.connect(store)) as connection:
+        assert SIDECAR.fresh(connection, store)
+    other = {"todo": "b", "due_date": "2021-01-01"}
+    _write(
+        store,
+        {"todos": [todo, other], "finished": [other]},
+        [("add", "todos", other), ("add", "finished", other)],
+    )
+    assert _names(store) == [("todos", "a"), ("todos", "b")]
+
+    # Out-of-band edits make it stale, and changes are no longer applied
+    _store.write(store, {"todos": [], "finished": []})
+    _write(store, {"todos": [], "finished": []}, [("remove", "todos", todo)])
+    with closing(SIDECAR.connect(store)) as connection:
+        assert not SIDECAR.fresh(connection, store)
+    assert _names(store) == [("todos", "a"), ("todos", "b")]
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given
+from todol import _snapshot, _store, _utils
+
+todo_dicts = st.lists(
+    st.fixed_dictionaries(
+        {"todo": st.text(), "due_date": st.dates().map(str)},
+        optional={"id": st.text()},
+    )
+)
+
+
+class TestSnapshot:
+    @given(todos=todo_dicts, finished=todo_dicts)
+    def test_roundtrip(self, todos, finished):
+        index = {"todos": todos, "finished": finished}
+        assert _snapshot.loads(_snapshot.dumps(index)) == index
+
+    @given(todos=todo_dicts)
+    def test_containers(self, todos):
+        containers = _snapshot.load_containers(
+            _snapshot.dumps({"todos": todos, "finished": []})
+        )
+        assert _utils.deserialize(containers["todos"]) == todos
+        assert [todo.due_date for todo in containers["todos"]] == [
+            _utils.iso_str_to_datetime(todo["due_date"]) for todo in todos
+        ]
+        assert not containers["finished"]
+
+    def test_invalid(self):
+        with pytest.raises(ValueError, match="truncated"):
+            _snapshot.loads(b"")
+        with pytest.raises(ValueError, match="magic"):
+            _snapshot.loads(b'{"todos": [], "finished": []}')
+        with pytest.raises(ValueError, match="version"):
+            _snapshot.loads(
+                _snapshot.MAGIC + b"\xff\xff" + _snapshot.dumps(_store.empty())[10:]
+            )
+
+
+class TestStore:
+    def test_index_path(self, tmp_path):
+        assert _store.index_path(tmp_path, "json").name == "todos.json"
+        assert _store.index_path(tmp_path, "snapshot").name == "todos.snap"
+        with pytest.raises(ValueError):
+            _store.index_path(tmp_path, "xml")
+
+    @pytest.mark.parametrize("store_format", sorted(_store.FORMATS))
+    def test_roundtrip(self, tmp_path, store_format):
+        path = _store.index_path(tmp_path, store_format)
+        index = {
+            "todos": [{"todo": "write tests", "due_date": "2021-01-01", "id": "1"}],
+            "finished": [{"todo": "write code", "due_date": "2020-12-31"}],
+        }
+        # The index (a link to its generation) and its sidecars
+        assert _store.write(path, index) == sum(
+            written.stat().st_size
+            for written in tmp_path.iterdir()
+            if written.is_file()
+        )
+        assert _store.read(path) == index
+        containers = _store.read_containers(path)
+        assert {
+            section: _utils.deserialize(container)
+            for section, container in containers.items()
+        } == index
+
+    def test_json_fallback(self, tmp_path):
+        index = {"todos": [{"todo": "migrate", "due_date": "2021-01-01"}]}
+        index["finished"] = []
+        _store.write(_store.index_path(tmp_path, "json"), index)
+        assert _store.read(_store.index_path(tmp_path, "snapshot")) == index
+        with pytest.raises(OSError):
+            _store.read(tmp_path.joinpath("nothing.json"))
+
+
+class TestLists:
+    def test_index_path(self, tmp_path):
+        assert _store.index_path(tmp_path, "json", "default").name == "todos.json"
+        assert _store.index_path(tmp_path, "snapshot", "work") == tmp_path.joinpath(
+            "lists", "work.snap"
+        )
+        for invalid in ("../work", ".hidden", "a/b", "-x"):
+            with pytest.raises(ValueError, match="list name"):
+                _store.index_path(tmp_path, "json", invalid)
+
+    def test_lists(self, tmp_path):
+        tmp_path.joinpath("lists").mkdir()
+        index = {"todos": [{"todo": "ship", "due_date": "2021-01-01"}]}
+        index["finished"] = []
+        _store.write(_store.index_path(tmp_path, "json", "work"), index)
+        _store.write(_store.index_path(tmp_path, "json", "home"), _store.empty())
+        assert list(_store.lists(tmp_path, "json")) == ["home", "work"]
+        _store.write(_store.index_path(tmp_path, "json"), _store.empty())
+        # Indexes in other formats are still listed
+        lists = _store.lists(tmp_path, "snapshot")
+        assert list(lists) == ["default", "home", "work"]
+        assert _store.counts(lists["work"]) == {"todos": 1, "finished": 0}
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import datetime
+
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given
+from todol import _stats, _store
+
+TODAY = datetime.date(2021, 6, 16)  # A Wednesday
+
+
+def _finished(name, due, finished_on):
+    return {
+        "todo": name,
+        "due_date": str(TODAY + datetime.timedelta(due)),
+        _stats.FINISHED_ON: str(TODAY + datetime.timedelta(finished_on)),
+    }
+
+
+finished_todos = st.lists(
+    st.builds(_finished, st.text(max_size=3), st.integers(-30, 30), st.integers(-30, 0))
+)
+
+
+def test_lateness():
+    assert _stats.lateness(_finished("a", -3, 0)) == (TODAY.toordinal(), 3)
+    assert _stats.lateness(_finished("a", 3, 0)) == (TODAY.toordinal(), 0)
+    assert _stats.lateness({"todo": "a", "due_date": "2021-06-16"}) is None
+    # Unparseable records are not counted, instead of breaking the statistics
+    assert _stats.lateness(dict(_finished("a", 0, 0), finished_on="garbage")) is None
+    assert _stats.lateness(dict(_finished("a", 0, 0), due_date="2021-6-16")) is None
+
+
+class TestAggregates:
+    @given(finished=finished_todos)
+    def test_roundtrip(self, finished):
+        aggregates = _stats.Aggregates.scan(finished)
+        assert _stats.Aggregates.loads(aggregates.dumps((1, 2))) == aggregates
+        assert aggregates.totals[0] == len(finished)
+
+    @given(finished=finished_todos, removed=st.integers(0, 10))
+    def test_uncount(self, finished, removed):
+        aggregates = _stats.Aggregates.scan(finished)
+        for data in finished[:removed]:
+            aggregates.count(data, -1)
+        assert aggregates == _stats.Aggregates.scan(finished[removed:])
+
+
+class TestSidecar:
+    def _write(self, path, finished, changes=None):
+        _store.write(path, {"todos": [], "finished": finished}, changes)
+
+    def test_incremental(self, tmp_path):
+        path = tmp_path.joinpath("todos.json")
+        finished = [_finished("a", -2, 0)]
+        self._write(path, finished)
+        _stats.summary(path, finished, TODAY)  # Built on demand
+        for days in range(1, 10):
+            data = _finished(str(days), 0, -days)
+            finished.append(data)
+            self._write(path, finished, [("add", "finished", data)])
+        self._write(path, finished[1:], [("remove", "finished", finished[0])])
+        summary = _stats.summary(path, today=TODAY, days=3, weeks=2)
+        assert summary.days == [
+            (TODAY - datetime.timedelta(2), 1),
+            (TODAY - datetime.timedelta(1), 1),
+            (TODAY, 0),
+        ]
+        assert summary.weeks == [
+            (datetime.date(2021, 6, 7), 7),
+            (datetime.date(2021, 6, 14), 2),
+        ]
+        assert summary[2:] == (9, 0, 0)
+        assert _stats.verify(path, finished[1:])
+
+    def test_invalid_records(self, tmp_path):
+        path = tmp_path.joinpath("todos.json")
+        finished = [_finished("a", -2, 0)]
+        self._write(path, finished)
+        _stats.summary(path, finished, TODAY)
+        invalid = dict(_finished("b", 0, 0), finished_on="garbage")
+        finished.append(invalid)
+        self._write(path, finished, [("add", "finished", invalid)])
+        assert _stats.summary(path, today=TODAY).finished == 1
+        assert _stats.verify(path, finished)
+
+    def test_stale(self, tmp_path):
+        path = tmp_path.joinpath("todos.json")
+        finished = [_finished("a", -2, 0)]
+        self._write(path, finished)
+        _stats.summary(path, finished, TODAY)
+        finished.append(_finished("b", -1, 0))
+        self._write(path, finished)  # Without changes
+        with pytest.raises(ValueError):
+            _stats.summary(path, today=TODAY)
+        assert not _stats.verify(path, finished)
+        summary = _stats.summary(path, today=TODAY, days=1, weeks=1)
+        assert summary == ([(TODAY, 2)], [(datetime.date(2021, 6, 14), 2)], 2, 2, 3)
+
+    @given(finished=finished_todos, days=st.integers(1, 40), weeks=st.integers(1, 6))
+    def test_summary(self, tmp_path_factory, finished, days, weeks):
+        path = tmp_path_factory.mktemp("stats").joinpath("todos.json")
+        self._write(path, finished)
+        summary = _stats.summary(path, finished, TODAY, days, weeks)
+        for day, count in summary.days:
+            assert count == sum(
+                data[_stats.FINISHED_ON] == str(day) for data in finished
+            )
+        assert summary.weeks[-1][0] == datetime.date(2021, 6, 14)
+        assert sum(count for _, count in summary.weeks) == sum(
+            data[_stats.FINISHED_ON] >= str(summary.weeks[0][0]) for data in finished
+        )
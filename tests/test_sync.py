@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import collections
+import copy
+from unittest import mock
+
+import hypothesis.strategies as st
+from hypothesis import given
+from todol import _journal, _store, _sync
+
+names = st.lists(st.sampled_from("abcdef"), max_size=8)
+
+
+def _todo(name):
+    return {"todo": name, "due_date": "2021-01-01"}
+
+
+def _index(todos=(), finished=()):
+    return {
+        "todos": [_todo(name) for name in todos],
+        "finished": [_todo(name) for name in finished],
+    }
+
+
+def _base(todos):
+    return collections.Counter(
+        _sync.digest(section, data)
+        for section in _store.SECTIONS
+        for data in todos[section]
+    )
+
+
+def _merged(base, local, remote):
+    result = _sync.merge(_base(base), local, remote)
+    _journal.apply(local, result.local)
+    _journal.apply(remote, result.remote)
+    assert _base(local) == _base(remote)
+    return {
+        section: sorted(data["todo"] for data in local[section]) for section in local
+    }
+
+
+class TestMerge:
+    def test_concurrent_changes(self):
+        base = _index("abc")
+        local = _index("abd", finished="c")  # Finished c, added d
+        remote = _index("bce")  # Removed a, added e
+        assert _merged(base, local, remote) == {
+            "todos": ["b", "d", "e"],
+            "finished": ["c"],
+        }
+
+    def test_same_change(self):
+        base = _index("ab")
+        assert _merged(base, _index("a", "b"), _index("a", "b")) == {
+            "todos": ["a"],
+            "finished": ["b"],
+        }
+
+    def test_first_sync(self):
+        assert _merged(_index(), _index("ab"), _index("bc")) == {
+            "todos": ["a", "b", "c"],
+            "finished": [],
+        }
+
+    @given(base=names, local=names, remote=names)
+    def test_unchanged_side(self, base, local, remote):
+        # Whatever changed on one side wins if the other didn't change
+        assert _merged(_index(base), _index(local), _index(base))["todos"] == sorted(
+            local
+        )
+        assert _merged(_index(base), _index(base), _index(remote))["todos"] == sorted(
+            remote
+        )
+
+
+def _skipping(todos, changes):
+    # Like syncing does: removals of records no longer there are skipped
+    for action, section, data in changes:
+        if action == "add":
+            todos[section].append(data)
+        elif data in todos[section]:
+            todos[section].remove(data)
+
+
+@given(base=names, local=names, remote=names)
+def test_merge_changes(base, local, remote):
+    # Merging the changes of each side gives the same as merging the indexes
+    base, local, remote = _index(base, base[::2]), _index(local), _index(remote)
+    expected = _merged(base, copy.deepcopy(local), copy.deepcopy(remote))
+    # What changed on each side: what brings the base to it
+    result = _sync.merge_changes(
+        _sync.merge(_base(base), base, local).local,
+        _sync.merge(_base(base), base, remote).local,
+    )
+    _skipping(local, result.local)
+    _skipping(remote, result.remote)
+    assert _base(local) == _base(remote)
+    assert {
+        section: sorted(data["todo"] for data in local[section]) for section in local
+    } == expected
+
+
+def _save(path, todos, changes):
+    previous = _journal.stamp(path)
+    _journal.apply(todos, changes)
+    _store.write(path, todos, changes)
+    _journal.record(path, "test", changes, previous)
+
+
+class TestSync:
+    def test_sync(self, tmp_path):
+        here = tmp_path.joinpath("here", "todos.json")
+        there = tmp_path.joinpath("there", "todos.json")
+        here.parent.mkdir()
+        _store.write(here, _index("ab"))
+
+        result = _sync.sync(here, there)
+        assert result.local == [] and len(result.remote) == 2
+        assert _store.read(there) == _index("ab")
+        assert _sync.sync(here, there) == ([], [])
+
+        _store.write(here, _index("a", "b"))
+        _store.write(there, _index("abc"))
+        _sync.sync(there, here)
+        assert _store.read(here) == _store.read(there)
+        assert _base(_store.read(here)) == _base(_index("ac", "b"))
+
+        # Undoable on either side
+        todos = _store.read(here)
+        entry, _ = _journal.step(here, todos)
+        assert entry["command"] == "sync"
+        assert todos == _index("a", "b")
+
+    def test_sync_changes(self, tmp_path):
+        here = tmp_path.joinpath("here", "todos.json")
+        there = tmp_path.joinpath("there", "todos.json")
+        here.parent.mkdir()
+        _store.write(here, _index("abc"))
+        _sync.sync(here, there)
+
+        todos = _store.read(here)
+        _save(here, todos, [("remove", "todos", _todo("a"))])
+        _save(here, todos, [("add", "todos", _todo("d"))])
+        todos = _store.read(there)
+        _save(there, todos, [("remove", "todos", _todo("b"))])
+        _save(there, todos, [("add", "finished", _todo("b"))])
+        # From the journals: neither index is compared as a whole
+        with mock.patch.object(_sync, "_counts", side_effect=AssertionError):
+            result = _sync.sync(here, there)
+            assert result.local == [
+                ("remove", "todos", _todo("b")),
+                ("add", "finished", _todo("b")),
+            ]
+            assert result.remote == [
+                ("remove", "todos", _todo("a")),
+                ("add", "todos", _todo("d")),
+            ]
+            assert _base(_store.read(here)) == _base(_store.read(there))
+            assert _base(_store.read(here)) == _base(_index("cd", "b"))
+            assert _sync.sync(there, here) == ([], [])
+
+        # Removed on both sides
+        for path in (here, there):
+            _save(path, _store.read(path), [("remove", "todos", _todo("c"))])
+        with mock.patch.object(_sync, "_counts", side_effect=AssertionError):
+            assert _sync.sync(here, there) == ([], [])
+        # Edited by hand: compared as a whole, against the base
+        todos = _store.read(there)
+        todos["todos"].remove(_todo("d"))
+        _store.write(there, todos)
+        result = _sync.sync(here, there)
+        assert result == ([("remove", "todos", _todo("d"))], [])
+        assert _store.read(here) == _store.read(there) == _index("", "b")
+
+    def test_compact(self, tmp_path):
+        here = tmp_path.joinpath("here", "todos.json")
+        there = tmp_path.joinpath("there", "todos.json")
+        here.parent.mkdir()
+        _store.write(here, _index("a"))
+        _sync.sync(here, there)
+        state = _sync.state_path(here, there)
+        for number in range(100):
+            for action in ("add", "remove"):
+                _save(here, _store.read(here), [(action, "todos", _todo(str(number)))])
+                _sync.sync(here, there)
+        # Rewritten once it was mostly additions and removals
+        assert state.stat().st_size < 100 * 17
+        assert _store.read(here) == _store.read(there) == _index("a")
+        # Still a base: removals on one side are kept
+        _save(there, _store.read(there), [("remove", "todos", _todo("a"))])
+        _store.write(here, _store.read(here))  # Out of band
+        _sync.sync(here, there)
+        assert _store.read(here) == _store.read(there) == _index()
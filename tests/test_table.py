@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import hypothesis.strategies as st
+from hypothesis import given
+from todol import _table
+
+
+class TestWidth:
+    def test_ascii(self):
+        assert _table.width("buy milk") == 8
+
+    def test_wide(self):
+        assert _table.width("買い物") == 6
+        assert _table.width("ｆｕｌｌ") == 8
+
+    def test_combining(self):
+        assert _table.width("e\N{COMBINING ACUTE ACCENT}") == 1
+        assert _table.width("a\N{ZERO WIDTH SPACE}b") == 2
+
+
+class TestFit:
+    def test_fits(self):
+        assert _table.fit("milk", 4) == ("milk", 4)
+
+    def test_ellipsis(self):
+        assert _table.fit("buy milk", 5) == ("buy " + _table.ELLIPSIS, 5)
+
+    def test_wide_boundary(self):
+        # A wide character never straddles the limit
+        assert _table.fit("買い物", 4) == ("買" + _table.ELLIPSIS, 3)
+
+    @given(text=st.text(), limit=st.integers(0, 50))
+    def test_limit(self, text, limit):
+        fitted, used = _table.fit(text, limit)
+        assert used == _table.width(fitted) <= limit
+
+
+def test_printable():
+    assert _table.printable("two\nlines") == "two\\nlines"
+    assert _table.printable("買い物") == "買い物"
+
+
+class TestRender:
+    def test_aligned(self):
+        rows = [("milk", "due at 2021-06-16"), ("買い物", "due at 2021-06-17")]
+        assert _table.render(rows, 80, prefix=" - ") == (
+            " - milk    due at 2021-06-16\n - 買い物  due at 2021-06-17\n"
+        )
+
+    def test_empty(self):
+        assert _table.render([], 80) == ""
+        assert _table.render([("milk", "", "")], 80) == "milk\n"
+
+    def test_styles(self):
+        rendered = _table.render([("milk", "")], 80, styles=["<"], reset=">")
+        assert rendered == "<milk>\n"
+
+    @given(
+        names=st.lists(st.text(min_size=1).map(_table.printable), min_size=1),
+        max_width=st.integers(40, 200),
+    )
+    def test_max_width(self, names, max_width):
+        rows = [(name, "due at 2021-06-16") for name in names]
+        lines = _table.render(rows, max_width, prefix=" - ").splitlines()
+        assert len(lines) == len(names)
+        assert all(_table.width(line) < max_width for line in lines)
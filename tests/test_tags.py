@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given
+from todol import _tags
+from todol.todo_objects import TodoContainer
+
+tag_names = st.sampled_from(("work", "home", "urgent", "later"))
+todo_dicts = st.lists(
+    st.fixed_dictionaries(
+        {"todo": st.text(), "due_date": st.just("2021-01-01")},
+        optional={
+            "tags": st.lists(tag_names, unique=True),
+            "priority": st.sampled_from(_tags.PRIORITIES),
+        },
+    )
+)
+
+
+def _todo(name, *tags, priority=None):
+    data = {"todo": name, "due_date": "2021-01-01", "tags": list(tags)}
+    if priority:
+        data["priority"] = priority
+    return data
+
+
+def test_tag():
+    assert _tags.tag(" #Work") == "work"
+    assert _tags.tag("+home") == "home"
+    for invalid in ("", "#", "two words"):
+        with pytest.raises(ValueError):
+            _tags.tag(invalid)
+
+
+@given(mask=st.integers(min_value=0, max_value=2**300))
+def test_positions(mask):
+    assert sum(1 << position for position in _tags.TagIndex.positions(mask)) == mask
+
+
+class TestTagIndex:
+    @given(
+        todos=todo_dicts,
+        tags=st.lists(tag_names, max_size=2),
+        excluded=st.lists(tag_names, max_size=2),
+        priorities=st.lists(st.sampled_from(_tags.PRIORITIES), max_size=2),
+    )
+    def test_filter(self, todos, tags, excluded, priorities):
+        expected = [
+            data
+            for data in todos
+            if set(tags) <= set(data.get("tags", ()))
+            and not set(excluded) & set(data.get("tags", ()))
+            and (not priorities or data.get("priority") in priorities)
+        ]
+        assert _tags.TagIndex(todos).filter(todos, tags, excluded, priorities) == (
+            expected
+        )
+        assert [
+            data for data in todos if _tags.matches(data, tags, excluded, priorities)
+        ] == expected
+
+    def test_container(self):
+        container = TodoContainer(
+            [
+                _todo("fix bug", "work", "urgent", priority="high"),
+                _todo("report", "work", priority="low"),
+                _todo("groceries", "home"),
+            ]
+        )
+        assert [todo.name for todo in container.filter(["work"])] == [
+            "fix bug",
+            "report",
+        ]
+        assert container.tag_index.tags() == ["home", "urgent", "work"]
+        container.add_todo(_todo("deploy", "work", priority="high"))
+        assert [
+            todo.name for todo in container.filter(["work"], ["urgent"], ["high"])
+        ] == ["deploy"]
+        assert container.pop(0).tags == ["work", "urgent"]
+        assert [todo.priority for todo in container.filter(priorities=["high"])] == [
+            "high"
+        ]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# pylint: disable=C,R0201,R0903
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given
+from todol import _tree
+from todol.todo_objects import TodoContainer
+
+NAMES = ("a", "b", "c", "d", "e", "f")
+forests = st.lists(
+    st.fixed_dictionaries(
+        {"todo": st.sampled_from(NAMES), "due_date": st.just("2021-01-01")},
+        optional={"parent": st.sampled_from(NAMES + ("missing",))},
+    )
+)
+
+
+def _todo(name, parent=None):
+    data = {"todo": name, "due_date": "2021-01-01"}
+    if parent:
+        data["parent"] = parent
+    return data
+
+
+def _descendants(todos, position):
+    """Every position under `position`, found by scanning each level"""
+    first = {}
+    for found, data in enumerate(todos):
+        first.setdefault(data["todo"], found)
+    found, level = {position}, [position]
+    while level:
+        level = [
+            child
+            for child, data in enumerate(todos)
+            if first.get(data.get("parent"), child) in level and child not in found
+        ]
+        found.update(level)
+    return found
+
+
+@given(todos=forests)
+def test_walk(todos):
+    index = _tree.TreeIndex(todos)
+    walked = list(index.walk())
+    # Every todo exactly once, whatever the cycles
+    assert sorted(position for _, position in walked) == list(range(len(todos)))
+    for (depth, position), (next_depth, _) in zip(walked, walked[1:]):
+        assert next_depth <= depth + 1
+    for depth, position in walked:
+        if depth:
+            assert todos[position]["parent"] in NAMES
+
+
+@given(todos=forests, data=st.data())
+def test_subtree(todos, data):
+    if not todos:
+        return
+    position = data.draw(st.integers(min_value=0, max_value=len(todos) - 1))
+    subtree = _tree.TreeIndex(todos).subtree(position)
+    assert subtree[0] == position
+    assert len(set(subtree)) == len(subtree)
+    assert set(subtree) == _descendants(todos, position)
+
+
+def test_container():
+    container = TodoContainer(
+        [
+            _todo("report"),
+            _todo("outline", "report"),
+            _todo("groceries"),
+            _todo("sources", "outline"),
+            _todo("draft", "report"),
+            _todo("orphan", "finished already"),
+        ]
+    )
+    assert [(depth, todo.name) for depth, todo in container.tree()] == [
+        (0, "report"),
+        (1, "outline"),
+        (2, "sources"),
+        (1, "draft"),
+        (0, "groceries"),
+        (0, "orphan"),
+    ]
+    assert container.get("sources", fuzzy_limit=0).parent == "outline"
+    assert [todo.name for todo in container.subtree(list(container)[1])] == [
+        "outline",
+        "sources",
+    ]
+    container.add_todo(_todo("milk", "groceries"))
+    assert [todo.name for todo in container.pop_subtree(_todo("report"))] == [
+        "report",
+        "outline",
+        "sources",
+        "draft",
+    ]
+    assert [todo.name for todo in container] == ["groceries", "orphan", "milk"]
+    assert [depth for depth, _ in container.tree()] == [0, 1, 0]
+    with pytest.raises(IndexError):
+        container.pop_subtree(_todo("something else entirely"))
+
+
+def test_cycle():
+    index = _tree.TreeIndex([_todo("a", "b"), _todo("b", "a"), _todo("c", "c")])
+    assert list(index.walk()) == [(0, 2), (0, 0), (1, 1)]
+    assert index.subtree(1) == [1, 0]
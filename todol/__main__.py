@@ -11,16 +11,53 @@ The main cli entry point
 
 """
 import argparse
-import json
+import contextlib
+import itertools
 import os
+import shlex
+import subprocess
 import sys
+from datetime import date
 from pathlib import Path
-from typing import Dict, List
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from . import __version__
 from . import _interface as intf
-from . import _utils, todo_objects
-from ._opts import color_options, due_date_options
+from . import (
+    _agenda,
+    _completion,
+    _dedupe,
+    _exchange,
+    _journal,
+    _jsonl,
+    _metrics,
+    _mmap_index,
+    _plugins,
+    _recurrence,
+    _remind,
+    _search,
+    _select,
+    _stats,
+    _store,
+    _sync,
+    _table,
+    _tags,
+    _tree,
+    _utils,
+    todo_objects,
+)
+from ._opts import color_options, due_date_options, json_options
 
 parser = argparse.ArgumentParser(
     description="A todo list CLI tool",
@@ -28,14 +65,30 @@ parser = argparse.ArgumentParser(
     formatter_class=argparse.ArgumentDefaultsHelpFormatter,
     parents=[color_options],
 )
+# Its own (not suppressed) --json, since parent parsers share their actions
+parser.add_argument(
+    "--json",
+    action="store_true",
+    help="Write JSON lines (one object per todo or result) instead of text",
+    dest="json",
+)
 parser.add_argument(
     "--version", action="version", version="%(prog)s {}".format(__version__)
 )
 
+parser.add_argument(
+    "--list",
+    "-L",
+    help="The named list to use. Lists are created when todos are first added to them",
+    default=os.environ.get("TODOL_LIST", ""),
+    metavar="NAME",
+    dest="list_name",
+)
+
 subparsers = parser.add_subparsers(dest="command")
 
 list_parser = subparsers.add_parser(
-    "list", help="List todos", aliases=("l"), parents=[color_options]
+    "list", help="List todos", aliases=("l"), parents=[color_options, json_options]
 )
 list_display_choices = list_parser.add_mutually_exclusive_group()
 list_display_choices.add_argument(
@@ -52,8 +105,57 @@ list_display_choices.add_argument(
     dest="show_all",
 )
 
+list_parser.add_argument(
+    "--tag",
+    "-t",
+    help="Only show todos with this tag. Can be repeated to require several",
+    type=_tags.tag,
+    action="append",
+    default=[],
+    dest="filter_tags",
+)
+list_parser.add_argument(
+    "--not",
+    help="Hide todos with this tag. Can be repeated",
+    type=_tags.tag,
+    action="append",
+    default=[],
+    metavar="TAG",
+    dest="excluded_tags",
+)
+list_parser.add_argument(
+    "--priority",
+    "-p",
+    help="Only show todos with this priority. Can be repeated to allow several",
+    choices=_tags.PRIORITIES,
+    action="append",
+    default=[],
+    dest="priorities",
+)
+list_parser.add_argument(
+    "--until",
+    help="Also show the occurrences of recurring todos due up to this date (YYYY-MM-DD)",
+    type=_utils.iso_str_to_datetime,
+    default=None,
+    dest="until",
+)
+list_parser.add_argument(
+    "--limit",
+    "-n",
+    help="Show at most this many todos of each kind",
+    type=int,
+    default=None,
+    dest="limit",
+)
+list_parser.add_argument(
+    "--tree",
+    help="Show subtasks indented under the todos they belong to",
+    action="store_true",
+    dest="tree",
+)
+
 init_parser = subparsers.add_parser(
-    "init", help="Initialize todol", parents=[color_options]
+    "init", help="Initialize todol", parents=[color_options, json_options]
 )
 init_parser.add_argument(
     "--no-shell",
@@ -63,38 +165,265 @@ init_parser.add_argument(
 )
 
 add_parser = subparsers.add_parser(
-    "add", help="Add a todo", aliases=("a"), parents=[color_options, due_date_options]
+    "add",
+    help="Add a todo",
+    aliases=("a"),
+    parents=[color_options, json_options, due_date_options],
 )
 add_parser.add_argument("todo", help="The todo to add.", type=_utils.sim_str)
+add_parser.add_argument(
+    "--tag",
+    "-t",
+    help="Tag the todo. Can be repeated",
+    type=_tags.tag,
+    action="append",
+    default=[],
+    dest="tags",
+)
+add_parser.add_argument(
+    "--priority",
+    "-p",
+    help="The priority of the todo",
+    choices=_tags.PRIORITIES,
+    default=None,
+    dest="priority",
+)
+add_parser.add_argument(
+    "--every",
+    help="Make the todo recur, e.g. every 1d, 2w, 1m (month), 1y, daily or weekly",
+    type=_recurrence.rule,
+    default=None,
+    dest="every",
+)
+add_parser.add_argument(
+    "--dedupe",
+    help="Look for similar todos first, and ask before adding a likely duplicate",
+    action="store_true",
+    dest="dedupe",
+)
+add_parser.add_argument(
+    "--parent",
+    "-P",
+    help="Make the todo a subtask of this one. Will be fuzzy matched",
+    default=None,
+    dest="parent",
+)
 
 
 remove_parser = subparsers.add_parser(
     "remove",
     help="Remove todo(s) without finishing them",
     aliases=("r", "remove"),
-    parents=[color_options, due_date_options],
+    parents=[color_options, json_options, due_date_options],
 )
 remove_parser.add_argument(
     "todo",
-    help="The todo to remove. Will be fuzzy matched or matched by ID/date/etc",
+    nargs="?",
+    default=None,
+    help="The todo to remove, along with its subtasks. "
+    "Will be fuzzy matched or matched by ID/date/etc",
+)
+remove_parser.add_argument(
+    "--select",
+    "-s",
+    help="Remove every todo matching this selector instead, e.g. "
+    "'standup*' due:<today (see the docs of todol._select)",
+    type=_select.selector,
+    default=None,
+    dest="select",
+)
+remove_parser.add_argument(
+    "--dry-run",
+    "-n",
+    help="Only show the todos that would be removed",
+    action="store_true",
+    dest="dry_run",
 )
 
 finish_parser = subparsers.add_parser(
     "finish",
     help="Finish todo(s)",
     aliases=("f", "do"),
-    parents=[color_options, due_date_options],
+    parents=[color_options, json_options, due_date_options],
 )
 finish_parser.add_argument(
     "todo",
-    help="The todo to finish. Will be fuzzy matched or matched by ID/date/etc",
+    nargs="?",
+    default=None,
+    help="The todo to finish, along with its subtasks. "
+    "Will be fuzzy matched or matched by ID/date/etc",
+)
+finish_parser.add_argument(
+    "--select",
+    "-s",
+    help="Finish every todo matching this selector instead, e.g. "
+    "'standup*' due:<today (see the docs of todol._select)",
+    type=_select.selector,
+    default=None,
+    dest="select",
+)
+finish_parser.add_argument(
+    "--dry-run",
+    "-n",
+    help="Only show the todos that would be finished",
+    action="store_true",
+    dest="dry_run",
 )
 
+undo_parser = subparsers.add_parser(
+    "undo",
+    help="Undo the last add, remove, finish or import (see TODOL_UNDO_DEPTH)",
+    aliases=("u",),
+    parents=[color_options, json_options],
+)
+redo_parser = subparsers.add_parser(
+    "redo", help="Redo the last undone command", parents=[color_options, json_options]
+)
+
+search_parser = subparsers.add_parser(
+    "search",
+    help="Search todos, finished or not, by the words in their names",
+    aliases=("s",),
+    parents=[color_options, json_options],
+)
+search_parser.add_argument(
+    "query",
+    nargs="+",
+    help="Words to search for. Todos must contain all of them (or words starting with them)",
+)
+
+dedupe_parser = subparsers.add_parser(
+    "dedupe",
+    help="Find todos with similar names and merge them",
+    parents=[color_options, json_options],
+)
+dedupe_parser.add_argument(
+    "--yes",
+    "-y",
+    help="Merge every group of duplicates without asking",
+    action="store_true",
+    dest="yes",
+)
+dedupe_parser.add_argument(
+    "--threshold",
+    help="How alike (from 0 to 1) names must be to be duplicates. "
+    f"Defaults to {_dedupe.THRESHOLD}",
+    type=float,
+    default=_dedupe.THRESHOLD,
+    dest="threshold",
+)
+
+remind_parser = subparsers.add_parser(
+    "remind",
+    help="Keep running and remind of todos as they come due",
+    parents=[color_options, json_options],
+)
+remind_parser.add_argument(
+    "--at",
+    help="The time of day (HH:MM) to remind of todos on their due date",
+    type=_remind.time_of_day,
+    default="09:00",
+    dest="at",
+)
+remind_parser.add_argument(
+    "--command",
+    help="A command to run for each reminder, with the todo and its due date "
+    "as extra arguments, instead of printing it",
+    default=os.environ.get("TODOL_REMIND_COMMAND", ""),
+    dest="remind_command",
+)
+remind_parser.add_argument(
+    "--overdue",
+    action="store_true",
+    help="Also remind of todos that are already overdue when starting",
+    dest="overdue",
+)
+remind_parser.add_argument(
+    "--poll",
+    help="How often (in seconds) to check whether the todos changed",
+    type=float,
+    default=60,
+    dest="poll",
+)
+
+sync_parser = subparsers.add_parser(
+    "sync",
+    help="Merge the todos of another todol directory with these, both ways",
+    parents=[color_options, json_options],
+)
+sync_parser.add_argument(
+    "directory",
+    help="The other todol directory, e.g. a synced folder. The same list is synced",
+    type=Path,
+)
+
+agenda_parser = subparsers.add_parser(
+    "agenda",
+    help="Show todos grouped into overdue, today, tomorrow, this week and later",
+    aliases=("ag",),
+    parents=[color_options, json_options],
+)
+
+stats_parser = subparsers.add_parser(
+    "stats",
+    help="Show how many todos were finished, and how late",
+    parents=[color_options, json_options],
+)
+stats_parser.add_argument(
+    "--days", type=int, default=7, help="The number of days to show"
+)
+stats_parser.add_argument(
+    "--weeks", type=int, default=4, help="The number of weeks to show"
+)
+stats_parser.add_argument(
+    "--rebuild",
+    action="store_true",
+    help="Rebuild the statistics from every finished todo, "
+    "checking the incrementally maintained ones",
+)
+
+lists_parser = subparsers.add_parser(
+    "lists",
+    help="Summarize every list without loading their todos",
+    parents=[color_options, json_options],
+)
+
+export_parser = subparsers.add_parser(
+    "export", help="Export all todos", parents=[color_options, json_options]
+)
+export_parser.add_argument(
+    "file",
+    nargs="?",
+    default="-",
+    help="The file to export to. Defaults to standard output",
+)
+export_parser.add_argument(
+    "--format",
+    choices=tuple(_exchange.FORMATS),
+    default=None,
+    help="The format to export as. Guessed from the file's extension by default",
+    dest="file_format",
+)
+
+import_parser = subparsers.add_parser(
+    "import", help="Import todos", parents=[color_options, json_options]
+)
+import_parser.add_argument(
+    "file", help="The file to import from. Use - for standard input"
+)
+import_parser.add_argument(
+    "--format",
+    choices=tuple(_exchange.FORMATS),
+    default=None,
+    help="The format to import. Guessed from the file's extension by default",
+    dest="file_format",
+)
 
 completion_parser = subparsers.add_parser(
     "complete",
     help="Generate shell completion. The pycomplete library must be installed, though.",
     aliases=("c", "completion"),
+    parents=[json_options],
 )
 completion_parser.add_argument(
     "shell",
@@ -103,109 +432,772 @@ completion_parser.add_argument(
     default=_utils.users_shell,
 )
 parser.set_defaults(no_shell=False)  # See line 244
-args = parser.parse_args()
 
 
-def main() -> None:  # TODO: REFACTOR this to an object
-    """The main entry point function."""
+def main(
+    argv: Optional[Sequence[str]] = None,
+    *,
+    stdout: Optional[IO[str]] = None,
+    config_dir: Optional[Union[str, Path]] = None,
+) -> int:
+    """The main entry point function.
+
+    Runs a single command in-process, so todol can be driven from Python
+    without spawning an interpreter per command.
+
+    Parameters
+    ----------
+    argv : Sequence[str], optional
+        The command line arguments (without the program name). Defaults to
+        ``sys.argv[1:]``.
+    stdout : IO[str], optional
+        Where to write the output, instead of ``sys.stdout``. It is swapped
+        in for the duration of the command, so it isn't thread-safe.
+    config_dir : Union[str, Path], optional
+        The todol directory. Defaults to ``TODOL_CONFIG_DIR`` or
+        ``~/.config/todol``.
 
-    todol_dir = Path(os.environ.get("TODOL_CONFIG_DIR", "~/.config/todol")).expanduser()
-    todo_index = todol_dir.joinpath("todos.json")
-    interface = intf.Color(no_color=args.no_color, force_color=args.force_color)  # type: ignore
+    Returns
+    -------
+    int
+        The exit code of the command.
+
+    """
+    with contextlib.redirect_stdout(stdout or sys.stdout):
+        try:
+            return _run(argv, config_dir)
+        except SystemExit as exception:  # From argparse (e.g. --help, bad usage)
+            code = exception.code
+            if code is None or isinstance(code, int):
+                return code or 0
+            print(code, file=sys.stderr)
+            return 1
+
+
+def _run(  # TODO: REFACTOR this to an object
+    argv: Optional[Sequence[str]], config_dir: Optional[Union[str, Path]]
+) -> int:
+    args = parser.parse_args(argv)
+    if getattr(args, "due_date", "") is None:  # Resolved now, not at import
+        args.due_date = str(_utils.tomorrow())
+    todol_dir = Path(
+        config_dir or os.environ.get("TODOL_CONFIG_DIR", "~/.config/todol")
+    ).expanduser()
+    interface = (
+        _jsonl.Interface()
+        if args.json  # type: ignore
+        else intf.Color(no_color=args.no_color, force_color=args.force_color)  # type: ignore
+    )
+    _plugins.set_cache_dir(todol_dir.joinpath("cache"))
+    try:
+        todo_index = _store.index_path(todol_dir, list_name=args.list_name)  # type: ignore
+    except ValueError as exception:
+        interface.softerror(str(exception))
+        return 1
 
     def _get_todo_data() -> Dict[str, List[Dict[str, str]]]:
         try:
-            todos: Dict[str, List[Dict[str, str]]] = json.loads(todo_index.read_text())
+            todos = _store.read(todo_index)
         except OSError:  # It doesn't exist
-            interface.softerror("Todol is not initialized!")
-            command_init()
-            todos = json.loads(todo_index.read_text())
-        assert isinstance(todos, dict)
+            if not todol_dir.is_dir():
+                interface.softerror("Todol is not initialized!")
+                command_init()
+            if todo_index.parent != todol_dir:  # A new named list
+                todo_index.parent.mkdir(exist_ok=True)
+                return _store.empty()
+            todos = _store.read(todo_index)
         return todos
 
+    def _save(
+        todos: Dict[str, List[Dict[str, str]]],
+        changes: List[_store.Change],
+        command: str,
+    ) -> None:
+        """Write `todos` and journal the `changes` `command` made so they can be undone"""
+        previous = _journal.stamp(todo_index)
+        _store.write(todo_index, todos, changes)
+        _journal.record(todo_index, command, changes, previous)
+        _emit_changes(changes)
+
+    def _emit(objects: Iterable[Dict[str, Any]]) -> None:
+        """Write `objects` as JSON lines, for --json"""
+        _jsonl.write(objects, sys.stdout)
+
+    def _emit_changes(changes: Iterable[_store.Change]) -> None:
+        if args.json:  # type: ignore
+            _emit(
+                {"action": action, "section": section, **data}
+                for action, section, data in changes
+            )
+
+    def _warn_failed(hook: str, failures: List[Tuple[str, Exception]]) -> None:
+        for name, exception in failures:
+            interface.warn(f"Plugin {name!r} failed on {hook}: {exception}")
+
+    def _fire(hook: str, data: Dict[str, str]) -> None:
+        """Call the plugins of `hook`, warning about (but surviving) their failures"""
+        _warn_failed(hook, _plugins.fire(hook, data))
+
+    Readable = Union[_mmap_index.MappedIndex, Dict[str, todo_objects.TodoContainer]]
+
+    def _read_todos() -> Tuple[Readable, Optional[_mmap_index.MappedIndex]]:
+        """The todos to display, and the memory map to close afterwards (if any)"""
+        # Prefer the memory-mapped sidecar: only the rendered todos get decoded
+        mapped = _mmap_index.open_for(todo_index)
+        if mapped is not None:
+            return mapped, mapped
+        try:
+            return _store.read_containers(todo_index), None
+        except OSError:  # It doesn't exist
+            return {
+                section: todo_objects.TodoContainer(items)
+                for section, items in _get_todo_data().items()
+            }, None
+
     def command_list() -> int:
-        todos = _get_todo_data()
+        todos, mapped = _read_todos()
+        filters = (args.filter_tags, args.excluded_tags, args.priorities)  # type: ignore
+        if any(filters):
+            # Filtered once, so in a single pass: building the bitset index
+            # would cost more than it saves
 
-        def show_todo() -> None:
-            for item in todo_objects.TodoContainer(todos["todos"]):
-                print(
-                    f" - {interface.BLUE}{item.name!r}{interface.RESET}, "
-                    f"{interface.RED}due at {interface.YELLOW}{item.due_date}{interface.RESET}"
-                )
+            def filtered(items: Any) -> List[todo_objects.Todo]:
+                if isinstance(items, _mmap_index.MappedSection):
+                    # Only the matching todos of the memory map get decoded
+                    return [
+                        todo_objects.Todo(data)
+                        for data in items.data()
+                        if _tags.matches(data, *filters)
+                    ]
+                return [item for item in items if _tags.matches(item.data, *filters)]
+
+            todos = {  # type: ignore
+                section: filtered(todos[section]) for section in _store.SECTIONS
+            }
+
+        depths: Dict[int, int] = {}
+
+        def walked(section: str) -> Iterable[todo_objects.Todo]:
+            # Through the adjacency index, parents before their subtasks
+            for depth, item in todo_objects.TodoContainer(todos[section]).tree():
+                depths[id(item)] = depth
+                yield item
+
+        def ordered(section: str) -> Iterable[todo_objects.Todo]:
+            return walked(section) if args.tree else todos[section]  # type: ignore
+
+        def indented(item: todo_objects.Todo) -> str:
+            return "  " * depths.get(id(item), 0) + _table.printable(item.name)
+
+        def due() -> Iterable[Tuple[todo_objects.Todo, date]]:
+            for item in ordered("todos"):
+                dates = item.occurrences()
+                yield item, next(dates)
+                # Further occurrences would break up the trees
+                if args.until is not None and not args.tree:  # type: ignore
+                    for occurrence in itertools.takewhile(
+                        lambda occurrence: occurrence <= args.until, dates  # type: ignore
+                    ):
+                        yield item, occurrence
+
+        if args.json:  # type: ignore
+            # Straight from the data, without plugin columns
+            def objects() -> Iterable[Dict[str, Any]]:
+                if not args.show_finished:  # type: ignore  # Also with --all
+                    for item, due_date in itertools.islice(due(), args.limit):  # type: ignore
+                        yield {
+                            "section": "todos",
+                            **item.data,
+                            "due_date": str(due_date),
+                            **({"depth": depths[id(item)]} if args.tree else {}),  # type: ignore
+                        }
+                if args.show_all or args.show_finished:  # type: ignore
+                    for item in itertools.islice(ordered("finished"), args.limit):  # type: ignore
+                        yield {
+                            "section": "finished",
+                            **item.data,
+                            **({"depth": depths[id(item)]} if args.tree else {}),  # type: ignore
+                        }
+
+            try:
+                _emit(objects())
+            finally:
+                if mapped is not None:
+                    mapped.close()
+            return 0
+
+        # Nothing is imported unless a plugin provides columns
+        providers, failures = _plugins.load("columns")
+        _warn_failed("columns", failures)
+
+        def labels(item: todo_objects.Todo) -> str:
+            return _tags.describe(item.data) or ""
+
+        def extra(item: todo_objects.Todo) -> Tuple[str, ...]:
+            return tuple(
+                _table.printable(str(provider(item.data) or ""))
+                for provider in providers
+            )
+
+        def todo_rows() -> Iterable[Tuple[str, ...]]:
+            # Occurrences are only generated as far as they are shown
+            for item, due_date in itertools.islice(due(), args.limit):  # type: ignore
+                every = "" if item.every is None else f"(every {item.every})"
+                yield (
+                    indented(item),
+                    f"due at {due_date}",
+                    every,
+                    labels(item),
+                ) + extra(item)
+
+        def finished_rows() -> Iterable[Tuple[str, ...]]:
+            for item in itertools.islice(ordered("finished"), args.limit):  # type: ignore
+                yield (indented(item), labels(item)) + extra(item)
+
+        def table(rows: Iterable[Tuple[str, ...]], *styles: str) -> str:
+            return _table.render(
+                rows,
+                interface.COLUMNS,
+                styles=styles,
+                reset=interface.RESET,
+                prefix=" - ",
+            )
+
+        bar = "-" * int(interface.COLUMNS / 3) + "\n"
+
+        def show_todo() -> str:
+            return table(
+                todo_rows(), interface.BLUE, interface.RED, "", interface.YELLOW
+            )
+
+        def show_finished() -> str:
+            return table(finished_rows(), interface.GREEN, interface.YELLOW)
 
-        def show_finished() -> None:
-            for item in todo_objects.TodoContainer(todos["finished"]):
-                print(f" - {interface.GREEN}{item.name!r}{interface.RESET}")
+        try:
+            # The whole listing is written at once
+            if not (args.show_all or args.show_finished):  # type: ignore
+                empty = "" if todos["todos"] else "\N{PARTY POPPER} No todos!\n"
+                listing = empty + show_todo()
+            elif args.show_finished:  # type: ignore
+                listing = show_finished()
+            else:
+                listing = show_todo() + show_finished()
+            sys.stdout.write(bar + listing + bar)
+        finally:
+            if mapped is not None:
+                mapped.close()
+        return 0
 
+    def command_agenda() -> int:
+        todos, mapped = _read_todos()
+        try:
+            agenda = _agenda.group(todos["todos"])
+            if args.json:  # type: ignore
+                _emit(
+                    {"bucket": bucket, **item.data}
+                    for bucket, items in agenda.items()
+                    for item in items
+                )
+                return 0
+        finally:
+            if mapped is not None:
+                mapped.close()
         print("-" * int(interface.COLUMNS / 3))
-        if not (args.show_all or args.show_finished):  # type: ignore
-            if not todos["todos"]:
-                print("\N{PARTY POPPER} No todos!")
-            show_todo()
-        elif args.show_finished:  # type: ignore
-            show_finished()
-        else:
-            show_todo()
-            show_finished()
+        if not any(agenda.values()):
+            print("\N{PARTY POPPER} No todos!")
+        for bucket, items in agenda.items():
+            if not items:
+                continue
+            color = interface.RED if bucket == "overdue" else interface.YELLOW
+            print(f"{color}{bucket.capitalize()}{interface.RESET}")
+            for item in items:
+                due = (
+                    ""
+                    if bucket in ("today", "tomorrow")
+                    else f", due at {item.due_date}"
+                )
+                print(f" - {interface.BLUE}{item.name!r}{interface.RESET}{due}")
         print("-" * int(interface.COLUMNS / 3))
         return 0
 
+    def command_stats() -> int:
+        finished = (
+            data
+            for section, data in _store.iter_data(todo_index)
+            if section == "finished"
+        )
+        try:
+            if args.rebuild:  # type: ignore
+                if _stats.verify(todo_index, finished):
+                    interface.success("The statistics match every finished todo")
+                else:
+                    interface.warn(
+                        "The statistics were out of date or wrong. Rebuilt them"
+                    )
+            summary = _stats.summary(
+                todo_index, finished, days=args.days, weeks=args.weeks  # type: ignore
+            )
+        except FileNotFoundError:
+            interface.error("Todol is not initialized!", 1)
+        if args.json:  # type: ignore
+            _emit(
+                [
+                    {
+                        "days": [
+                            {"date": day, "finished": count}
+                            for day, count in summary.days
+                        ],
+                        "weeks": [
+                            {"week_of": monday, "finished": count}
+                            for monday, count in summary.weeks
+                        ],
+                        "finished": summary.finished,
+                        "late": summary.late,
+                        "days_late": summary.days_late,
+                    }
+                ]
+            )
+            return 0
+
+        def counts(
+            buckets: List[Tuple[date, int]], label: Callable[[date], str]
+        ) -> str:
+            return _table.render(
+                ((label(day), str(count)) for day, count in buckets),
+                interface.COLUMNS,
+                styles=(interface.BLUE,),
+                reset=interface.RESET,
+                prefix=" - ",
+            )
+
+        bar = "-" * int(interface.COLUMNS / 3) + "\n"
+        late = (
+            f"{summary.late} of {summary.finished} finished late "
+            f"({summary.late / summary.finished:.0%}), "
+            f"by {summary.days_late / summary.late:.1f} days on average\n"
+            if summary.late
+            else f"None of {summary.finished} finished late\n"
+        )
+        sys.stdout.write(
+            bar
+            + f"{interface.GREEN}Finished per day{interface.RESET}\n"
+            + counts(summary.days, str)
+            + f"{interface.GREEN}Finished per week{interface.RESET}\n"
+            + counts(summary.weeks, lambda monday: f"week of {monday}")
+            + late
+            + bar
+        )
+        return 0
+
+    def _merge_duplicates(
+        todos: Dict[str, List[Dict[str, str]]], new_todo: Dict[str, str]
+    ) -> Optional[int]:
+        """Offer to merge `new_todo` into its likely duplicates, for add --dedupe
+
+        Returns the exit code if it was merged or not added, None to add it.
+        """
+        if not todo_index.exists():  # Not initialized or in another format
+            _store.write(todo_index, todos)
+        # Looked up in the buckets of the duplicate index, not by scanning
+        found = _dedupe.duplicates(todo_index, new_todo["todo"], todos["todos"])
+        if not found:
+            return None
+        for score, data in found:
+            interface.warn(
+                f"{data['todo']!r}, due at {data['due_date']}, is {score:.0%} alike"
+            )
+        # Never asked with --json, which would garble the output
+        if args.json:  # type: ignore
+            interface.softerror("Not added")
+            return 1
+        if _utils.yes_or_no("Merge it into them? ", default=False):
+            # Like `todol dedupe`: into the place of the first of them
+            duplicates = [data for _, data in found]
+            positions = [
+                position
+                for position, data in enumerate(todos["todos"])
+                if data in duplicates
+            ]
+            group = [todos["todos"][position] for position in positions]
+            merged = _dedupe.merge(group + [new_todo])
+            changes: List[_store.Change] = [("remove", "todos", data) for data in group]
+            changes.append(("add", "todos", merged))
+            todos["todos"][positions[0]] = merged
+            for position in reversed(positions[1:]):
+                del todos["todos"][position]
+            _save(todos, changes, "add")
+            interface.success(f"Merged into {merged['todo']!r}!")
+            return 0
+        if _utils.yes_or_no("Add it anyway? ", default=False):
+            return None
+        interface.softerror("Not added")
+        return 1
+
     def command_add() -> int:
         todos = _get_todo_data()
         assert isinstance(args.todo, str)  # type: ignore
 
         interface.info(f"Adding todo {args.todo!r} to the list of todos...")
         todo_obj = todo_objects.TodoContainer(todos["todos"])
-        todo_obj.add_todo({"todo": args.todo, "due_date": args.due_date})  # type: ignore
+        new_todo = {"todo": args.todo, "due_date": args.due_date}  # type: ignore
+        if args.every is not None:  # type: ignore
+            new_todo[_recurrence.KEY] = args.every  # type: ignore
+        if args.tags:  # type: ignore
+            new_todo[_tags.TAGS] = list(dict.fromkeys(args.tags))  # type: ignore
+        if args.priority is not None:  # type: ignore
+            new_todo[_tags.PRIORITY] = args.priority  # type: ignore
+        if args.parent is not None:  # type: ignore
+            parent = todo_obj.get(args.parent)  # type: ignore
+            if parent is None:
+                interface.error("Could not find the parent todo!", 1)
+            new_todo[_tree.PARENT] = parent.name  # type: ignore
+        if args.dedupe:  # type: ignore
+            returncode = _merge_duplicates(todos, new_todo)
+            if returncode is not None:
+                return returncode
+        todo_obj.add_todo(new_todo)
         todos["todos"] = _utils.deserialize(todo_obj)  # type: ignore
 
         # Actually add it to the the list of todos
-        todo_index.write_text(json.dumps(todos))
+        _save(todos, [("add", "todos", new_todo)], "add")
+        _fire("on_add", new_todo)
         interface.success("Done!")
         return 0
 
-    def command_remove() -> int:
-        todos = _get_todo_data()
-        assert isinstance(args.todo, str)  # type: ignore
-
-        interface.info(f"Removing todo {args.todo!r}...")
-        todo_obj = todo_objects.TodoContainer(todos["todos"])
+    def _targets(command_parser: argparse.ArgumentParser) -> str:
+        """What finish or remove acts on, for messages"""
+        if (args.todo is None) == (args.select is None):  # type: ignore
+            command_parser.error("give either a todo or a --select expression")
+        if args.select is not None:  # type: ignore
+            return f"the todos matching {args.select.expression!r}"  # type: ignore
+        return f"todo {args.todo!r}"  # type: ignore
 
+    def _pop_targets(todo_obj: todo_objects.TodoContainer) -> List[todo_objects.Todo]:
+        """Pop the todo given (with its subtasks), or every todo the selector matches"""
+        if args.select is not None:  # type: ignore
+            # Evaluated in a single pass, for a single write
+            popped = todo_obj.pop_matching(args.select)  # type: ignore
+            if not popped:
+                interface.error("No todos matched!", 1)
+            return popped
         try:
-            todo_obj.pop_thing({"todo": args.todo, "due_date": args.due_date})  # type: ignore
+            # Along with its subtasks
+            return todo_obj.pop_subtree({"todo": args.todo, "due_date": args.due_date})  # type: ignore
         except IndexError:
             interface.error("Could not find todo!", 1)
 
+    def _preview(popped: List[todo_objects.Todo], verb: str) -> int:
+        """Show the todos a dry run would have acted on"""
+        if args.json:  # type: ignore
+            _emit({"section": "todos", **item.data} for item in popped)
+            return 0
+        interface.info(f"Would {verb} {len(popped)} todo(s):")
+        sys.stdout.write(
+            _table.render(
+                (
+                    (_table.printable(item.name), f"due at {item.due_date}")
+                    for item in popped
+                ),
+                interface.COLUMNS,
+                styles=(interface.BLUE, interface.RED),
+                reset=interface.RESET,
+                prefix=" - ",
+            )
+        )
+        return 0
+
+    def command_remove() -> int:
+        todos = _get_todo_data()
+        interface.info(f"Removing {_targets(remove_parser)}...")
+        todo_obj = todo_objects.TodoContainer(todos["todos"])
+        removed = _pop_targets(todo_obj)
+        if args.dry_run:  # type: ignore
+            return _preview(removed, "remove")
+        todos["todos"] = _utils.deserialize(todo_obj)  # type: ignore
+        # Actually add it to the index
+        _save(todos, [("remove", "todos", item.data) for item in removed], "remove")
+        if args.select is not None:  # type: ignore
+            interface.success(f"Done! Removed {len(removed)} todo(s)")
         else:
-            todos["todos"] = _utils.deserialize(todo_obj)  # type: ignore
-            # Actually add it to the index
-            todo_index.write_text(json.dumps(todos))
             interface.success("Done!")
-            return 0
+        return 0
 
     def command_finish() -> int:
         todos = _get_todo_data()
-        assert isinstance(args.todo, str)  # type: ignore
-
-        interface.info(f"Finishing todo {args.todo!r}...")
+        interface.info(f"Finishing {_targets(finish_parser)}...")
 
         todo_obj = todo_objects.TodoContainer(todos["todos"])
         finished_obj = todo_objects.TodoContainer(todos["finished"])
+        popped = _pop_targets(todo_obj)
+        if args.dry_run:  # type: ignore
+            return _preview(popped, "finish")
+        changes: List[_store.Change] = []
+        following: Optional[Dict[str, str]] = None
+        for finished in popped:
+            changes.append(("remove", "todos", finished.data))
+            if finished.every is not None:
+                # Move on to the next occurrence instead of storing any of them
+                advanced = dict(
+                    finished.data,
+                    due_date=str(
+                        _recurrence.advance(finished.due_date, finished.every)
+                    ),
+                )
+                todo_obj.add_todo(advanced)
+                changes.append(("add", "todos", advanced))
+                following = following or advanced
+                continue
+            # Recorded for the statistics
+            record = dict(finished.data, **{_stats.FINISHED_ON: str(_utils.today())})
+            finished_obj.add_todo(record)
+            changes.append(("add", "finished", record))
+        todos["finished"] = _utils.deserialize(finished_obj)  # type: ignore
+        todos["todos"] = _utils.deserialize(todo_obj)  # type: ignore
+
+        # Actually add it to the index
+        _save(todos, changes, "finish")
+        for finished in popped:
+            _fire("on_finish", finished.data)
+        if args.select is not None:  # type: ignore
+            interface.success(f"Done! Finished {len(popped)} todo(s)")
+        elif popped[0].every is not None:
+            assert following is not None
+            interface.success(f"Done! Next due at {following['due_date']}")
+        else:
+            interface.success("Done!")
+        return 0
+
+    def command_undo() -> int:
+        redo = args.command == "redo"  # type: ignore
+        todos = _get_todo_data()
         try:
-            finished_obj.add_todo(
-                todo_obj.pop_thing({"todo": args.todo, "due_date": args.due_date})  # type: ignore
+            stepped = _journal.step(todo_index, todos, redo=redo)
+        except ValueError as exception:
+            interface.error(f"Cannot {args.command}: {exception}", 1)  # type: ignore
+        if stepped is None:
+            interface.error(f"Nothing to {args.command}!", 1)  # type: ignore
+        entry, changes = stepped  # type: ignore
+        previous = _journal.stamp(todo_index)
+        _store.write(todo_index, todos, changes)
+        if previous is not None:
+            _journal.log(todo_index, changes, previous)
+        _emit_changes(changes)
+        names = ", ".join(sorted({repr(data["todo"]) for _, _, data in changes}))
+        interface.success(
+            f"{'Redid' if redo else 'Undid'} {entry['command']} of {names}"
+        )
+        return 0
+
+    def command_search() -> int:
+        if not todo_index.exists():  # Not initialized or in another format
+            _store.write(todo_index, _get_todo_data())
+        matches = _search.search(
+            todo_index, " ".join(args.query), _store.iter_data(todo_index)  # type: ignore
+        )
+        if args.json:  # type: ignore
+            _emit({"section": section, **data} for section, data in matches)
+            return 0
+        found = 0
+        print("-" * int(interface.COLUMNS / 3))
+        for section, data in matches:
+            found += 1
+            if section == "finished":
+                print(f" - {interface.GREEN}{data['todo']!r}{interface.RESET}")
+            else:
+                print(
+                    f" - {interface.BLUE}{data['todo']!r}{interface.RESET}, "
+                    f"{interface.RED}due at {interface.YELLOW}{data['due_date']}{interface.RESET}"
+                )
+        if not found:
+            print("No todos found!")
+        print("-" * int(interface.COLUMNS / 3))
+        return 0
+
+    def command_dedupe() -> int:
+        todos = _get_todo_data()
+        if not todo_index.exists():  # Not initialized or in another format
+            _store.write(todo_index, todos)
+        merges: Dict[Tuple[str, str], Dict[str, str]] = {}
+        merged: Dict[Tuple[str, str], int] = {}
+        changes: List[_store.Change] = []
+        skipped = 0
+
+        def key(data: Dict[str, str]) -> Tuple[str, str]:
+            return data["todo"], str(data["due_date"])
+
+        grouped = _dedupe.groups(todo_index, todos["todos"], args.threshold)  # type: ignore
+        for number, group in enumerate(grouped):
+            if args.json:  # type: ignore
+                # Only merged with --yes, as nothing is asked
+                _emit({"group": number, **data} for data in group)
+            else:
+                print("-" * int(interface.COLUMNS / 3))
+                for data in group:
+                    print(
+                        f" - {interface.BLUE}{data['todo']!r}{interface.RESET}, "
+                        f"{interface.RED}due at {interface.YELLOW}{data['due_date']}{interface.RESET}"
+                    )
+            if not (
+                args.yes  # type: ignore
+                or (not args.json and _utils.yes_or_no("Merge them? ", default=False))  # type: ignore
+            ):
+                skipped += 1
+                continue
+            merges[key(group[0])] = _dedupe.merge(group)
+            for data in group:
+                merged[key(data)] = merged.get(key(data), 0) + 1
+                changes.append(("remove", "todos", data))
+            changes.append(("add", "todos", merges[key(group[0])]))
+        if not grouped:
+            interface.success("No duplicates found!")
+            return 0
+
+        # Every group is merged in a single pass, into its first todo's place
+        remaining = []
+        for data in todos["todos"]:
+            if merged.get(key(data)):
+                merged[key(data)] -= 1
+                if key(data) in merges:
+                    remaining.append(merges.pop(key(data)))
+                continue
+            remaining.append(data)
+        if changes:
+            todos["todos"] = remaining
+            _save(todos, changes, "dedupe")
+        interface.success(
+            f"Merged {len(grouped) - skipped} of {len(grouped)} group(s)!"
+        )
+        return 0
+
+    def command_remind() -> int:
+        if not todo_index.exists():  # Not initialized or in another format
+            _store.write(todo_index, _get_todo_data())
+
+        def notify(reminder: _remind.Reminder) -> None:
+            if args.json and not args.remind_command:  # type: ignore
+                # Flushed right away: reminders come one at a time
+                _emit([{"todo": reminder.name, "due_date": reminder.due_date}])
+                return
+            if not args.remind_command:  # type: ignore
+                print(
+                    f"\a\N{ALARM CLOCK} {interface.BLUE}{reminder.name!r}{interface.RESET} "
+                    f"{interface.RED}is due at {interface.YELLOW}{reminder.due_date}{interface.RESET}",
+                    flush=True,
+                )
+                return
+            command = shlex.split(args.remind_command)  # type: ignore
+            try:
+                subprocess.run(
+                    command + [reminder.name, str(reminder.due_date)], check=True
+                )
+            except (OSError, subprocess.CalledProcessError) as exception:
+                interface.softerror(f"Reminder command failed: {exception}")
+
+        interface.info("Reminding of todos as they come due. Press Ctrl-C to stop")
+        try:
+            _remind.run(
+                todo_index,
+                notify,
+                _remind.Scheduler(at=args.at, overdue=args.overdue),  # type: ignore
+                poll=args.poll,  # type: ignore
             )
-        except IndexError:
-            interface.error("Could not find todo!", 1)
-        else:
-            todos["finished"] = _utils.deserialize(finished_obj)  # type: ignore
-            todos["todos"] = _utils.deserialize(todo_obj)  # type: ignore
+        except KeyboardInterrupt:
+            pass
+        return 0
 
-            # Actually add it to the index
-            todo_index.write_text(json.dumps(todos))
-            interface.success("Done!")
+    def command_sync() -> int:
+        if not todol_dir.is_dir():
+            interface.softerror("Todol is not initialized!")
+            command_init()
+        other_dir = args.directory.expanduser()  # type: ignore
+        other_index = _store.index_path(other_dir, list_name=args.list_name)  # type: ignore
+        interface.info(f"Syncing with {other_dir}...")
+        result = _sync.sync(todo_index, other_index)
+        if args.json:  # type: ignore
+            _emit(
+                {"side": side, "action": action, "section": section, **data}
+                for side, changes in (("here", result.local), ("there", result.remote))
+                for action, section, data in changes
+            )
             return 0
 
+        def summary(changes: List[_store.Change]) -> str:
+            added = sum(action == "add" for action, _, _ in changes)
+            return f"{added} added, {len(changes) - added} removed"
+
+        interface.success(
+            f"Done! Here: {summary(result.local)}. There: {summary(result.remote)}"
+        )
+        return 0
+
+    def command_lists() -> int:
+        if args.json:  # type: ignore
+            _emit(
+                {"list": name, **_store.counts(path), "current": path == todo_index}
+                for name, path in _store.lists(todol_dir).items()
+            )
+            return 0
+        print("-" * int(interface.COLUMNS / 3))
+        for name, path in _store.lists(todol_dir).items():
+            counts = _store.counts(path)
+            marker = "*" if path == todo_index else " "
+            print(
+                f"{marker} {interface.BLUE}{name}{interface.RESET}: "
+                f"{counts['todos']} todo(s), "
+                f"{interface.GREEN}{counts['finished']} finished{interface.RESET}"
+            )
+        print("-" * int(interface.COLUMNS / 3))
+        return 0
+
+    def command_export() -> int:
+        file_format = args.file_format or _exchange.guess_format(args.file)  # type: ignore
+        try:
+            records = _store.iter_data(todo_index)
+            lines = _exchange.dump(
+                records,
+                file_format,
+                # On stderr, so exporting to stdout isn't garbled
+                lambda message: interface.warn(message, err=True),
+            )
+            if args.file == "-":  # type: ignore
+                sys.stdout.writelines(lines)
+            else:
+                with open(args.file, "w", newline="") as output:  # type: ignore
+                    output.writelines(lines)
+        except FileNotFoundError:
+            interface.error("Todol is not initialized!", 1)
+        return 0
+
+    def command_import() -> int:
+        file_format = args.file_format or _exchange.guess_format(args.file)  # type: ignore
+        todos = _get_todo_data()
+        counts = {section: 0 for section in _store.SECTIONS}
+        changes: List[_store.Change] = []
+
+        def add_all(lines: Iterable[str]) -> None:
+            for section, data in _exchange.load(lines, file_format):
+                todos[section].append(data)
+                changes.append(("add", section, data))
+                counts[section] += 1
+
+        interface.info(f"Importing todos from {args.file}...")  # type: ignore
+        if args.file == "-":  # type: ignore
+            add_all(sys.stdin)
+        else:
+            try:
+                with open(args.file, newline="") as lines:  # type: ignore
+                    add_all(lines)
+            except OSError as exception:
+                interface.error(f"Could not read {args.file}: {exception.strerror}", 1)  # type: ignore
+
+        # Everything is added with a single write
+        _save(todos, changes, "import")
+        interface.success(
+            f"Imported {counts['todos']} todo(s) "
+            f"and {counts['finished']} finished todo(s)!"
+        )
+        return 0
+
     def command_init() -> int:
         """Initialize todol for the current user."""
 
@@ -216,11 +1208,16 @@ def main() -> None:  # TODO: REFACTOR this to an object
 
         if not (todo_index.is_file() and todo_index.exists()):
             interface.info("Creating todol index...")
-            todo_index.touch()  # Create todol.json
+            todo_index.parent.mkdir(exist_ok=True)  # For named lists
+            try:  # Carry over an index stored in another format
+                todos = _store.read(todo_index)
+            except OSError:
+                todos = _store.empty()
+            _store.write(todo_index, todos)
             interface.success()
 
-        if not todo_index.read_text():  # Empty
-            todo_index.write_text(R'{"todos":[], "finished":[]}')
+        if not todo_index.stat().st_size:  # Empty
+            _store.write(todo_index, _store.empty())
 
         if not args.no_shell:  # type: ignore  # default to False
             _utils.initialize_shell(__version__)
@@ -229,7 +1226,9 @@ def main() -> None:  # TODO: REFACTOR this to an object
 
     def command_complete() -> int:
         try:
-            import pycomplete  # type:ignore # pylint: disable=C0415
+            script = _completion.render_cached(
+                parser, args.shell, todol_dir.joinpath("cache")  # type: ignore
+            )
         except ModuleNotFoundError:
             interface.error(
                 "Pycomplete not installed! "
@@ -237,13 +1236,17 @@ def main() -> None:  # TODO: REFACTOR this to an object
                 1,
             )
         else:
-            completer = pycomplete.Completer(parser)  # type: ignore
-            print(completer.render(args.shell))  # type: ignore
+            if args.json:  # type: ignore
+                _emit([{"shell": args.shell, "script": script}])  # type: ignore
+            else:
+                print(script)
             return 0
 
     subcommands_map = {
         "list": command_list,
         "l": command_list,
+        "agenda": command_agenda,
+        "ag": command_agenda,
         "add": command_add,
         "a": command_add,
         "remove": command_remove,
@@ -252,23 +1255,57 @@ def main() -> None:  # TODO: REFACTOR this to an object
         "f": command_finish,
         "do": command_finish,
         "init": command_init,
+        "undo": command_undo,
+        "u": command_undo,
+        "redo": command_undo,
+        "search": command_search,
+        "s": command_search,
+        "dedupe": command_dedupe,
+        "remind": command_remind,
+        "sync": command_sync,
+        "stats": command_stats,
+        "lists": command_lists,
+        "export": command_export,
+        "import": command_import,
         "complete": command_complete,
         "c": command_complete,
     }
+    # Writers hold the lock from reading the index to publishing its next
+    # generation. Readers never take it, so they never wait for a writer
+    writers = {
+        command_add,
+        command_remove,
+        command_finish,
+        command_init,
+        command_undo,
+        command_import,
+        command_dedupe,
+    }
+    command = subcommands_map.get(args.command, parser.print_help)  # type: ignore
     try:
-        sys.exit(subcommands_map.get(args.command, parser.print_help)() or 0)  # type: ignore
+        with _metrics.timer("command"):
+            if command in writers:
+                with _store.lock(todo_index):
+                    returncode = command() or 0
+            else:
+                returncode = command() or 0
     except Exception as exception:  # pylint: disable=broad-except
         value = exception.args[0]  # type: ignore
-        if len(exception.args) == 1:  # type: ignore
+        if args.json:  # type: ignore
+            print(_jsonl.encode({"error": str(value)}), file=sys.stderr)
+            returncode = exception.args[1] if len(exception.args) == 2 else 1  # type: ignore
+        elif len(exception.args) == 1:  # type: ignore
             print(f"\N{COLLISION SYMBOL} {interface.RED}{value}{interface.RESET}")  # type: ignore
-            sys.exit(1)
-        assert len(exception.args) == 2  # type: ignore
-        returncode = exception.args[1]  # type: ignore
-        assert isinstance(value, str)  # type: ignore
-        assert isinstance(returncode, int)  # type: ignore
-        print(f"\N{COLLISION SYMBOL} {interface.RED}{value}{interface.RESET}")
-        sys.exit(returncode)
+            returncode = 1
+        else:
+            assert len(exception.args) == 2  # type: ignore
+            returncode = exception.args[1]  # type: ignore
+            assert isinstance(value, str)  # type: ignore
+            assert isinstance(returncode, int)  # type: ignore
+            print(f"\N{COLLISION SYMBOL} {interface.RED}{value}{interface.RESET}")
+    _metrics.flush(command=args.command, returncode=returncode)  # type: ignore
+    return returncode
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
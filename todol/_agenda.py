@@ -0,0 +1,50 @@
+"""Grouping todos into an agenda.
+
+Todos are put into buckets (overdue, today, tomorrow, the rest of this
+week, later) in a single pass: the bucket boundaries are computed once as
+day ordinals, and each todo's bucket is found by bisecting them with its
+due date's ordinal. The current date is resolved when grouping, not when
+todol is imported.
+
+"""
+import bisect as _bisect
+import datetime as _datetime
+from typing import Dict, Iterable, List, Optional
+
+from . import _utils
+from .todo_objects import Todo
+
+__all__ = ["BUCKETS", "boundaries", "group"]
+
+BUCKETS = ("overdue", "today", "tomorrow", "this week", "later")
+
+
+def boundaries(today: _datetime.date) -> List[int]:
+    """The ordinal of the first day of every bucket after the first one
+
+    Weeks end on Sundays. On Saturdays and Sundays, "this week" is empty.
+    """
+    first = today.toordinal()
+    next_week = first + 7 - today.weekday()
+    return [first, first + 1, first + 2, max(next_week, first + 2)]
+
+
+def group(
+    todos: Iterable[Todo], today: Optional[_datetime.date] = None
+) -> Dict[str, List[Todo]]:
+    """Group `todos` into :py:data:`BUCKETS`, keeping their order within each bucket
+
+    Parameters
+    ----------
+    todos : Iterable[Todo]
+        The todos to group.
+    today : datetime.date, optional
+        The date to group relative to. Defaults to the current date.
+
+    """
+    bounds = boundaries(today or _utils.today())
+    buckets: List[List[Todo]] = [[] for _ in BUCKETS]
+    bisect = _bisect.bisect_right
+    for todo in todos:
+        buckets[bisect(bounds, todo.due_date.toordinal())].append(todo)
+    return dict(zip(BUCKETS, buckets))
@@ -0,0 +1,229 @@
+"""Shell completion scripts.
+
+The static part (subcommands and options) is rendered by pycomplete. For
+the shells that support it, a hook is appended that completes the todo
+argument of ``finish`` and ``remove`` with the names of active todos by
+calling :py:mod:`todol._names`, which never loads the todo index itself.
+
+Rendering imports pycomplete and walks the whole parser, which is too slow
+for something that runs at every shell start, so :py:func:`render_cached`
+keeps the result per shell under the config directory. The cache is keyed
+on the todol version and a fingerprint of the parser's definition.
+
+"""
+import argparse as _argparse
+import hashlib as _hashlib
+import os as _os
+import re as _re
+import shlex as _shlex
+import sys as _sys
+import tempfile as _tempfile
+from pathlib import Path as _Path
+from typing import Callable, Dict, Optional
+
+from . import __version__, _metrics
+
+__all__ = ["DYNAMIC_COMMANDS", "fingerprint", "render", "render_cached"]
+
+# Subcommands (and their aliases) whose positional argument is an active todo
+DYNAMIC_COMMANDS = ("finish", "f", "do", "remove", "r")
+# Options of those subcommands that take a value
+_VALUE_OPTIONS = ("--due", "--due-date", "-d")
+
+_BASH_HOOK = """
+# Complete active todo names for {commands}
+_todol_names_complete()
+{{
+    local cur prev word com
+    cur="${{COMP_WORDS[COMP_CWORD]}}"
+    prev="${{COMP_WORDS[COMP_CWORD-1]}}"
+    for word in "${{COMP_WORDS[@]:1:COMP_CWORD-1}}"; do
+        if [[ $word != -* ]]; then
+            com=$word
+            break
+        fi
+    done
+    case "$com" in
+        ({pattern})
+        if [[ $cur != -* && " {value_options} " != *" $prev "* ]]; then
+            local IFS=$'\\n'
+            COMPREPLY=($({names} -- "$cur"))
+            COMPREPLY=("${{COMPREPLY[@]// /\\\\ }}")
+            return 0
+        fi
+        ;;
+    esac
+    {function} "$@"
+}}
+"""
+
+_ZSH_HOOK = """
+# Complete active todo names for {commands}
+_todol_names_complete()
+{{
+    local com word
+    for word in ${{words[@]:1:$CURRENT-2}}; do
+        if [[ $word != -* ]]; then
+            com=$word
+            break
+        fi
+    done
+    case "$com" in
+        ({pattern})
+        if [[ $PREFIX != -* && " {value_options} " != *" ${{words[$CURRENT-1]}} "* ]]; then
+            local -a names
+            names=("${{(@f)$({names} -- "$PREFIX")}}")
+            compadd -a names
+            return
+        fi
+        ;;
+    esac
+    {function} "$@"
+}}
+"""
+
+
+def _bash(script: str, names: str) -> Optional[str]:
+    registrations = _re.findall(r"^complete -o default -F (\S+) (\S+)$", script, _re.M)
+    if not registrations:
+        return None
+    hook = _BASH_HOOK.format(
+        commands=", ".join(DYNAMIC_COMMANDS),
+        pattern="|".join(DYNAMIC_COMMANDS),
+        value_options=" ".join(_VALUE_OPTIONS),
+        names=names,
+        function=registrations[0][0],
+    )
+    return hook + "".join(
+        f"complete -o default -F _todol_names_complete {prog}\n"
+        for _, prog in registrations
+    )
+
+
+def _zsh(script: str, names: str) -> Optional[str]:
+    prog = _re.search(r"^#compdef (\S+)", script, _re.M)
+    function = _re.search(r"^(\S+)\(\)$", script, _re.M)
+    if prog is None or function is None:
+        return None
+    hook = _ZSH_HOOK.format(
+        commands=", ".join(DYNAMIC_COMMANDS),
+        pattern="|".join(DYNAMIC_COMMANDS),
+        value_options=" ".join(_VALUE_OPTIONS),
+        names=names,
+        function=function.group(1),
+    )
+    return (
+        hook
+        + f"(( $+functions[compdef] )) && compdef _todol_names_complete {prog.group(1)}\n"
+    )
+
+
+def _fish(script: str, names: str) -> Optional[str]:
+    prog = _re.search(r"^complete -c (\S+)", script, _re.M)
+    if prog is None:
+        return None
+    return (
+        f"\n# Complete active todo names for {', '.join(DYNAMIC_COMMANDS)}\n"
+        f"complete -c {prog.group(1)} -f "
+        f"-n '__fish_seen_subcommand_from {' '.join(DYNAMIC_COMMANDS)}' "
+        f"-a '({names} -- (commandline -ct))'\n"
+    )
+
+
+_HOOKS: Dict[str, Callable[[str, str], Optional[str]]] = {
+    "bash": _bash,
+    "zsh": _zsh,
+    "fish": _fish,
+}
+
+
+def render(parser: _argparse.ArgumentParser, shell: str) -> str:
+    """Render the completion script of `parser` for `shell`.
+
+    Raises
+    ------
+    ModuleNotFoundError
+        pycomplete is not installed.
+
+    """
+    import pycomplete  # type: ignore # pylint: disable=C0415
+
+    script: str = pycomplete.Completer(parser).render(shell)  # type: ignore
+    hook = _HOOKS.get(shell, lambda *_: None)(
+        script,
+        " ".join(
+            _shlex.quote(part) if shell != "fish" else f'"{part}"'
+            for part in (_sys.executable, "-m", "todol._names")
+        ),
+    )
+    return script if hook is None else script.rstrip("\n") + "\n" + hook
+
+
+def fingerprint(parser: _argparse.ArgumentParser) -> str:
+    """A digest of everything about `parser` that ends up in a completion script"""
+    digest = _hashlib.sha1(_sys.executable.encode())
+
+    def walk(parser: _argparse.ArgumentParser) -> None:
+        digest.update(repr(parser.prog).encode())
+        for action in parser._actions:  # pylint: disable=protected-access
+            subparsers = isinstance(
+                action, _argparse._SubParsersAction  # pylint: disable=protected-access
+            )
+            digest.update(
+                repr(
+                    (
+                        type(action).__name__,
+                        action.option_strings,
+                        action.dest,
+                        action.help,
+                        None if subparsers else action.choices,
+                    )
+                ).encode()
+            )
+            if subparsers:
+                for name, subparser in action.choices.items():  # type: ignore
+                    digest.update(name.encode())
+                    walk(subparser)
+
+    walk(parser)
+    return digest.hexdigest()
+
+
+def render_cached(
+    parser: _argparse.ArgumentParser, shell: str, cache_dir: _Path
+) -> str:
+    """Like :py:func:`render` but cached in `cache_dir`.
+
+    Scripts rendered for other versions of todol or other parser
+    definitions are replaced. Failing to write the cache is not an error.
+
+    Raises
+    ------
+    ModuleNotFoundError
+        pycomplete is not installed and the script is not cached.
+
+    """
+    cached = cache_dir.joinpath(
+        f"completion-{shell}-{__version__}-{fingerprint(parser)[:16]}"
+    )
+    try:
+        script = cached.read_text()
+    except OSError:
+        pass
+    else:
+        _metrics.incr("completion.cache_hits")
+        return script
+
+    _metrics.incr("completion.cache_misses")
+    script = render(parser, shell)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale in cache_dir.glob(f"completion-{shell}-*"):
+            stale.unlink()
+        descriptor, temporary = _tempfile.mkstemp(dir=str(cache_dir), prefix=".")
+        with open(descriptor, "w") as cache:
+            cache.write(script)
+        _os.replace(temporary, str(cached))
+    except OSError:
+        pass
+    return script
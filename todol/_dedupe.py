@@ -0,0 +1,343 @@
+"""Finding near-duplicate todos with MinHash and locality-sensitive hashing.
+
+A todo's name is reduced to its set of character trigrams (after
+lowercasing and collapsing whitespace), and two names are as similar as the
+Jaccard similarity of their trigram sets. Each name gets a MinHash
+signature of 30 values, which agree between two names with a probability
+equal to their similarity, split into 10 bands of 3. Names sharing any band
+land in the same bucket, so similar names are found by looking up 10 buckets
+instead of comparing against every todo. The candidates are then checked
+against the exact similarity.
+
+The buckets of the active todos live in a SQLite database next to the todo
+index (``todos.dedupe`` for ``todos.json``), created when first needed and
+then kept up to date incrementally by :py:func:`apply`, which the store
+calls with the changes of every write. Like every SQLite sidecar (see
+:py:mod:`todol._sidecar`), it remembers the size and modification time of
+the index it reflects so that out-of-band edits trigger a rebuild instead
+of wrong results.
+
+"""
+import functools as _functools
+import hashlib as _hashlib
+import json as _json
+import sqlite3 as _sqlite3
+import struct as _struct
+from contextlib import closing as _closing
+from pathlib import Path as _Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from . import _metrics, _search, _sidecar, _tags, _utils
+
+__all__ = [
+    "SUFFIX",
+    "THRESHOLD",
+    "shingles",
+    "similarity",
+    "signature",
+    "buckets",
+    "sidecar_path",
+    "apply",
+    "rebuild",
+    "duplicates",
+    "groups",
+    "merge",
+]
+
+SUFFIX = ".dedupe"
+VERSION = 1
+THRESHOLD = 0.6  # The similarity from which names are reported as duplicates
+BANDS = 10
+ROWS = 3
+_SHINGLE = 3
+_VALUES = _struct.Struct(f"<{BANDS * ROWS}H")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (
+    id INTEGER PRIMARY KEY,
+    todo TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS todos_by_name ON todos (todo, due_date);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, id)
+) WITHOUT ROWID;
+"""
+_SIDECAR = _sidecar.Sidecar("dedupe", SUFFIX, VERSION, _SCHEMA, ("todos", "buckets"))
+
+
+def shingles(name: str) -> FrozenSet[str]:
+    """The character trigrams of `name`, lowercased and with whitespace collapsed"""
+    normalized = " ".join(name.lower().split())
+    if len(normalized) <= _SHINGLE:
+        return frozenset((normalized,))
+    return frozenset(
+        normalized[start : start + _SHINGLE]
+        for start in range(len(normalized) - _SHINGLE + 1)
+    )
+
+
+def similarity(first: str, second: str) -> float:
+    """The Jaccard similarity of the trigrams of two names"""
+    first_shingles, second_shingles = shingles(first), shingles(second)
+    return len(first_shingles & second_shingles) / len(first_shingles | second_shingles)
+
+
+@_functools.lru_cache(maxsize=65536)
+def _hashes(shingle: str) -> Tuple[int, ...]:
+    # One digest holds a value for every permutation; trigrams repeat a lot
+    return _VALUES.unpack(
+        _hashlib.blake2b(
+            shingle.encode(errors="surrogatepass"), digest_size=_VALUES.size
+        ).digest()
+    )
+
+
+def signature(name: str) -> Tuple[int, ...]:
+    """The MinHash signature of `name`"""
+    return tuple(map(min, zip(*map(_hashes, shingles(name)))))
+
+
+def buckets(name: str) -> List[Tuple[int, int]]:
+    """The ``(band, bucket)`` of every band of the signature of `name`"""
+    # The values of a band make up the bucket, as one 48 bit integer
+    raw = _VALUES.pack(*signature(name))
+    size = 2 * ROWS
+    return [
+        (band, int.from_bytes(raw[band * size : band * size + size], "little"))
+        for band in range(BANDS)
+    ]
+
+
+def sidecar_path(store_path: _Path) -> _Path:
+    """Where the duplicate index of the todo index at `store_path` lives"""
+    return _SIDECAR.path(store_path)
+
+
+def _add(connection: _sqlite3.Connection, _section: str, data: Dict[str, Any]) -> None:
+    cursor = connection.execute(
+        "INSERT INTO todos (todo, due_date, data) VALUES (?, ?, ?)",
+        (data["todo"], str(data["due_date"]), _json.dumps(data)),
+    )
+    connection.executemany(
+        "INSERT INTO buckets VALUES (?, ?, ?)",
+        ((band, bucket, cursor.lastrowid) for band, bucket in buckets(data["todo"])),
+    )
+
+
+def _remove(
+    connection: _sqlite3.Connection, _section: str, data: Dict[str, Any]
+) -> None:
+    row = connection.execute(
+        "SELECT id FROM todos WHERE todo = ? AND due_date = ? LIMIT 1",
+        (data["todo"], str(data["due_date"])),
+    ).fetchone()
+    if row is not None:
+        connection.execute("DELETE FROM todos WHERE id = ?", row)
+        # Found again by its buckets, through the primary key
+        connection.executemany(
+            "DELETE FROM buckets WHERE band = ? AND bucket = ? AND id = ?",
+            ((band, bucket, row[0]) for band, bucket in buckets(data["todo"])),
+        )
+
+
+def apply(
+    store_path: _Path, previous: Tuple[int, int], changes: Iterable[_search.Change]
+) -> None:
+    """Apply `changes` made to the todo index at `store_path`
+
+    See :py:meth:`todol._sidecar.Sidecar.apply`. Only the active todos are
+    indexed.
+    """
+    _SIDECAR.apply(store_path, previous, changes, _add, _remove, ("todos",))
+
+
+def rebuild(store_path: _Path, todos: Iterable[Dict[str, Any]]) -> None:
+    """Rebuild the duplicate index of `store_path` from all of its active `todos`"""
+    with _SIDECAR.rebuilding(store_path) as connection:
+        rows = [
+            (position, data["todo"], str(data["due_date"]), _json.dumps(data))
+            for position, data in enumerate(todos, 1)
+        ]
+        connection.executemany("INSERT INTO todos VALUES (?, ?, ?, ?)", rows)
+        # Inserted in key order, so the B-tree is only ever appended to
+        connection.executemany(
+            "INSERT INTO buckets VALUES (?, ?, ?)",
+            sorted(
+                (band, bucket, position)
+                for position, name, _, _ in rows
+                for band, bucket in buckets(name)
+            ),
+        )
+
+
+def _connect_fresh(
+    store_path: _Path, todos: Optional[Iterable[Dict[str, Any]]]
+) -> _sqlite3.Connection:
+    """Connect to the duplicate index, rebuilding it first if it is out of date"""
+    connection = _SIDECAR.connect(store_path)
+    if not _SIDECAR.fresh(connection, store_path):
+        connection.close()
+        if todos is None:
+            raise ValueError("The duplicate index is out of date")
+        rebuild(store_path, todos)
+        connection = _SIDECAR.connect(store_path)
+    return connection
+
+
+def duplicates(
+    store_path: _Path,
+    name: str,
+    todos: Optional[Iterable[Dict[str, Any]]] = None,
+    threshold: float = THRESHOLD,
+) -> List[Tuple[float, Dict[str, Any]]]:
+    """Find the active todos whose names are similar to `name`
+
+    Parameters
+    ----------
+    store_path : Path
+        The todo index to look in.
+    name : str
+        The name to find duplicates of.
+    todos : Iterable[Dict[str, Any]], optional
+        Every active todo of the index. Only consumed if the duplicate index
+        has to be (re)built.
+    threshold : float, optional
+        The smallest similarity reported.
+
+    Returns
+    -------
+    List[Tuple[float, Dict[str, Any]]]
+        The similarity and data of each duplicate, most similar first.
+
+    Raises
+    ------
+    ValueError
+        The duplicate index is out of date and `todos` is not given.
+
+    """
+    with _closing(_connect_fresh(store_path, todos)) as connection:
+        with _metrics.timer("dedupe.query"):
+            candidates = connection.execute(
+                "SELECT data FROM todos WHERE id IN ("
+                + " UNION ".join(
+                    ["SELECT id FROM buckets WHERE band = ? AND bucket = ?"] * BANDS
+                )
+                + ") ORDER BY id",
+                [key for band in buckets(name) for key in band],
+            ).fetchall()
+    _metrics.incr("dedupe.candidates", len(candidates))
+    found = []
+    for (raw,) in candidates:
+        data = _json.loads(raw)
+        score = similarity(name, data["todo"])
+        if score >= threshold:
+            found.append((score, data))
+    found.sort(key=lambda match: -match[0])
+    return found
+
+
+def groups(
+    store_path: _Path,
+    todos: Optional[Iterable[Dict[str, Any]]] = None,
+    threshold: float = THRESHOLD,
+) -> List[List[Dict[str, Any]]]:
+    """Group the active todos of `store_path` with their duplicates
+
+    Only the pairs of todos sharing a bucket are compared, and duplicates of
+    duplicates are grouped together.
+
+    Parameters
+    ----------
+    store_path : Path
+        The todo index to look in.
+    todos : Iterable[Dict[str, Any]], optional
+        Every active todo of the index. Only consumed if the duplicate index
+        has to be (re)built.
+    threshold : float, optional
+        The smallest similarity of two duplicates.
+
+    Returns
+    -------
+    List[List[Dict[str, Any]]]
+        The data of the todos of every group of two or more, in the order
+        they were added.
+
+    Raises
+    ------
+    ValueError
+        The duplicate index is out of date and `todos` is not given.
+
+    """
+    with _closing(_connect_fresh(store_path, todos)) as connection:
+        with _metrics.timer("dedupe.pairs"):
+            pairs = connection.execute(
+                "SELECT DISTINCT first.id, second.id FROM buckets AS first "
+                "JOIN buckets AS second ON first.band = second.band "
+                "AND first.bucket = second.bucket AND first.id < second.id"
+            ).fetchall()
+            found = {
+                position: _json.loads(
+                    connection.execute(
+                        "SELECT data FROM todos WHERE id = ?", (position,)
+                    ).fetchone()[0]
+                )
+                for position in {position for pair in pairs for position in pair}
+            }
+    _metrics.incr("dedupe.candidates", len(pairs))
+
+    # Union-find over the pairs that really are similar
+    parents: Dict[int, int] = {}
+
+    def root(position: int) -> int:
+        parents.setdefault(position, position)
+        while parents[position] != position:
+            parents[position] = parents[parents[position]]
+            position = parents[position]
+        return position
+
+    trigrams = {position: shingles(data["todo"]) for position, data in found.items()}
+    for first, second in pairs:
+        first_root, second_root = root(first), root(second)
+        if first_root == second_root:
+            continue  # Already grouped through other duplicates
+        common = len(trigrams[first] & trigrams[second])
+        if common >= threshold * (
+            len(trigrams[first]) + len(trigrams[second]) - common
+        ):
+            parents[max(first_root, second_root)] = min(first_root, second_root)
+    grouped: Dict[int, List[int]] = {}
+    for position in sorted(parents):
+        grouped.setdefault(root(position), []).append(position)
+    return [
+        [found[position] for position in members]
+        for members in grouped.values()
+        if len(members) > 1
+    ]
+
+
+def merge(group: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge duplicate todos into the first one
+
+    It keeps the earliest due date, every tag and the highest priority of
+    the group.
+    """
+    merged = dict(group[0])
+    merged["due_date"] = str(
+        min(_utils.iso_str_to_datetime(str(data["due_date"])) for data in group)
+    )
+    tags = list(
+        dict.fromkeys(tag for data in group for tag in data.get(_tags.TAGS, ()))
+    )
+    if tags:
+        merged[_tags.TAGS] = tags
+    priorities = [
+        data[_tags.PRIORITY] for data in group if data.get(_tags.PRIORITY) is not None
+    ]
+    if priorities:
+        merged[_tags.PRIORITY] = min(priorities, key=_tags.PRIORITIES.index)
+    return merged
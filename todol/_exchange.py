@@ -0,0 +1,268 @@
+"""Streaming import and export of todos.
+
+Every format is a pair of generators: a dumper turning ``(section, data)``
+records into lines of text and a loader turning lines of text back into
+records. Nothing is buffered beyond a single todo, so moving a list of any
+size in or out of todol takes constant memory.
+
+Supported formats:
+
+``jsonl``
+    One JSON object per line: the todo's data plus ``"finished"``.
+``csv``
+    ``todo,due_date,finished,extra`` where ``extra`` holds any other keys
+    of the todo's data as a JSON object.
+``todo.txt``
+    `todo.txt <https://github.com/todotxt/todo.txt>`_ lines. Finished
+    todos are prefixed with ``x``, priorities are written as ``(A)`` to
+    ``(C)``, tags as ``+tag`` projects, the due date as ``due:`` and the
+    other keys todol uses (see :py:data:`TODOTXT_KEYS`) as ``key:value``
+    tags, with whitespace, ``:`` and ``%`` percent-encoded in their values.
+    Only those tags are read back: any other ``word:word`` (e.g. ``10:30``)
+    is part of the name. Values that can't be written as such a tag (keys
+    todol doesn't know of, and values that aren't strings) are skipped,
+    with a warning.
+
+"""
+import csv as _csv
+import io as _io
+import json as _json
+import re as _re
+import sys as _sys
+import urllib.parse as _parse
+from pathlib import PurePath as _PurePath
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import _recurrence, _stats, _tags, _tree, _utils
+
+__all__ = ["FORMATS", "TODOTXT_KEYS", "Record", "guess_format", "dump", "load"]
+
+Record = Tuple[str, Dict[str, Any]]
+
+_CSV_FIELDS = ("todo", "due_date", "finished", "extra")
+_ISO_DATE = _re.compile(r"\d{4}-\d{2}-\d{2}$")
+_TODOTXT_PRIORITY = _re.compile(r"\((?P<letter>[A-Z])\)$")
+_TODOTXT_PROJECT = _re.compile(r"\+(?P<tag>\S+)$")
+_TODOTXT_ESCAPED = _re.compile(r"[\s:%]")
+
+# The keys of a todo's data written as todo.txt ``key:value`` tags
+TODOTXT_KEYS = ("id", _recurrence.KEY, _stats.FINISHED_ON, _tree.PARENT)
+
+Warn = Callable[[str], None]
+
+
+def _section(finished: bool) -> str:
+    return "finished" if finished else "todos"
+
+
+def _extra(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value for key, value in data.items() if key not in ("todo", "due_date")
+    }
+
+
+def _validated(data: Dict[str, Any], line_number: int) -> Dict[str, Any]:
+    try:
+        if not isinstance(data.get("todo"), str):
+            raise ValueError("missing todo name")
+        due_date = data.get("due_date") or str(_utils.tomorrow())
+        _utils.iso_str_to_datetime(due_date)
+        # Counted by the statistics as soon as the import is written
+        if _stats.FINISHED_ON in data:
+            _utils.iso_str_to_datetime(data[_stats.FINISHED_ON])
+    except (TypeError, ValueError) as exception:
+        raise ValueError(f"Invalid todo on line {line_number}: {exception}") from None
+    validated = {"todo": data["todo"], "due_date": due_date}
+    validated.update(_extra(data))
+    return validated
+
+
+def _print_warning(message: str) -> None:
+    print(message, file=_sys.stderr)
+
+
+def dump_jsonl(
+    records: Iterable[Record], warn: Warn = _print_warning  # pylint: disable=W0613
+) -> Iterator[str]:
+    """Dump records as JSON lines"""
+    for section, data in records:
+        line = dict(data)
+        line["finished"] = section == "finished"
+        yield _json.dumps(line) + "\n"
+
+
+def load_jsonl(lines: Iterable[str]) -> Iterator[Record]:
+    """Load records from JSON lines"""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = _json.loads(line)
+            if not isinstance(data, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as exception:
+            raise ValueError(
+                f"Invalid todo on line {line_number}: {exception}"
+            ) from None
+        finished = bool(data.pop("finished", False))
+        yield _section(finished), _validated(data, line_number)
+
+
+def dump_csv(
+    records: Iterable[Record], warn: Warn = _print_warning  # pylint: disable=W0613
+) -> Iterator[str]:
+    """Dump records as CSV, header included"""
+    buffer = _io.StringIO()
+    writer = _csv.writer(buffer)
+    writer.writerow(_CSV_FIELDS)
+    for section, data in records:
+        extra = _extra(data)
+        writer.writerow(
+            (
+                data["todo"],
+                data["due_date"],
+                int(section == "finished"),
+                _json.dumps(extra) if extra else "",
+            )
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def load_csv(lines: Iterable[str]) -> Iterator[Record]:
+    """Load records from CSV with (at least) a ``todo`` column"""
+    reader = _csv.DictReader(lines)
+    for row in reader:
+        data: Dict[str, Any] = {"todo": row.get("todo")}
+        if row.get("due_date"):
+            data["due_date"] = row["due_date"]
+        if row.get("extra"):
+            try:
+                data.update(_json.loads(row["extra"]))
+            except ValueError as exception:
+                raise ValueError(
+                    f"Invalid todo on line {reader.line_num}: {exception}"
+                ) from None
+        finished = (row.get("finished") or "").strip().lower() in ("1", "true", "x")
+        yield _section(finished), _validated(data, reader.line_num)
+
+
+def _todotxt_tag(key: str, value: Any) -> Optional[str]:
+    """`key` and `value` as a todo.txt tag, if they can be written as one"""
+    if key not in TODOTXT_KEYS or not isinstance(value, str) or not value:
+        return None
+    escaped = _TODOTXT_ESCAPED.sub(lambda found: _parse.quote(found.group()), value)
+    return f"{key}:{escaped}"
+
+
+def dump_todotxt(
+    records: Iterable[Record], warn: Warn = _print_warning
+) -> Iterator[str]:
+    """Dump records as todo.txt lines
+
+    `warn` is called with a message about every value that is skipped.
+    """
+    for section, data in records:
+        words: List[str] = ["x"] if section == "finished" else []
+        extra = _extra(data)
+        priority = extra.pop(_tags.PRIORITY, None)
+        if priority in _tags.PRIORITIES:
+            words.append(f"({'ABC'[_tags.PRIORITIES.index(priority)]})")
+        words.append(" ".join(str(data["todo"]).split()))
+        words.extend(f"+{name}" for name in extra.pop(_tags.TAGS, ()))
+        words.append(f"due:{data['due_date']}")
+        for key, value in extra.items():
+            tag = _todotxt_tag(key, value)
+            if tag is None:
+                warn(
+                    f"Skipped {key}={value!r} of {data['todo']!r}, "
+                    "which todo.txt can't represent"
+                )
+            else:
+                words.append(tag)
+        yield " ".join(words) + "\n"
+
+
+def load_todotxt(lines: Iterable[str]) -> Iterator[Record]:
+    """Load records from todo.txt lines"""
+    for line_number, line in enumerate(lines, start=1):
+        words = line.split()
+        if not words:
+            continue
+        finished = words[0] == "x"
+        if finished:
+            words = words[1:]
+        data: Dict[str, Any] = {}
+        priority = _TODOTXT_PRIORITY.match(words[0]) if words else None
+        if priority is not None:
+            # Anything below (C) is low too
+            rank = min(ord(priority["letter"]) - ord("A"), len(_tags.PRIORITIES) - 1)
+            data[_tags.PRIORITY] = _tags.PRIORITIES[rank]
+            words = words[1:]
+        # Completion and creation dates
+        while words and _ISO_DATE.match(words[0]):
+            words = words[1:]
+
+        name: List[str] = []
+        for word in words:
+            key, _, value = word.partition(":")
+            project = _TODOTXT_PROJECT.match(word)
+            if project is not None:
+                data.setdefault(_tags.TAGS, []).append(project["tag"])
+            elif not value or (key != "due" and key not in TODOTXT_KEYS):
+                name.append(word)  # Including any other word:word, e.g. 10:30
+            elif key == "due":
+                data["due_date"] = value
+            else:
+                data[key] = _parse.unquote(value)
+        data["todo"] = " ".join(name)
+        yield _section(finished), _validated(data, line_number)
+
+
+FORMATS: Dict[
+    str,
+    Tuple[
+        Callable[[Iterable[Record], Warn], Iterator[str]],
+        Callable[[Iterable[str]], Iterator[Record]],
+    ],
+] = {
+    "jsonl": (dump_jsonl, load_jsonl),
+    "csv": (dump_csv, load_csv),
+    "todo.txt": (dump_todotxt, load_todotxt),
+}
+
+
+def guess_format(filename: str, default: str = "jsonl") -> str:
+    """Guess the format of `filename` from its suffix"""
+    suffix = _PurePath(filename).suffix.lower()
+    return {
+        ".jsonl": "jsonl",
+        ".ndjson": "jsonl",
+        ".csv": "csv",
+        ".txt": "todo.txt",
+    }.get(suffix, default)
+
+
+def dump(
+    records: Iterable[Record], file_format: str, warn: Warn = _print_warning
+) -> Iterator[str]:
+    """Stream `records` as lines of `file_format`
+
+    `warn` is called with a message about every value `file_format` can't
+    represent, which is skipped. Defaults to printing it on stderr.
+    """
+    return FORMATS[file_format][0](records, warn)
+
+
+def load(lines: Iterable[str], file_format: str) -> Iterator[Record]:
+    """Stream records out of lines of `file_format`
+
+    Raises
+    ------
+    ValueError
+        A line does not describe a valid todo.
+
+    """
+    return FORMATS[file_format][1](lines)
@@ -0,0 +1,130 @@
+"""Publishing todo indexes as immutable, numbered generations.
+
+Every write of an index creates a new generation file in the
+``generations`` directory next to it (``generations/todos.7.json`` for
+``todos.json``), which is never modified afterwards. The index path itself
+is a symbolic link to the current generation, replaced atomically once the
+new generation is completely written, so readers simply open the index and
+always get a whole generation without taking any lock. Generations older
+than the previous one are then garbage-collected; a reader that still has
+one open keeps reading it, as unlinking doesn't affect open files.
+
+Writers serialize their read-modify-write cycles with :py:func:`lock`.
+Where symbolic links aren't available (e.g. Windows without the needed
+privilege), the generation file is renamed over the index instead, which
+is just as atomic but keeps no numbered history.
+
+"""
+import contextlib as _contextlib
+import os as _os
+import re as _re
+from pathlib import Path as _Path
+from typing import Iterator, Optional
+
+try:
+    import fcntl as _fcntl
+except ImportError:  # Windows
+    _fcntl = None  # type: ignore
+
+__all__ = ["DIRECTORY", "generations_dir", "current", "publish", "collect", "lock"]
+
+DIRECTORY = "generations"
+LOCK_SUFFIX = ".lock"
+_KEEP = 2  # The current generation and the one before it
+
+
+def generations_dir(index_path: _Path) -> _Path:
+    """Where the generations of the todo index at `index_path` live"""
+    return index_path.parent.joinpath(DIRECTORY)
+
+
+def _number(index_path: _Path, name: str) -> Optional[int]:
+    match = _re.fullmatch(
+        _re.escape(index_path.stem) + r"\.(\d+)" + _re.escape(index_path.suffix),
+        name,
+    )
+    return int(match.group(1)) if match else None
+
+
+def current(index_path: _Path) -> int:
+    """The generation the index at `index_path` points to (0 if none)"""
+    try:
+        target = _os.readlink(str(index_path))
+    except OSError:  # Missing, or a plain file
+        return 0
+    return _number(index_path, _os.path.basename(target)) or 0
+
+
+def publish(index_path: _Path, raw: bytes) -> int:
+    """Write `raw` as the next generation of `index_path` and point it there
+
+    Returns
+    -------
+    int
+        The number of the published generation, or 0 if it was renamed over
+        the index because symbolic links are unavailable.
+
+    """
+    directory = generations_dir(index_path)
+    directory.mkdir(exist_ok=True)
+    number = current(index_path) + 1
+    while True:  # Generations are immutable: never overwrite one
+        generation = directory.joinpath(
+            f"{index_path.stem}.{number}{index_path.suffix}"
+        )
+        try:
+            with generation.open("xb") as output:
+                output.write(raw)
+                output.flush()
+                _os.fsync(output.fileno())
+        except FileExistsError:
+            number += 1
+            continue
+        break
+
+    link = index_path.with_name(f".{index_path.name}.{number}")
+    try:
+        _os.symlink(_os.path.join(DIRECTORY, generation.name), str(link))
+    except (OSError, NotImplementedError):
+        _os.replace(str(generation), str(index_path))
+        return 0
+    _os.replace(str(link), str(index_path))  # The atomic pointer update
+    collect(index_path)
+    return number
+
+
+def collect(index_path: _Path, keep: int = _KEEP) -> int:
+    """Delete all but the latest `keep` generations. Returns how many were"""
+    newest = current(index_path)
+    deleted = 0
+    try:
+        entries = list(_os.scandir(str(generations_dir(index_path))))
+    except OSError:
+        return 0
+    for entry in entries:
+        number = _number(index_path, entry.name)
+        if number is not None and number <= newest - keep:
+            try:
+                _os.unlink(entry.path)
+            except FileNotFoundError:  # Collected by another writer
+                continue
+            deleted += 1
+    return deleted
+
+
+@_contextlib.contextmanager
+def lock(index_path: _Path) -> Iterator[None]:
+    """Hold the exclusive writer lock of the index at `index_path`
+
+    Readers never take it. Without :py:mod:`fcntl`, or before the index's
+    directory is created, this does nothing.
+    """
+    if _fcntl is None or not index_path.parent.is_dir():
+        yield
+        return
+    with open(str(index_path.with_suffix(LOCK_SUFFIX)), "a") as lock_file:
+        _fcntl.flock(lock_file.fileno(), _fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            _fcntl.flock(lock_file.fileno(), _fcntl.LOCK_UN)
@@ -0,0 +1,259 @@
+"""An undo/redo journal of the changes made to a todo index.
+
+Every mutating command records the changes it made (the same
+``(action, section, data)`` tuples the store's sidecars are updated with)
+in a journal next to the index (``todos.journal`` for ``todos.json``).
+Undoing applies the inverse of the latest entry, so the journal only ever
+holds changes, never copies of the index. It keeps at most
+``TODOL_UNDO_DEPTH`` (default 100, also used if it isn't an integer)
+entries.
+
+It also keeps a log of every write, undos and redos included, each with
+the size and modification time of the index before and after it. The
+stamps chain the writes together, so :py:func:`since` can tell what
+changed since a given stamp, or that it can't because the index was
+edited some other way in between (or the log was trimmed).
+
+"""
+import json as _json
+import os as _os
+import tempfile as _tempfile
+from pathlib import Path as _Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import _search
+
+__all__ = [
+    "SUFFIX",
+    "DEFAULT_DEPTH",
+    "Entry",
+    "Stamp",
+    "depth",
+    "journal_path",
+    "stamp",
+    "invert",
+    "apply",
+    "record",
+    "log",
+    "step",
+    "since",
+]
+
+SUFFIX = ".journal"
+DEFAULT_DEPTH = 100
+
+Change = _search.Change
+Entry = Dict[str, Any]  # {"command": str, "changes": [Change, ...]}
+Stamp = Tuple[int, int]  # The size and modification time (in ns) of an index
+
+
+def depth() -> int:
+    """The number of entries to keep, from ``TODOL_UNDO_DEPTH``"""
+    try:
+        return max(int(_os.environ.get("TODOL_UNDO_DEPTH", DEFAULT_DEPTH)), 0)
+    except ValueError:  # Not an integer
+        return DEFAULT_DEPTH
+
+
+def journal_path(index_path: _Path) -> _Path:
+    """Where the journal of the todo index at `index_path` lives"""
+    return index_path.with_suffix(SUFFIX)
+
+
+def stamp(index_path: _Path) -> Optional[Stamp]:
+    """The stamp of the todo index at `index_path`, None if it doesn't exist"""
+    try:
+        source = index_path.stat()
+    except OSError:
+        return None
+    return source.st_size, source.st_mtime_ns
+
+
+def invert(changes: Iterable[Change]) -> List[Change]:
+    """The changes that undo `changes`"""
+    return [
+        ("remove" if action == "add" else "add", section, data)
+        for action, section, data in reversed(list(changes))
+    ]
+
+
+def apply(todos: Dict[str, List[Dict[str, Any]]], changes: Iterable[Change]) -> None:
+    """Apply `changes` to `todos` in place
+
+    Raises
+    ------
+    ValueError
+        A todo to remove is not in `todos`. Nothing is changed.
+
+    """
+    changes = list(changes)
+    updated = {section: list(items) for section, items in todos.items()}
+    for action, section, data in changes:
+        if action == "add":
+            updated[section].append(data)
+            continue
+        try:
+            updated[section].remove(data)
+        except ValueError:
+            raise ValueError(
+                f"The todo {data['todo']!r} is no longer in {section}"
+            ) from None
+    todos.update(updated)
+
+
+def _bounded(entries: List[Entry]) -> List[Entry]:
+    limit = depth()
+    return entries[-limit:] if limit else []
+
+
+def _load(path: _Path) -> Dict[str, List[Entry]]:
+    try:
+        stacks: Dict[str, List[Entry]] = _json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        stacks = {}
+    for key in ("undo", "redo", "log"):  # Journals of older versions lack the log
+        stacks.setdefault(key, [])
+    return stacks
+
+
+def _save(path: _Path, stacks: Dict[str, List[Entry]]) -> None:
+    descriptor, temporary = _tempfile.mkstemp(
+        dir=str(path.parent), prefix=".", suffix=SUFFIX
+    )
+    try:
+        with open(descriptor, "w") as journal:
+            _json.dump(stacks, journal, separators=(",", ":"))
+        _os.replace(temporary, str(path))
+    except OSError:
+        _os.unlink(temporary)
+        raise
+
+
+def _logged(
+    stacks: Dict[str, List[Entry]],
+    index_path: _Path,
+    previous: Stamp,
+    changes: List[List[Any]],
+) -> None:
+    entry = {"previous": previous, "stamp": stamp(index_path), "changes": changes}
+    stacks["log"] = _bounded(stacks["log"] + [entry])
+
+
+def record(
+    index_path: _Path,
+    command: str,
+    changes: Iterable[Change],
+    previous: Optional[Stamp] = None,
+) -> None:
+    """Journal the `changes` made to `index_path` by `command`, clearing redo
+
+    Parameters
+    ----------
+    index_path : Path
+        The todo index, already written with the changes.
+    command : str
+        What made them, shown when undoing.
+    changes : Iterable[Change]
+        ``(action, section, data)`` tuples.
+    previous : Stamp, optional
+        The stamp of the index before it was written. Without it the write
+        isn't logged, and :py:func:`since` can't look past it.
+
+    """
+    changes = [list(change) for change in changes]
+    if not depth() or not changes:
+        return
+    path = journal_path(index_path)
+    stacks = _load(path)
+    stacks["undo"] = _bounded(
+        stacks["undo"] + [{"command": command, "changes": changes}]
+    )
+    stacks["redo"] = []
+    if previous is not None:
+        _logged(stacks, index_path, previous, changes)
+    _save(path, stacks)
+
+
+def log(index_path: _Path, changes: Iterable[Change], previous: Stamp) -> None:
+    """Log the `changes` written to `index_path` without journaling them
+
+    For the writes :py:func:`step` made, once `index_path` is written.
+    `previous` is the stamp of the index before.
+    """
+    changes = [list(change) for change in changes]
+    if not depth() or not changes:
+        return
+    path = journal_path(index_path)
+    stacks = _load(path)
+    _logged(stacks, index_path, previous, changes)
+    _save(path, stacks)
+
+
+def step(
+    index_path: _Path, todos: Dict[str, List[Dict[str, Any]]], redo: bool = False
+) -> Optional[Tuple[Entry, List[Change]]]:
+    """Undo (or redo) the latest journaled command on `todos`, in place
+
+    The caller is responsible for writing `todos` back to `index_path`.
+
+    Returns
+    -------
+    Optional[Tuple[Entry, List[Change]]]
+        The entry and the changes that were applied, or None if there was
+        nothing to undo (or redo).
+
+    Raises
+    ------
+    ValueError
+        The index changed in a way that conflicts with the entry (e.g. it
+        was edited by hand). The journal is left as it was.
+
+    """
+    path = journal_path(index_path)
+    stacks = _load(path)
+    source, target = ("redo", "undo") if redo else ("undo", "redo")
+    if not stacks[source]:
+        return None
+    entry = stacks[source][-1]
+    changes: List[Change] = [tuple(change) for change in entry["changes"]]  # type: ignore
+    if not redo:
+        changes = invert(changes)
+    apply(todos, changes)
+    stacks[source].pop()
+    stacks[target] = _bounded(stacks[target] + [entry])
+    _save(path, stacks)
+    return entry, changes
+
+
+def since(index_path: _Path, since_stamp: Optional[Stamp]) -> Optional[List[Change]]:
+    """The changes written to `index_path` since it had the stamp `since_stamp`
+
+    Returns
+    -------
+    Optional[List[Change]]
+        The changes in the order they were made, or None if the log doesn't
+        cover them all: the index was edited without being logged since, or
+        the log was trimmed past `since_stamp`.
+
+    """
+    expected = stamp(index_path)
+    if since_stamp is None or expected is None:
+        return None
+    if expected == tuple(since_stamp):
+        return []  # Without reading the journal
+    entries: List[Entry] = []
+    # Back from the current stamp: each write must end where the next began
+    for entry in reversed(_load(journal_path(index_path))["log"]):
+        if entry["stamp"] is None or tuple(entry["stamp"]) != expected:
+            return None
+        entries.append(entry)
+        if entry["previous"] is None:
+            return None
+        expected = tuple(entry["previous"])
+        if expected == tuple(since_stamp):
+            return [
+                tuple(change)  # type: ignore
+                for entry in reversed(entries)
+                for change in entry["changes"]
+            ]
+    return None
@@ -0,0 +1,83 @@
+"""Machine-readable output, as JSON lines.
+
+With ``--json``, commands write one JSON object per line to stdout instead
+of their usual text: every todo listed (its data, plus the section it is
+in), every change made by a command that writes, or a single object for
+summaries. Objects are encoded straight from the todos' data and written
+in large chunks, so a long listing costs few writes however it is piped.
+
+Status messages are left out, and warnings and errors go to stderr as
+``{"warning": ...}`` and ``{"error": ...}`` objects, so stdout only ever
+holds the data and parses cleanly line by line.
+
+"""
+import json as _json
+import sys as _sys
+from typing import IO, Any, Dict, Iterable
+
+from . import _interface
+
+__all__ = ["CHUNK_SIZE", "encode", "write", "Interface"]
+
+CHUNK_SIZE = 1 << 16  # Characters buffered before each write
+
+# ASCII, so no line separator (e.g. U+2028) a reader might split on gets out
+_ENCODER = _json.JSONEncoder(check_circular=False, separators=(",", ":"), default=str)
+
+
+def encode(obj: Dict[str, Any]) -> str:
+    """`obj` as one line of JSON. Dates and other unknown objects become strings"""
+    return _ENCODER.encode(obj)
+
+
+def write(
+    objects: Iterable[Dict[str, Any]],
+    stream: IO[str],
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Write `objects` to `stream` as JSON lines, in chunks
+
+    Returns
+    -------
+    int
+        The number of objects written.
+
+    """
+    written = 0
+    lines = []
+    buffered = 0
+    for obj in objects:
+        line = _ENCODER.encode(obj)
+        lines.append(line)
+        buffered += len(line) + 1
+        if buffered >= chunk_size:
+            stream.write("\n".join(lines) + "\n")
+            written += len(lines)
+            lines.clear()
+            buffered = 0
+    if lines:
+        stream.write("\n".join(lines) + "\n")
+        written += len(lines)
+    stream.flush()
+    return written
+
+
+class Interface(_interface.Interface):
+    """An interface for JSON output: no colors, and no status messages"""
+
+    def __init__(self) -> None:
+        super().__init__(no_color=True)
+
+    def info(self, msg: str, *, err: bool = False, shutup: bool = False) -> None:
+        pass
+
+    def success(self, msg: str = "Success!", *, err: bool = False) -> None:
+        pass
+
+    def warn(self, msg: str, *, err: bool = False, shutup: bool = False) -> None:
+        if not shutup:
+            print(encode({"warning": msg}), file=_sys.stderr)
+
+    def softerror(self, msg: str, *, err: bool = False, shutup: bool = False) -> None:
+        if not shutup:
+            print(encode({"error": msg}), file=_sys.stderr)
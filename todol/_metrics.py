@@ -0,0 +1,123 @@
+"""Opt-in instrumentation for todol's hot paths.
+
+Nothing is recorded unless a sink is installed. Setting the
+``TODOL_METRICS_FILE`` environment variable installs a sink that appends
+one JSON object per todol invocation to that file; embedders may install
+their own with :py:func:`set_sink`.
+
+"""
+import json as _json
+import os as _os
+import sys as _sys
+import time as _time
+from contextlib import contextmanager as _contextmanager
+from pathlib import Path as _Path
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+
+__all__ = [
+    "Sink",
+    "file_sink",
+    "set_sink",
+    "enabled",
+    "incr",
+    "gauge",
+    "timer",
+    "flush",
+]
+
+Sink = Callable[[Dict[str, Any]], None]
+
+counters: Dict[str, int] = {}
+gauges: Dict[str, Union[int, float]] = {}
+timers: Dict[str, float] = {}
+_sink: Optional[Sink] = None
+
+
+def file_sink(path: Union[str, _Path]) -> Sink:
+    """Create a sink appending records as JSON lines to `path`"""
+    path = _Path(path).expanduser()
+
+    def sink(record: Dict[str, Any]) -> None:
+        with path.open("a") as metrics_file:
+            metrics_file.write(_json.dumps(record) + "\n")
+
+    return sink
+
+
+def set_sink(sink: Optional[Sink]) -> None:
+    """Install `sink` as the metrics destination. ``None`` disables metrics"""
+    global _sink  # pylint: disable=global-statement
+    _sink = sink
+    counters.clear()
+    gauges.clear()
+    timers.clear()
+
+
+def enabled() -> bool:
+    """Whether metrics are currently being collected"""
+    return _sink is not None
+
+
+def incr(name: str, amount: int = 1) -> None:
+    """Increment the counter `name` by `amount`"""
+    if _sink is None:
+        return
+    counters[name] = counters.get(name, 0) + amount
+
+
+def gauge(name: str, value: Union[int, float]) -> None:
+    """Record the latest value of `name`"""
+    if _sink is None:
+        return
+    gauges[name] = value
+
+
+@_contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Accumulate the wall time spent inside the block under `name`"""
+    if _sink is None:
+        yield
+        return
+    start = _time.perf_counter()
+    try:
+        yield
+    finally:
+        timers[name] = timers.get(name, 0.0) + _time.perf_counter() - start
+
+
+def flush(**extra: Any) -> Optional[Dict[str, Any]]:
+    """Emit everything collected so far to the sink and reset the collectors.
+
+    A sink failing to write (e.g. to an unwritable file) is reported on
+    stderr: metrics never make a command fail.
+
+    Parameters
+    ----------
+    **extra
+        Additional top-level fields for the record (e.g. the command name).
+
+    Returns
+    -------
+    Optional[Dict[str, Any]]
+        The emitted record or ``None`` if metrics are disabled.
+
+    """
+    if _sink is None:
+        return None
+    record: Dict[str, Any] = {"time": _time.time()}
+    record.update(extra)
+    record["counters"] = dict(counters)
+    record["gauges"] = dict(gauges)
+    record["timers"] = {key: round(value, 6) for key, value in timers.items()}
+    counters.clear()
+    gauges.clear()
+    timers.clear()
+    try:
+        _sink(record)
+    except OSError as exception:
+        print(f"todol: could not write metrics: {exception}", file=_sys.stderr)
+    return record
+
+
+if _os.environ.get("TODOL_METRICS_FILE"):
+    set_sink(file_sink(_os.environ["TODOL_METRICS_FILE"]))
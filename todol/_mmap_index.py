@@ -0,0 +1,213 @@
+"""A read-optimized, memory-mapped view of a todo index.
+
+Every write of a todo index also writes a sidecar file (``todos.idx`` for
+``todos.json``) laid out as::
+
+    header | offset table | records
+
+The header holds a magic number, a format version, the number of todos in
+each section and the size and modification time of the index it was built
+from (so stale sidecars are detected with a single ``stat``). The offset
+table holds one little endian ``uint64`` per record plus an end marker, and
+each record is the compact JSON of a single todo.
+
+Readers ``mmap`` the sidecar, so concurrent shells share the same page
+cache pages and only decode the records they actually render.
+
+"""
+import json as _json
+import mmap as _mmap
+import os as _os
+import struct as _struct
+import tempfile as _tempfile
+from pathlib import Path as _Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from .todo_objects import Todo
+
+__all__ = [
+    "MAGIC",
+    "VERSION",
+    "SECTIONS",
+    "MappedIndex",
+    "MappedSection",
+    "sidecar_path",
+    "dumps",
+    "write",
+    "open_for",
+    "read_counts",
+]
+
+MAGIC = b"TODOLIDX"
+VERSION = 1
+SECTIONS = ("todos", "finished")
+SUFFIX = ".idx"
+_HEADER = _struct.Struct("<8sHIIqq")
+_OFFSET = _struct.Struct("<Q")
+_CHUNK = 256  # Offsets unpacked at a time
+
+
+def sidecar_path(index_path: _Path) -> _Path:
+    """Where the sidecar of the todo index at `index_path` lives"""
+    return index_path.with_suffix(SUFFIX)
+
+
+def dumps(todos: Dict[str, Iterable[Dict[str, Any]]], source: _os.stat_result) -> bytes:
+    """Build the sidecar of `todos`, whose index file has the stat `source`"""
+    records: List[bytes] = [
+        _json.dumps(item, separators=(",", ":")).encode()
+        for section in SECTIONS
+        for item in todos[section]
+    ]
+    counts = [len(todos[section]) for section in SECTIONS]
+
+    position = _HEADER.size + _OFFSET.size * (len(records) + 1)
+    offsets = bytearray()
+    for record in records:
+        offsets += _OFFSET.pack(position)
+        position += len(record)
+    offsets += _OFFSET.pack(position)
+    return (
+        _HEADER.pack(MAGIC, VERSION, *counts, source.st_size, source.st_mtime_ns)
+        + bytes(offsets)
+        + b"".join(records)
+    )
+
+
+def write(index_path: _Path, todos: Dict[str, Iterable[Dict[str, Any]]]) -> int:
+    """(Re)build the sidecar of the index at `index_path`. Returns its size.
+
+    The sidecar is replaced atomically, so readers that have the old one
+    mapped keep a consistent view.
+    """
+    raw = dumps(todos, index_path.stat())
+    descriptor, temporary = _tempfile.mkstemp(
+        dir=str(index_path.parent), prefix=".", suffix=SUFFIX
+    )
+    try:
+        with open(descriptor, "wb") as sidecar:
+            sidecar.write(raw)
+        _os.replace(temporary, str(sidecar_path(index_path)))
+    except OSError:
+        _os.unlink(temporary)
+        raise
+    return len(raw)
+
+
+class MappedSection(Sequence[Todo]):
+    """A lazily decoded, read-only sequence of the todos in one section"""
+
+    def __init__(self, mapping: _mmap.mmap, first: int, count: int) -> None:
+        self._map = mapping
+        self._first = first
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _offsets(self, start: int, stop: int) -> Sequence[int]:
+        return _struct.unpack_from(
+            f"<{stop - start + 1}Q",
+            self._map,
+            _HEADER.size + _OFFSET.size * (self._first + start),
+        )
+
+    def data(
+        self, start: int = 0, stop: Optional[int] = None
+    ) -> Iterator[Dict[str, str]]:
+        """Decode the data of the todos in ``[start:stop]``, in constant memory"""
+        start, stop, _ = slice(start, stop).indices(self._count)
+        for chunk in range(start, stop, _CHUNK):
+            offsets = self._offsets(chunk, min(chunk + _CHUNK, stop))
+            for begin, end in zip(offsets, offsets[1:]):
+                yield _json.loads(self._map[begin:end])
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:  # type: ignore
+        if isinstance(index, slice):
+            if index.step not in (None, 1):
+                return list(self)[index]
+            return [Todo(data) for data in self.data(index.start, index.stop)]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("todo index out of range")
+        return Todo(next(self.data(index, index + 1)))
+
+    def __iter__(self) -> Iterator[Todo]:
+        for data in self.data():
+            yield Todo(data)
+
+
+class MappedIndex:
+    """A memory-mapped sidecar. Sections are accessed like a todo index"""
+
+    def __init__(self, path: _Path) -> None:
+        with path.open("rb") as sidecar:
+            self._map = _mmap.mmap(sidecar.fileno(), 0, access=_mmap.ACCESS_READ)
+        try:
+            magic, version, *counts, size, mtime = _HEADER.unpack_from(self._map)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a todol index sidecar")
+        except (ValueError, _struct.error):
+            self._map.close()
+            raise
+        self.source_size: int = size
+        self.source_mtime_ns: int = mtime
+        self.counts: Dict[str, int] = dict(zip(SECTIONS, counts))
+
+    def __getitem__(self, section: str) -> MappedSection:
+        first = 0
+        for name in SECTIONS:
+            if name == section:
+                return MappedSection(self._map, first, self.counts[name])
+            first += self.counts[name]
+        raise KeyError(section)
+
+    def close(self) -> None:
+        """Unmap the sidecar"""
+        self._map.close()
+
+    def __enter__(self) -> "MappedIndex":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+
+def open_for(index_path: _Path) -> Optional[MappedIndex]:
+    """Map the sidecar of `index_path` if it exists and is up to date"""
+    try:
+        source = index_path.stat()
+        mapped = MappedIndex(sidecar_path(index_path))
+    except (OSError, ValueError, _struct.error):
+        return None
+    if (mapped.source_size, mapped.source_mtime_ns) != (
+        source.st_size,
+        source.st_mtime_ns,
+    ):
+        mapped.close()
+        return None
+    return mapped
+
+
+def read_counts(index_path: _Path) -> Optional[Dict[str, int]]:
+    """The number of todos in each section of `index_path`, from its sidecar's header.
+
+    Only the header is read. Returns None if the sidecar is missing or stale.
+    """
+    try:
+        source = index_path.stat()
+        with sidecar_path(index_path).open("rb") as sidecar:
+            magic, version, *counts, size, mtime = _HEADER.unpack(
+                sidecar.read(_HEADER.size)
+            )
+    except (OSError, _struct.error):
+        return None
+    if (magic, version, size, mtime) != (
+        MAGIC,
+        VERSION,
+        source.st_size,
+        source.st_mtime_ns,
+    ):
+        return None
+    return dict(zip(SECTIONS, counts))
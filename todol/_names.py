@@ -0,0 +1,101 @@
+"""Completion candidates for todo names, served from a tiny sidecar.
+
+Every write of a todo index also writes a sorted list of the names (and
+IDs, if any) of its active todos, one per line, next to it (``todos.names``
+for ``todos.json``). Shell completion hooks then run::
+
+    python -m todol._names -- PREFIX
+
+which answers prefix queries with a binary search over that file. This
+module only imports the standard library so the hook doesn't pay for
+importing (or parsing the index of) the rest of todol.
+
+"""
+import bisect as _bisect
+import os as _os
+import sys as _sys
+import tempfile as _tempfile
+from pathlib import Path as _Path
+from typing import Any, Dict, Iterable, List, Optional
+
+__all__ = ["SUFFIX", "sidecar_path", "candidates", "write", "complete", "main"]
+
+SUFFIX = ".names"
+
+
+def sidecar_path(index_path: _Path) -> _Path:
+    """Where the names sidecar of the todo index at `index_path` lives"""
+    return index_path.with_suffix(SUFFIX)
+
+
+def candidates(todos: Iterable[Dict[str, Any]]) -> List[str]:
+    """The sorted, distinct completion candidates for `todos`"""
+    names = set()
+    for data in todos:
+        names.add(data["todo"])
+        if data.get("id", "unknown") != "unknown":
+            names.add(str(data["id"]))
+    # Line-based, so names spanning lines can't be completed
+    return sorted(name for name in names if name and "\n" not in name)
+
+
+def write(index_path: _Path, todos: Iterable[Dict[str, Any]]) -> int:
+    """Rewrite the names sidecar of `index_path` for the active `todos`.
+
+    Returns
+    -------
+    int
+        The number of bytes written.
+
+    """
+    raw = "".join(name + "\n" for name in candidates(todos)).encode(
+        errors="surrogatepass"
+    )
+    descriptor, temporary = _tempfile.mkstemp(
+        dir=str(index_path.parent), prefix=".", suffix=SUFFIX
+    )
+    try:
+        with open(descriptor, "wb") as sidecar:
+            sidecar.write(raw)
+        _os.replace(temporary, str(sidecar_path(index_path)))
+    except OSError:
+        _os.unlink(temporary)
+        raise
+    return len(raw)
+
+
+def complete(prefix: str, path: _Path) -> List[str]:
+    """The candidates in the names sidecar at `path` starting with `prefix`"""
+    try:
+        names = path.read_bytes().decode(errors="surrogatepass").split("\n")[:-1]
+    except OSError:
+        return []
+    start = _bisect.bisect_left(names, prefix)
+    stop = start
+    while stop < len(names) and names[stop].startswith(prefix):
+        stop += 1
+    return names[start:stop]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Print the candidates starting with the prefix given in `argv`"""
+    argv = list(_sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ["--"]:
+        argv = argv[1:]
+    todol_dir = _Path(
+        _os.environ.get("TODOL_CONFIG_DIR", "~/.config/todol")
+    ).expanduser()
+    # Mirrors todol._store.index_path, which this module can't import
+    list_name = _os.environ.get("TODOL_LIST", "")
+    path = (
+        todol_dir.joinpath("lists", list_name + SUFFIX)
+        if list_name and list_name != "default"
+        else todol_dir.joinpath("todos" + SUFFIX)
+    )
+    matches = complete(argv[0] if argv else "", path)
+    _sys.stdout.write("".join(name + "\n" for name in matches))
+    return 0
+
+
+if __name__ == "__main__":
+    _sys.exit(main())
@@ -14,9 +14,7 @@ import argparse as _argparse
 import os as _os
 from typing import Any, Callable, Optional, Sequence, Tuple
 
-from . import _utils
-
-__all__ = ["color_options", "due_date_options"]
+__all__ = ["color_options", "json_options", "due_date_options"]
 color_options: _argparse.ArgumentParser = _argparse.ArgumentParser(add_help=False)
 
 
@@ -84,15 +82,26 @@ opts.add_argument(
     dest="force_color",
     default=bool(int(_os.environ.get("TODOL_FORCE_COLOR", 0))),
 )
+# For every command, so --json may also come after it. Suppressed, so that a
+# command doesn't reset a --json given before it
+json_options: _argparse.ArgumentParser = _argparse.ArgumentParser(add_help=False)
+json_options.add_argument(
+    "--json",
+    action="store_true",
+    help="Write JSON lines (one object per todo or result) instead of text",
+    dest="json",
+    default=_argparse.SUPPRESS,
+)
 due_date_options: _argparse.ArgumentParser = _argparse.ArgumentParser(add_help=False)
 due_dates = due_date_options.add_mutually_exclusive_group()
 due_dates.add_argument(  # TODO: Add time capability
     "--due",
     "--due-date",
     "-d",
-    default=str(_utils.tomorrow),
+    default=None,
     type=str,
-    help="The due date in ISO 8601 format, YYYY-MM-DD (padded with zeros, if required)",
+    help="The due date in ISO 8601 format, YYYY-MM-DD (padded with zeros, if required). "
+    "Defaults to tomorrow",
     dest="due_date",
 )
 due_dates.add_argument(
@@ -0,0 +1,108 @@
+"""Fuzzy matching of very long name lists on every core.
+
+:py:meth:`todol.todo_objects.TodoContainer.get` returns the first todo
+whose name fuzzy matches a query. For containers with at least
+``TODOL_FUZZY_THRESHOLD`` (default 20000) todos, and only if
+``TODOL_FUZZY_WORKERS`` opts in (a number of processes, or ``auto`` for one
+per core), the names are split into shards that are scanned by a
+:py:class:`concurrent.futures.ProcessPoolExecutor`. The shards are
+consumed in order and the remaining ones are cancelled as soon as one
+matches, so the result is the same todo the serial scan would return.
+
+"""
+import concurrent.futures as _futures
+import os as _os
+from typing import List, Optional, Sequence, Tuple
+
+from . import _utils
+
+__all__ = ["THRESHOLD", "workers", "enabled", "first_match"]
+
+THRESHOLD = int(_os.environ.get("TODOL_FUZZY_THRESHOLD", 20000))
+_SHARDS_PER_WORKER = 4  # More, smaller shards end early scans sooner
+
+_executor: Optional[_futures.ProcessPoolExecutor] = None
+_executor_workers = 0
+
+
+def workers() -> int:
+    """The number of processes to use, from ``TODOL_FUZZY_WORKERS``. 0 disables"""
+    setting = _os.environ.get("TODOL_FUZZY_WORKERS", "0").strip().lower()
+    if setting == "auto":
+        return _os.cpu_count() or 1
+    return max(int(setting or 0), 0)
+
+
+def enabled(size: int) -> bool:
+    """Whether scanning `size` names should be done in parallel"""
+    return size >= THRESHOLD and workers() > 1
+
+
+def _pool(count: int) -> _futures.ProcessPoolExecutor:
+    # Reused, since starting the processes costs more than most scans
+    global _executor, _executor_workers  # pylint: disable=global-statement
+    if _executor is None or _executor_workers != count:
+        if _executor is not None:
+            _executor.shutdown()
+        _executor = _futures.ProcessPoolExecutor(count)
+        _executor_workers = count
+    return _executor
+
+
+def _scan(shard: Tuple[List[str], str, int]) -> Tuple[int, int, int]:
+    """The index of the first match in the shard (or -1), comparisons and prunes"""
+    names, query, limit = shard
+    comparisons = pruned = 0
+    for index, name in enumerate(names):
+        # The same pruning as the serial scan
+        if abs(len(name) - len(query)) > limit >= 0:
+            pruned += 1
+            continue
+        comparisons += 1
+        if _utils.fuzzy_match(name, query, limit=limit):
+            return index, comparisons, pruned
+    return -1, comparisons, pruned
+
+
+def first_match(
+    names: Sequence[str], query: str, limit: int, count: int = 0
+) -> Tuple[int, int, int]:
+    """Find the first of `names` fuzzy matching `query`, using `count` processes
+
+    Parameters
+    ----------
+    names : Sequence[str]
+        The names to scan, in order.
+    query : str
+        The name to look for.
+    limit : int
+        The fuzzy limit, as for :py:func:`todol._utils.fuzzy_match`.
+    count : int, optional
+        The number of processes. Defaults to :py:func:`workers`.
+
+    Returns
+    -------
+    Tuple[int, int, int]
+        The index of the first match (or -1 if there is none) and the number
+        of names compared and pruned by the shards that were scanned.
+
+    """
+    count = count or workers()
+    size = -(-len(names) // (count * _SHARDS_PER_WORKER)) or 1
+    starts = range(0, len(names), size)
+    shards = [
+        _pool(count).submit(_scan, (list(names[start : start + size]), query, limit))
+        for start in starts
+    ]
+    comparisons = pruned = 0
+    try:
+        for start, shard in zip(starts, shards):
+            index, compared, skipped = shard.result()
+            comparisons += compared
+            pruned += skipped
+            if index >= 0:
+                return start + index, comparisons, pruned
+        return -1, comparisons, pruned
+    finally:
+        for shard in shards:
+            shard.cancel()
@@ -0,0 +1,199 @@
+"""Plugins, discovered through package entry points.
+
+Distributions extend todol by registering objects under the ``todol.<hook>``
+entry point groups:
+
+- ``todol.on_add`` and ``todol.on_finish``: called with the data of every
+  todo added or finished;
+- ``todol.columns``: called with the data of every listed todo, returning
+  an extra column for ``todol list`` (or an empty string);
+- ``todol.storage``: a store format named after the suffix of the indexes
+  it handles (``yaml`` for ``todos.yaml``), with ``dumps(todos) -> bytes``
+  and ``loads(raw) -> dict`` functions.
+
+Scanning every installed distribution for entry points is slow, so what is
+found is cached under the config directory, keyed on the todol version and
+the modification times of the ``sys.path`` directories (which installing
+or removing a distribution changes). Plugin modules are only imported when
+one of their hooks fires, so installing plugins adds nothing to the import
+time of commands that don't use them.
+
+"""
+import hashlib as _hashlib
+import importlib as _importlib
+import json as _json
+import os as _os
+import sys as _sys
+import tempfile as _tempfile
+from pathlib import Path as _Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from . import __version__, _metrics
+
+__all__ = [
+    "HOOKS",
+    "Plugin",
+    "fingerprint",
+    "discover",
+    "set_cache_dir",
+    "plugins",
+    "load",
+    "fire",
+    "storage",
+]
+
+HOOKS = ("on_add", "on_finish", "columns", "storage")
+GROUP_PREFIX = "todol."
+
+Discovered = Dict[str, List[Tuple[str, str]]]  # {hook: [(name, "module:attr")]}
+
+_cache_dir: Optional[_Path] = None
+_discovered: Dict[str, Discovered] = {}
+_loaded: Dict[str, Any] = {}
+
+
+class Plugin(NamedTuple):
+    """An entry point, imported when first loaded"""
+
+    name: str
+    value: str  # "module:attribute"
+
+    def load(self) -> Any:
+        """Import the plugin's module and return the object it points to"""
+        if self.value not in _loaded:
+            module, _, attributes = self.value.partition(":")
+            found = _importlib.import_module(module.strip())
+            for attribute in filter(None, attributes.strip().split(".")):
+                found = getattr(found, attribute)
+            _loaded[self.value] = found
+            _metrics.incr("plugins.loaded")
+        return _loaded[self.value]
+
+
+def fingerprint() -> str:
+    """A digest of the interpreter and the state of the ``sys.path`` directories"""
+    digest = _hashlib.sha1(f"{_sys.executable}\0{__version__}".encode())
+    for entry in _sys.path:
+        try:  # "" (the working directory) fails, and is rightly left out
+            mtime = _os.stat(entry).st_mtime_ns
+        except OSError:
+            mtime = 0
+        digest.update(f"\0{entry}\0{mtime}".encode(errors="surrogatepass"))
+    return digest.hexdigest()
+
+
+def discover() -> Discovered:
+    """Scan the installed distributions for todol's entry points (uncached)"""
+    try:
+        from importlib import metadata  # pylint: disable=C0415
+    except ImportError:  # Python < 3.8
+        try:
+            import importlib_metadata as metadata  # type: ignore # pylint: disable=C0415
+        except ImportError:
+            return {}
+    entry_points = metadata.entry_points()
+    found: Discovered = {}
+    for hook in HOOKS:
+        group = GROUP_PREFIX + hook
+        selected = (
+            entry_points.select(group=group)  # type: ignore
+            if hasattr(entry_points, "select")
+            else entry_points.get(group, ())  # type: ignore
+        )
+        found[hook] = sorted(
+            {(entry_point.name, entry_point.value) for entry_point in selected}
+        )
+    return found
+
+
+def set_cache_dir(cache_dir: Optional[_Path]) -> None:
+    """Cache discovered plugins in `cache_dir`. ``None`` uses the default"""
+    global _cache_dir  # pylint: disable=global-statement
+    _cache_dir = cache_dir
+
+
+def _default_cache_dir() -> _Path:
+    return (
+        _Path(_os.environ.get("TODOL_CONFIG_DIR", "~/.config/todol")).expanduser()
+        / "cache"
+    )
+
+
+def _discover_cached() -> Discovered:
+    cache_dir = _cache_dir or _default_cache_dir()
+    key = fingerprint()
+    if key in _discovered:
+        return _discovered[key]
+    cached = cache_dir.joinpath(f"plugins-{key[:16]}.json")
+    try:
+        found: Discovered = _json.loads(cached.read_text())
+    except (OSError, ValueError):
+        _metrics.incr("plugins.cache_misses")
+        found = discover()
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            for stale in cache_dir.glob("plugins-*.json"):
+                stale.unlink()
+            descriptor, temporary = _tempfile.mkstemp(dir=str(cache_dir), prefix=".")
+            with open(descriptor, "w") as cache:
+                _json.dump(found, cache)
+            _os.replace(temporary, str(cached))
+        except OSError:
+            pass
+    else:
+        _metrics.incr("plugins.cache_hits")
+    _discovered[key] = found
+    return found
+
+
+def plugins(hook: str) -> List[Plugin]:
+    """The plugins registered for `hook`, without importing any of them"""
+    return [Plugin(*entry) for entry in _discover_cached().get(hook, ())]
+
+
+def load(hook: str) -> Tuple[List[Any], List[Tuple[str, Exception]]]:
+    """Import the plugins registered for `hook`
+
+    Returns
+    -------
+    Tuple[List[Any], List[Tuple[str, Exception]]]
+        The loaded objects, and the name and exception of every plugin that
+        failed to load.
+
+    """
+    loaded: List[Any] = []
+    failures: List[Tuple[str, Exception]] = []
+    for plugin in plugins(hook):
+        try:
+            loaded.append(plugin.load())
+        except Exception as exception:  # pylint: disable=broad-except
+            failures.append((plugin.name, exception))
+    return loaded, failures
+
+
+def fire(hook: str, *args: Any) -> List[Tuple[str, Exception]]:
+    """Call every plugin registered for `hook` with `args`
+
+    A failing plugin doesn't stop the others.
+
+    Returns
+    -------
+    List[Tuple[str, Exception]]
+        The name and exception of every plugin that failed to load or run.
+
+    """
+    failures: List[Tuple[str, Exception]] = []
+    for plugin in plugins(hook):
+        try:
+            plugin.load()(*args)
+        except Exception as exception:  # pylint: disable=broad-except
+            failures.append((plugin.name, exception))
+    return failures
+
+
+def storage(name: str) -> Optional[Any]:
+    """The storage backend for the store format `name`, if a plugin provides it"""
+    for plugin in plugins("storage"):
+        if plugin.name == name:
+            return plugin.load()
+    return None
@@ -0,0 +1,73 @@
+"""Recurrence rules for repeating todos.
+
+A recurring todo is stored once, with its next due date and a rule under
+the ``every`` key (``"1d"``, ``"2w"``, ``"1m"`` or ``"1y"``: a count of
+days, weeks, months or years). Later occurrences are never stored; they
+are generated on demand by :py:func:`occurrences`, and finishing a
+recurring todo just moves its due date to the next occurrence.
+
+"""
+import calendar as _calendar
+import datetime as _datetime
+import itertools as _itertools
+import re as _re
+from typing import Iterator, Tuple
+
+__all__ = ["KEY", "ALIASES", "rule", "advance", "occurrences"]
+
+KEY = "every"
+ALIASES = {"daily": "1d", "weekly": "1w", "monthly": "1m", "yearly": "1y"}
+_RULE = _re.compile(r"([1-9][0-9]*)?([dwmy])")
+
+
+def _parse(text: str) -> Tuple[int, str]:
+    match = _RULE.fullmatch(ALIASES.get(text.strip().lower(), text.strip().lower()))
+    if match is None:
+        raise ValueError(
+            f"Invalid recurrence rule {text!r} "
+            f"(use e.g. 1d, 2w, 1m, 1y or one of {', '.join(ALIASES)})"
+        )
+    return int(match.group(1) or 1), match.group(2)
+
+
+def rule(text: str) -> str:
+    """Normalize the recurrence rule `text`, e.g. ``"weekly"`` to ``"1w"``
+
+    Raises
+    ------
+    ValueError
+        `text` is not a recurrence rule.
+
+    """
+    count, unit = _parse(text)
+    return f"{count}{unit}"
+
+
+def _shifted(start: _datetime.date, count: int, unit: str) -> _datetime.date:
+    if unit == "d":
+        return start + _datetime.timedelta(days=count)
+    if unit == "w":
+        return start + _datetime.timedelta(weeks=count)
+    months = start.month - 1 + (count if unit == "m" else 12 * count)
+    year, month = start.year + months // 12, months % 12 + 1
+    # Clamp e.g. January 31st to the end of February
+    return start.replace(
+        year=year, month=month, day=min(start.day, _calendar.monthrange(year, month)[1])
+    )
+
+
+def advance(due_date: _datetime.date, every: str) -> _datetime.date:
+    """The occurrence of the rule `every` following the one due at `due_date`"""
+    return _shifted(due_date, *_parse(every))
+
+
+def occurrences(start: _datetime.date, every: str) -> Iterator[_datetime.date]:
+    """Lazily generate every occurrence of the rule `every`, starting at `start`
+
+    The generator is infinite, so bound it with e.g. :py:func:`itertools.islice`
+    or :py:func:`itertools.takewhile`. Occurrences are computed from `start`,
+    so month ends clamped in one month don't shift the following ones.
+    """
+    count, unit = _parse(every)
+    for number in _itertools.count():
+        yield _shifted(start, count * number, unit)
@@ -0,0 +1,165 @@
+"""Reminders for todos coming due.
+
+:py:class:`Scheduler` keeps a min-heap of the moments active todos should
+be reminded of (a time of day on their due date). :py:func:`run` blocks
+until the earliest of them, so waiting costs nothing however many todos
+are pending. The index is only re-read when a ``stat`` shows that it
+changed, and the heap is then updated incrementally: new todos are pushed
+and removed ones are discarded lazily when they reach the top.
+
+"""
+import datetime as _datetime
+import heapq as _heapq
+import threading as _threading
+from pathlib import Path as _Path
+from typing import Callable, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from . import _metrics, _store
+from .todo_objects import Todo
+
+__all__ = ["Reminder", "Scheduler", "time_of_day", "run"]
+
+_Key = Tuple[str, _datetime.date]
+
+
+class Reminder(NamedTuple):
+    """A todo to remind of, and when"""
+
+    when: _datetime.datetime
+    name: str
+    due_date: _datetime.date
+
+
+def time_of_day(text: str) -> _datetime.time:
+    """Parse a ``HH:MM`` time of day"""
+    hours, _, minutes = text.partition(":")
+    try:
+        return _datetime.time(int(hours), int(minutes or 0))
+    except ValueError as exception:
+        raise ValueError(f"Invalid time of day {text!r} (use HH:MM)") from exception
+
+
+class Scheduler:
+    """A min-heap of the reminders of a set of todos
+
+    Parameters
+    ----------
+    at : datetime.time
+        The time of day todos are reminded of on their due date.
+    overdue : bool
+        Whether to remind of todos whose reminder is already past when they
+        are first seen.
+    clock : Callable[[], datetime.datetime]
+        The current local time.
+
+    """
+
+    def __init__(
+        self,
+        at: _datetime.time = _datetime.time(9),
+        overdue: bool = False,
+        clock: Callable[[], _datetime.datetime] = _datetime.datetime.now,
+    ) -> None:
+        self.at = at
+        self.overdue = overdue
+        self.clock = clock
+        self._heap: List[Tuple[_datetime.datetime, str, _datetime.date]] = []
+        self._pending: Set[_Key] = set()
+        self._seen: Set[_Key] = set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def update(self, todos: Iterable[Todo]) -> None:
+        """Reschedule for the current `todos`, keeping what was already reminded of"""
+        current = {(todo.name, todo.due_date) for todo in todos}
+        now = self.clock()
+        self._pending &= current
+        for name, due_date in current - self._seen:
+            when = _datetime.datetime.combine(due_date, self.at)
+            if when > now or self.overdue:
+                _heapq.heappush(self._heap, (when, name, due_date))
+                self._pending.add((name, due_date))
+        self._seen = current
+        # Drop removed todos now if they outnumber the live ones
+        if len(self._heap) > 2 * len(self._pending) + 64:
+            self._heap = [entry for entry in self._heap if entry[1:] in self._pending]
+            _heapq.heapify(self._heap)
+
+    def _discard_removed(self) -> None:
+        while self._heap and self._heap[0][1:] not in self._pending:
+            _heapq.heappop(self._heap)
+
+    def next_deadline(self) -> Optional[_datetime.datetime]:
+        """When the next reminder is due, if any"""
+        self._discard_removed()
+        return self._heap[0][0] if self._heap else None
+
+    def due(self) -> List[Reminder]:
+        """Pop the reminders that are due now"""
+        now = self.clock()
+        reminders = []
+        self._discard_removed()
+        while self._heap and self._heap[0][0] <= now:
+            when, name, due_date = _heapq.heappop(self._heap)
+            self._pending.discard((name, due_date))
+            reminders.append(Reminder(when, name, due_date))
+            self._discard_removed()
+        return reminders
+
+
+def _stamp(path: _Path) -> Optional[Tuple[int, int]]:
+    try:
+        source = path.stat()
+    except OSError:
+        return None
+    return source.st_size, source.st_mtime_ns
+
+
+def run(
+    index_path: _Path,
+    notify: Callable[[Reminder], None],
+    scheduler: Optional[Scheduler] = None,
+    poll: float = 60,
+    stop: Optional[_threading.Event] = None,
+) -> None:
+    """Call `notify` with the reminders of the index at `index_path` until `stop` is set
+
+    Parameters
+    ----------
+    index_path : Path
+        The todo index to watch.
+    notify : Callable[[Reminder], None]
+        Called with each reminder when it is due.
+    scheduler : Scheduler, optional
+        Decides when to remind. Defaults to reminding at 9:00.
+    poll : float
+        The longest time, in seconds, between checks of whether the index
+        changed. Each check is a single ``stat``.
+    stop : threading.Event, optional
+        Stops the loop when set. Without it, runs forever.
+
+    """
+    if scheduler is None:  # Not `or`: an empty scheduler is falsy
+        scheduler = Scheduler()
+    if stop is None:
+        stop = _threading.Event()
+    stamp: Optional[Tuple[int, int]] = None
+    while not stop.is_set():
+        current = _stamp(index_path)
+        if current != stamp:
+            stamp = current
+            _metrics.incr("remind.reloads")
+            try:
+                todos = _store.read_containers(index_path)["todos"]
+            except (OSError, ValueError):  # Missing or being written
+                stamp = None
+            else:
+                scheduler.update(todos)
+        for reminder in scheduler.due():
+            notify(reminder)
+        deadline = scheduler.next_deadline()
+        timeout = poll
+        if deadline is not None:
+            timeout = min(poll, (deadline - scheduler.clock()).total_seconds())
+        stop.wait(max(timeout, 0))
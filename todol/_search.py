@@ -0,0 +1,147 @@
+"""A persistent inverted index over todo names.
+
+The index is a SQLite database next to the todo index (``todos.search``
+for ``todos.json``) mapping every lowercased word of every todo's name,
+finished or not, to the todos containing it. It is created by the first
+search and then kept up to date incrementally by :py:func:`apply`, which
+the store calls with the changes of every write. Like every SQLite
+sidecar (see :py:mod:`todol._sidecar`), it remembers the size and
+modification time of the index it reflects so that out-of-band edits
+trigger a rebuild instead of wrong results.
+
+"""
+import json as _json
+import re as _re
+import sqlite3 as _sqlite3
+from contextlib import closing as _closing
+from pathlib import Path as _Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import _metrics, _sidecar
+
+__all__ = ["SUFFIX", "Change", "tokenize", "index_path", "apply", "rebuild", "search"]
+
+SUFFIX = ".search"
+VERSION = 1
+_WORD = _re.compile(r"\w+")
+
+Change = _sidecar.Change
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (
+    id INTEGER PRIMARY KEY,
+    section TEXT NOT NULL,
+    todo TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS todos_by_name ON todos (todo, due_date, section);
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    PRIMARY KEY (token, id)
+) WITHOUT ROWID;
+"""
+_SIDECAR = _sidecar.Sidecar("search", SUFFIX, VERSION, _SCHEMA, ("todos", "tokens"))
+
+
+def tokenize(text: str) -> List[str]:
+    """The distinct, lowercased words of `text`"""
+    return list(dict.fromkeys(_WORD.findall(text.lower())))
+
+
+def index_path(store_path: _Path) -> _Path:
+    """Where the search index of the todo index at `store_path` lives"""
+    return _SIDECAR.path(store_path)
+
+
+def _add(connection: _sqlite3.Connection, section: str, data: Dict[str, Any]) -> None:
+    cursor = connection.execute(
+        "INSERT INTO todos (section, todo, due_date, data) VALUES (?, ?, ?, ?)",
+        (section, data["todo"], str(data["due_date"]), _json.dumps(data)),
+    )
+    connection.executemany(
+        "INSERT INTO tokens VALUES (?, ?)",
+        ((token, cursor.lastrowid) for token in tokenize(data["todo"])),
+    )
+
+
+def _remove(
+    connection: _sqlite3.Connection, section: str, data: Dict[str, Any]
+) -> None:
+    row = connection.execute(
+        "SELECT id FROM todos WHERE todo = ? AND due_date = ? AND section = ? LIMIT 1",
+        (data["todo"], str(data["due_date"]), section),
+    ).fetchone()
+    if row is not None:
+        connection.execute("DELETE FROM todos WHERE id = ?", row)
+        connection.execute("DELETE FROM tokens WHERE id = ?", row)
+
+
+def apply(
+    store_path: _Path, previous: Tuple[int, int], changes: Iterable[Change]
+) -> None:
+    """Apply `changes` made to the todo index at `store_path`
+
+    See :py:meth:`todol._sidecar.Sidecar.apply`.
+    """
+    _SIDECAR.apply(store_path, previous, changes, _add, _remove)
+
+
+def rebuild(store_path: _Path, records: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+    """Rebuild the search index of `store_path` from all of its `records`"""
+    with _SIDECAR.rebuilding(store_path) as connection:
+        for section, data in records:
+            _add(connection, section, data)
+
+
+def _prefix_range(prefix: str) -> Tuple[str, str]:
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def search(
+    store_path: _Path,
+    query: str,
+    records: Optional[Iterable[Tuple[str, Dict[str, Any]]]] = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Find the todos whose names contain words starting with every word of `query`
+
+    Parameters
+    ----------
+    store_path : Path
+        The todo index to search.
+    query : str
+        The words to look for. Each one matches as a prefix, case insensitively.
+    records : Iterable[Tuple[str, Dict[str, Any]]], optional
+        Every ``(section, data)`` of the todo index. Only consumed if the
+        search index has to be (re)built.
+
+    Yields
+    ------
+    Tuple[str, Dict[str, Any]]
+        The section and data of each match, in the order they were added.
+
+    """
+    words = tokenize(query)
+    with _closing(_SIDECAR.connect(store_path)) as connection:
+        stale = not _SIDECAR.fresh(connection, store_path)
+    if stale:
+        if records is None:
+            raise ValueError("The search index is out of date")
+        rebuild(store_path, records)
+    if not words:
+        return
+
+    with _metrics.timer("search.query"), _closing(
+        _SIDECAR.connect(store_path)
+    ) as connection:
+        matches = connection.execute(
+            "SELECT section, data FROM todos WHERE id IN ("
+            + " INTERSECT ".join(
+                ["SELECT id FROM tokens WHERE token >= ? AND token < ?"] * len(words)
+            )
+            + ") ORDER BY id",
+            [bound for word in words for bound in _prefix_range(word)],
+        ).fetchall()
+    for section, data in matches:
+        yield section, _json.loads(data)
@@ -0,0 +1,152 @@
+"""Selector expressions, to pick many todos at once.
+
+A selector is a list of space-separated terms (quoted like shell words),
+all of which a todo must match:
+
+- ``PATTERN`` or ``name:PATTERN``: the name matches the glob ``PATTERN``
+  (e.g. ``standup*``), case insensitively;
+- ``re:REGEX``: the regular expression ``REGEX`` matches part of the name;
+- ``due:RANGE``: the todo is due in ``RANGE``, one of ``DATE``, ``<DATE``,
+  ``<=DATE``, ``>DATE``, ``>=DATE`` or ``DATE..DATE`` (inclusive, either
+  end may be left out), where ``DATE`` is in ISO 8601 format or one of
+  ``yesterday``, ``today`` and ``tomorrow``;
+- ``id:ID[,ID...]``: the todo has one of these IDs.
+
+For example, ``"standup*" due:<today`` selects every standup due before
+today. Expressions are compiled once into a :py:class:`Selector`, then
+evaluated against each todo in a single pass.
+
+"""
+import datetime as _datetime
+import fnmatch as _fnmatch
+import re as _re
+import shlex as _shlex
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern
+
+from . import _utils
+
+__all__ = ["Selector", "selector"]
+
+_DAYS: Dict[str, Callable[[], _datetime.date]] = {
+    "yesterday": lambda: _utils.today() - _datetime.timedelta(days=1),
+    "today": _utils.today,
+    "tomorrow": _utils.tomorrow,
+}
+_COMPARISON = _re.compile(r"(<=|>=|<|>)?(.*)")
+
+
+def _date(text: str) -> _datetime.date:
+    day = _DAYS.get(text.strip().lower())
+    return day() if day is not None else _utils.iso_str_to_datetime(text.strip())
+
+
+class Selector:
+    """A compiled selector expression
+
+    Calling it with a :py:class:`todol.todo_objects.Todo` tells whether the
+    todo matches.
+
+    Parameters
+    ----------
+    expression : str
+        The selector expression (see :py:mod:`todol._select`).
+
+    Raises
+    ------
+    ValueError
+        `expression` is empty or has an invalid term.
+
+    """
+
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        self._globs: List[Pattern[str]] = []  # Matching whole names
+        self._regexes: List[Pattern[str]] = []  # Matching anywhere in them
+        self._ids: Optional[List[str]] = None
+        self._earliest: Optional[_datetime.date] = None  # Inclusive bounds
+        self._latest: Optional[_datetime.date] = None
+        terms = _shlex.split(expression)
+        if not terms:
+            raise ValueError("Empty selector")
+        for term in terms:
+            try:
+                self._add(term)
+            except ValueError as exception:
+                raise ValueError(
+                    f"Invalid selector term {term!r}: {exception}"
+                ) from exception
+
+    def _add(self, term: str) -> None:
+        kind, separator, value = term.partition(":")
+        if not separator or kind not in ("name", "re", "due", "id"):
+            kind, value = "name", term
+        if kind == "name":
+            self._globs.append(_re.compile(_fnmatch.translate(value), _re.IGNORECASE))
+        elif kind == "re":
+            try:
+                self._regexes.append(_re.compile(value))
+            except _re.error as exception:
+                raise ValueError(str(exception)) from exception
+        elif kind == "id":
+            ids = [found for found in value.split(",") if found]
+            if not ids:
+                raise ValueError("no IDs")
+            # Several id terms select the IDs common to all of them
+            if self._ids is not None:
+                ids = [found for found in ids if found in self._ids]
+            self._ids = ids
+        else:
+            self._due(value)
+
+    def _due(self, value: str) -> None:
+        earliest: Optional[_datetime.date] = None
+        latest: Optional[_datetime.date] = None
+        if ".." in value:
+            start, end = value.split("..", 1)
+            earliest = _date(start) if start else None
+            latest = _date(end) if end else None
+        else:
+            comparison, text = _COMPARISON.fullmatch(value).groups()  # type: ignore
+            day = _date(text)
+            one_day = _datetime.timedelta(days=1)
+            if comparison in (None, ">=", ">"):
+                earliest = day + one_day if comparison == ">" else day
+            if comparison in (None, "<=", "<"):
+                latest = day - one_day if comparison == "<" else day
+        if earliest is not None and (
+            self._earliest is None or earliest > self._earliest
+        ):
+            self._earliest = earliest
+        if latest is not None and (self._latest is None or latest < self._latest):
+            self._latest = latest
+
+    def __repr__(self) -> str:
+        return f"Selector({self.expression!r})"
+
+    def __call__(self, todo: Any) -> bool:
+        if self._ids is not None and todo.id not in self._ids:
+            return False
+        if self._earliest is not None and todo.due_date < self._earliest:
+            return False
+        if self._latest is not None and todo.due_date > self._latest:
+            return False
+        name = todo.name
+        return all(glob.match(name) for glob in self._globs) and all(
+            regex.search(name) for regex in self._regexes
+        )
+
+    def select(self, todos: Iterable[Any]) -> List[int]:
+        """The positions of the matching `todos`, in one pass"""
+        return [position for position, todo in enumerate(todos) if self(todo)]
+
+
+def selector(text: str) -> Selector:
+    """Compile the selector expression `text`
+
+    Raises
+    ------
+    ValueError
+        `text` is not a valid selector.
+
+    """
+    return Selector(text)
@@ -0,0 +1,146 @@
+"""SQLite sidecars of a todo index, kept up to date with its changes.
+
+A sidecar is a SQLite database next to the todo index (e.g. ``todos.search``
+for ``todos.json``), built from the whole index when first needed and then
+updated incrementally with the changes of every write. Its ``meta`` table
+holds a stamp: the sidecar's version along with the size and modification
+time of the todo index it reflects, so that out-of-band edits (or a newer
+version of todol) trigger a rebuild instead of wrong results.
+
+:py:class:`Sidecar` holds this plumbing; the modules using it only provide
+the schema of their tables and how to add or remove one todo.
+
+"""
+import sqlite3 as _sqlite3
+from contextlib import closing as _closing
+from contextlib import contextmanager as _contextmanager
+from pathlib import Path as _Path
+from typing import Any, Callable, Collection, Dict, Iterable, Iterator, Optional, Tuple
+
+from . import _metrics
+
+__all__ = ["Change", "Row", "Sidecar"]
+
+Change = Tuple[str, str, Dict[str, Any]]  # ("add" | "remove", section, data)
+# Adds or removes the todo `data` of `section` in the sidecar's tables
+Row = Callable[[_sqlite3.Connection, str, Dict[str, Any]], None]
+
+_META = "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);"
+_STAMP_KEYS = ("version", "size", "mtime_ns")
+
+
+class Sidecar:
+    """A stamped SQLite sidecar
+
+    Parameters
+    ----------
+    name : str
+        What it is, prefixing the names of its metrics (e.g. ``"search"``).
+    suffix : str
+        The suffix of its file, next to the todo index.
+    version : int
+        The version of its schema. Sidecars of another version are rebuilt.
+    schema : str
+        The SQL creating its tables (if they don't exist), besides ``meta``.
+    tables : Iterable[str]
+        The tables emptied before rebuilding.
+
+    """
+
+    def __init__(
+        self, name: str, suffix: str, version: int, schema: str, tables: Iterable[str]
+    ) -> None:
+        self.name = name
+        self.suffix = suffix
+        self.version = version
+        self.schema = _META + schema
+        self.tables = tuple(tables)
+
+    def __repr__(self) -> str:
+        return f"Sidecar({self.name!r}, {self.suffix!r})"
+
+    def path(self, store_path: _Path) -> _Path:
+        """Where the sidecar of the todo index at `store_path` lives"""
+        return store_path.with_suffix(self.suffix)
+
+    def connect(self, store_path: _Path) -> _sqlite3.Connection:
+        """Connect to the sidecar of `store_path`, creating its tables if needed"""
+        connection = _sqlite3.connect(str(self.path(store_path)))
+        connection.executescript(self.schema)
+        return connection
+
+    def stamp(self, store_path: _Path) -> Tuple[int, int, int]:
+        """The stamp of a sidecar up to date with the todo index at `store_path`"""
+        source = store_path.stat()
+        return self.version, source.st_size, source.st_mtime_ns
+
+    @staticmethod
+    def _read_stamp(connection: _sqlite3.Connection) -> Tuple[Any, ...]:
+        meta = dict(connection.execute("SELECT key, value FROM meta"))
+        return tuple(meta.get(key) for key in _STAMP_KEYS)
+
+    def _write_stamp(self, connection: _sqlite3.Connection, store_path: _Path) -> None:
+        connection.executemany(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+            zip(_STAMP_KEYS, self.stamp(store_path)),
+        )
+
+    def fresh(self, connection: _sqlite3.Connection, store_path: _Path) -> bool:
+        """Whether the sidecar is up to date with the todo index at `store_path`"""
+        return self._read_stamp(connection) == self.stamp(store_path)
+
+    def apply(
+        self,
+        store_path: _Path,
+        previous: Tuple[int, int],
+        changes: Iterable[Change],
+        add: Row,
+        remove: Row,
+        sections: Optional[Collection[str]] = None,
+    ) -> None:
+        """Apply `changes` made to the todo index at `store_path`
+
+        Parameters
+        ----------
+        store_path : Path
+            The todo index, already written with the changes.
+        previous : Tuple[int, int]
+            The size and modification time (in nanoseconds) of the todo index
+            before it was written. Unless the sidecar was up to date with it,
+            the changes are not applied and it is rebuilt when next used.
+        changes : Iterable[Change]
+            ``(action, section, data)`` tuples where action is ``"add"`` or
+            ``"remove"``.
+        add, remove : Row
+            Add or remove one todo.
+        sections : Collection[str], optional
+            The sections indexed. Defaults to every section.
+
+        """
+        if not self.path(store_path).exists():
+            return  # Never used; built on demand
+        with _metrics.timer(f"{self.name}.update"), _closing(
+            self.connect(store_path)
+        ) as connection:
+            with connection:
+                if self._read_stamp(connection) != (self.version, *previous):
+                    return
+                for action, section, data in changes:
+                    if sections is None or section in sections:
+                        (add if action == "add" else remove)(connection, section, data)
+                self._write_stamp(connection, store_path)
+
+    @_contextmanager
+    def rebuilding(self, store_path: _Path) -> Iterator[_sqlite3.Connection]:
+        """Empty the sidecar of `store_path` to fill it again, in a transaction
+
+        It is stamped as up to date once the block is done.
+        """
+        with _metrics.timer(f"{self.name}.rebuild"), _closing(
+            self.connect(store_path)
+        ) as connection:
+            with connection:
+                for table in self.tables:
+                    connection.execute(f"DELETE FROM {table}")
+                yield connection
+                self._write_stamp(connection, store_path)
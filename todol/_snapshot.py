@@ -0,0 +1,120 @@
+"""A binary snapshot format for todo indexes.
+
+JSON stays the human-readable format; snapshots exist so big indexes can
+be loaded without decoding JSON and parsing every due date. A snapshot is
+a small header followed by a :py:mod:`marshal` payload::
+
+    MAGIC (8 bytes) | VERSION (uint16, little endian) | payload
+
+The payload is ``(strings, sections)`` where ``strings`` is a table of
+every distinct todo name and ``sections`` maps a section (``"todos"``,
+``"finished"``) to three columns: indexes into ``strings``, due dates as
+proleptic Gregorian ordinals, and a sparse ``{position: {key: value}}``
+mapping holding any other keys of the todo's data.
+
+"""
+import datetime as _datetime
+import marshal as _marshal
+import struct as _struct
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from . import _utils
+from .todo_objects import Todo, TodoContainer
+
+__all__ = ["MAGIC", "VERSION", "dumps", "loads", "load_containers"]
+
+MAGIC = b"TODOLSNP"
+VERSION = 1
+_HEADER = _struct.Struct("<8sH")
+_MARSHAL_VERSION = 4
+
+_Section = Tuple[List[int], List[int], Dict[int, Dict[str, Any]]]
+
+
+def _ordinal(due_date: Any) -> int:
+    if isinstance(due_date, _datetime.date):
+        return due_date.toordinal()
+    return _utils.iso_str_to_datetime(str(due_date)).toordinal()
+
+
+def dumps(todos: Dict[str, Iterable[Dict[str, Any]]]) -> bytes:
+    """Serialize a todo index (as stored in JSON) into a snapshot"""
+    strings: Dict[str, int] = {}
+    sections: Dict[str, _Section] = {}
+    for section, items in todos.items():
+        names: List[int] = []
+        ordinals: List[int] = []
+        extras: Dict[int, Dict[str, Any]] = {}
+        for position, item in enumerate(items):
+            names.append(strings.setdefault(item["todo"], len(strings)))
+            ordinals.append(_ordinal(item["due_date"]))
+            if len(item) > 2:
+                extras[position] = {
+                    key: value
+                    for key, value in item.items()
+                    if key not in ("todo", "due_date")
+                }
+        sections[section] = (names, ordinals, extras)
+    return _HEADER.pack(MAGIC, VERSION) + _marshal.dumps(
+        (tuple(strings), sections), _MARSHAL_VERSION
+    )
+
+
+def _decode(
+    raw: bytes,
+) -> Iterator[Tuple[str, List[Dict[str, Any]], List[int], Dict[int, _datetime.date]]]:
+    try:
+        magic, version = _HEADER.unpack_from(raw)
+    except _struct.error as exception:
+        raise ValueError("Not a todol snapshot: truncated header") from exception
+    if magic != MAGIC:
+        raise ValueError("Not a todol snapshot: bad magic number")
+    if version != VERSION:
+        raise ValueError(f"Unsupported snapshot version: {version}")
+    strings, sections = _marshal.loads(raw[_HEADER.size :])
+
+    for section, (names, ordinals, extras) in sections.items():
+        # Dates repeat a lot, so only build each one once
+        dates = {
+            ordinal: _datetime.date.fromordinal(ordinal) for ordinal in set(ordinals)
+        }
+        isoformats = {ordinal: date.isoformat() for ordinal, date in dates.items()}
+        items = [
+            {"todo": strings[name], "due_date": isoformats[ordinal]}
+            for name, ordinal in zip(names, ordinals)
+        ]
+        for position, extra in extras.items():
+            items[position].update(extra)
+        yield section, items, ordinals, dates
+
+
+def loads(raw: bytes) -> Dict[str, List[Dict[str, Any]]]:
+    """Deserialize a snapshot into a todo index (as stored in JSON)
+
+    Raises
+    ------
+    ValueError
+        `raw` is not a snapshot this version of todol can read.
+
+    """
+    return {section: items for section, items, _, _ in _decode(raw)}
+
+
+def load_containers(raw: bytes) -> Dict[str, TodoContainer]:
+    """Deserialize a snapshot directly into :py:class:`TodoContainer` objects.
+
+    Due dates are shared between todos instead of being parsed per item.
+
+    Raises
+    ------
+    ValueError
+        `raw` is not a snapshot this version of todol can read.
+
+    """
+    from_parts = Todo._from_parts  # pylint: disable=protected-access
+    return {
+        section: TodoContainer(
+            [from_parts(data, dates[ordinal]) for data, ordinal in zip(items, ordinals)]
+        )
+        for section, items, ordinals, dates in _decode(raw)
+    }
@@ -0,0 +1,300 @@
+"""Completion statistics, kept up to date incrementally.
+
+Finishing a todo records the day it was finished in its data (under
+``finished_on``). A sidecar next to the todo index (``todos.stats`` for
+``todos.json``) holds the number of todos finished on every day, how many
+of them were late and by how many days in total, along with running totals
+of the same. :py:func:`apply`, which the store calls with the changes of
+every write, adjusts the counters of the finished todos added or removed
+(so undoing a finish uncounts it), and :py:func:`summary` reads only the
+days it reports on instead of scanning the ever-growing finished todos.
+
+The sidecar is laid out as::
+
+    header | one record per day, from the first day anything was finished
+
+Like the search index, it remembers the size and modification time of the
+index it reflects, so out-of-band edits trigger a rebuild from a scan of
+the finished todos instead of wrong numbers. Todos finished without a
+recorded day (before todol recorded them, or occurrences of recurring
+todos, which aren't kept) are not counted.
+
+"""
+import datetime as _datetime
+import os as _os
+import struct as _struct
+import tempfile as _tempfile
+from pathlib import Path as _Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from . import _metrics, _search, _utils
+
+__all__ = [
+    "FINISHED_ON",
+    "SUFFIX",
+    "Aggregates",
+    "Summary",
+    "stats_path",
+    "lateness",
+    "apply",
+    "rebuild",
+    "verify",
+    "summary",
+]
+
+FINISHED_ON = "finished_on"
+SUFFIX = ".stats"
+MAGIC = b"TODOLSTA"
+VERSION = 1
+# Magic, version, index size and mtime, first day, then finished, late and
+# days late in total
+_HEADER = _struct.Struct("<8sHqqqqqq")
+_DAY = _struct.Struct("<III")  # Finished, late and days late on one day
+
+Counts = List[int]  # [finished, late, days late]
+
+
+def stats_path(index_path: _Path) -> _Path:
+    """Where the statistics of the todo index at `index_path` live"""
+    return index_path.with_suffix(SUFFIX)
+
+
+def lateness(data: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """The day (as an ordinal) a finished todo was finished on, and how late
+
+    None if the day it was finished on wasn't recorded, or either date isn't
+    a valid ISO 8601 date (e.g. after a bad hand edit), so such todos are
+    not counted instead of breaking the statistics.
+    """
+    finished_on = data.get(FINISHED_ON)
+    if finished_on is None:
+        return None
+    try:
+        day = _utils.iso_str_to_datetime(finished_on).toordinal()
+        due = _utils.iso_str_to_datetime(str(data["due_date"])).toordinal()
+    except (KeyError, TypeError, ValueError):
+        return None
+    return day, max(day - due, 0)
+
+
+class Aggregates:
+    """The counters of the todos finished on every day, and their totals"""
+
+    def __init__(self) -> None:
+        self.days: Dict[int, Counts] = {}
+        self.totals: Counts = [0, 0, 0]
+
+    @classmethod
+    def scan(cls, finished: Iterable[Dict[str, Any]]) -> "Aggregates":
+        """Count all of the `finished` todos"""
+        aggregates = cls()
+        for data in finished:
+            aggregates.count(data)
+        return aggregates
+
+    def count(self, data: Dict[str, Any], sign: int = 1) -> None:
+        """Count the finished todo `data` in, or out if `sign` is -1"""
+        found = lateness(data)
+        if found is None:
+            return
+        day, late = found
+        counts = self.days.setdefault(day, [0, 0, 0])
+        for position, amount in enumerate((1, late > 0, late)):
+            counts[position] += sign * amount
+            self.totals[position] += sign * amount
+
+    def dumps(self, stamp: Tuple[int, int]) -> bytes:
+        """The sidecar of these aggregates, for an index with the `stamp`"""
+        days = {day: counts for day, counts in self.days.items() if any(counts)}
+        first = min(days, default=0)
+        records = bytearray(_DAY.size * ((max(days) - first + 1) if days else 0))
+        for day, counts in days.items():
+            _DAY.pack_into(records, _DAY.size * (day - first), *counts)
+        return _HEADER.pack(MAGIC, VERSION, *stamp, first, *self.totals) + records
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "Aggregates":
+        """Read the aggregates of a whole sidecar"""
+        first, *totals = _HEADER.unpack_from(raw)[4:]
+        aggregates = cls()
+        aggregates.totals = totals
+        for position, counts in enumerate(_DAY.iter_unpack(raw[_HEADER.size :])):
+            if any(counts):
+                aggregates.days[first + position] = list(counts)
+        return aggregates
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, Aggregates)
+            and self.totals == other.totals
+            and {day: counts for day, counts in self.days.items() if any(counts)}
+            == {day: counts for day, counts in other.days.items() if any(counts)}
+        )
+
+
+def _stamp(index_path: _Path) -> Tuple[int, int]:
+    source = index_path.stat()
+    return source.st_size, source.st_mtime_ns
+
+
+def _read_header(path: _Path) -> Optional[Tuple[Any, ...]]:
+    try:
+        with path.open("rb") as sidecar:
+            header = _HEADER.unpack(sidecar.read(_HEADER.size))
+    except (OSError, _struct.error):
+        return None
+    if header[:2] != (MAGIC, VERSION):
+        return None
+    return header
+
+
+def _write(index_path: _Path, aggregates: Aggregates, stamp: Tuple[int, int]) -> None:
+    raw = aggregates.dumps(stamp)
+    descriptor, temporary = _tempfile.mkstemp(
+        dir=str(index_path.parent), prefix=".", suffix=SUFFIX
+    )
+    try:
+        with open(descriptor, "wb") as sidecar:
+            sidecar.write(raw)
+        _os.replace(temporary, str(stats_path(index_path)))
+    except OSError:
+        _os.unlink(temporary)
+        raise
+
+
+def apply(
+    index_path: _Path, previous: Tuple[int, int], changes: Iterable[_search.Change]
+) -> None:
+    """Apply `changes` made to the todo index at `index_path`
+
+    Parameters
+    ----------
+    index_path : Path
+        The todo index, already written with the changes.
+    previous : Tuple[int, int]
+        The size and modification time (in nanoseconds) of the todo index
+        before it was written. Unless the statistics were up to date with
+        it, the changes are not applied and they are rebuilt when next shown.
+    changes : Iterable[Change]
+        ``(action, section, data)`` tuples where action is ``"add"`` or
+        ``"remove"``. Only the finished todos matter.
+
+    """
+    path = stats_path(index_path)
+    header = _read_header(path)
+    if header is None or tuple(header[2:4]) != previous:
+        return  # Never shown, or out of date: rebuilt on demand
+    with _metrics.timer("stats.update"):
+        aggregates = Aggregates.loads(path.read_bytes())
+        for action, section, data in changes:
+            if section == "finished":
+                aggregates.count(data, 1 if action == "add" else -1)
+        try:
+            _write(index_path, aggregates, _stamp(index_path))
+        except _struct.error:  # Uncounted more than was counted: out of sync
+            path.unlink()
+
+
+def rebuild(index_path: _Path, finished: Iterable[Dict[str, Any]]) -> Aggregates:
+    """Rebuild the statistics of `index_path` from all of its `finished` todos"""
+    # Stamped before scanning, so a concurrent write can only make it stale
+    stamp = _stamp(index_path)
+    with _metrics.timer("stats.rebuild"):
+        aggregates = Aggregates.scan(finished)
+        _write(index_path, aggregates, stamp)
+    return aggregates
+
+
+def verify(index_path: _Path, finished: Iterable[Dict[str, Any]]) -> bool:
+    """Rebuild the statistics of `index_path`, checking the incremental ones
+
+    Returns
+    -------
+    bool
+        Whether the statistics were up to date and matched a scan of the
+        `finished` todos.
+
+    """
+    path = stats_path(index_path)
+    header = _read_header(path)
+    current = None
+    if header is not None and tuple(header[2:4]) == _stamp(index_path):
+        current = Aggregates.loads(path.read_bytes())
+    return rebuild(index_path, finished) == current
+
+
+class Summary(NamedTuple):
+    """Completion statistics"""
+
+    days: List[Tuple[_datetime.date, int]]  # Todos finished per day
+    weeks: List[Tuple[_datetime.date, int]]  # Per week, by their Mondays
+    finished: int
+    late: int
+    days_late: int
+
+
+def summary(
+    index_path: _Path,
+    finished: Optional[Iterable[Dict[str, Any]]] = None,
+    today: Optional[_datetime.date] = None,
+    days: int = 7,
+    weeks: int = 4,
+) -> Summary:
+    """Summarize the statistics of the todo index at `index_path`
+
+    Only the records of the days shown are read.
+
+    Parameters
+    ----------
+    index_path : Path
+        The todo index.
+    finished : Iterable[Dict[str, Any]], optional
+        Every finished todo of the index. Only consumed if the statistics
+        have to be (re)built.
+    today : datetime.date, optional
+        The last day shown. Defaults to the current date.
+    days : int, optional
+        The number of days to show the todos finished on.
+    weeks : int, optional
+        The number of weeks (ending on Sundays) to show the todos finished in.
+
+    Raises
+    ------
+    ValueError
+        The statistics are out of date and `finished` is not given.
+
+    """
+    today = today or _utils.today()
+    path = stats_path(index_path)
+    header = _read_header(path)
+    if header is None or tuple(header[2:4]) != _stamp(index_path):
+        if finished is None:
+            raise ValueError("The statistics are out of date")
+        rebuild(index_path, finished)
+        header = _read_header(path)
+        assert header is not None
+    first_day, *totals = header[4:]
+
+    last = today.toordinal()
+    monday = last - today.weekday()
+    start = min(last - days + 1, monday - 7 * (weeks - 1))
+    counts = [0] * (last - start + 1)
+    with path.open("rb") as sidecar:
+        # Only the records of the days shown
+        skip = max(first_day - start, 0)
+        sidecar.seek(_HEADER.size + _DAY.size * max(start - first_day, 0))
+        raw = sidecar.read(_DAY.size * max(len(counts) - skip, 0))
+    for position, (count, _, _) in enumerate(_DAY.iter_unpack(raw), skip):
+        counts[position] = count
+
+    def date(ordinal: int) -> _datetime.date:
+        return _datetime.date.fromordinal(ordinal)
+
+    return Summary(
+        [(date(day), counts[day - start]) for day in range(last - days + 1, last + 1)],
+        [
+            (date(week), sum(counts[week - start : week - start + 7]))
+            for week in range(monday - 7 * (weeks - 1), monday + 1, 7)
+        ],
+        *totals,
+    )
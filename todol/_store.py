@@ -0,0 +1,286 @@
+"""Reading and writing todo indexes.
+
+The on-disk format is picked from the index's suffix: ``.json`` for the
+human-readable JSON format and ``.snap`` for binary snapshots (see
+:py:mod:`todol._snapshot`). Plugins can provide more formats (see
+:py:mod:`todol._plugins`). ``TODOL_STORE_FORMAT`` selects which one todol
+uses for its own index.
+
+Besides the default index, the config directory can hold named lists, each
+with its own index (and sidecars) in the ``lists`` subdirectory, so using
+one list never loads another.
+
+Indexes are published as immutable generations (see
+:py:mod:`todol._generations`), so reading one never needs a lock and never
+sees a partial write.
+
+"""
+import json as _json
+import os as _os
+import re as _re
+from pathlib import Path as _Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import (
+    _dedupe,
+    _generations,
+    _metrics,
+    _mmap_index,
+    _names,
+    _plugins,
+    _search,
+    _snapshot,
+    _stats,
+)
+from .todo_objects import TodoContainer
+
+__all__ = [
+    "FORMATS",
+    "SECTIONS",
+    "empty",
+    "index_path",
+    "lists",
+    "counts",
+    "read",
+    "read_containers",
+    "iter_data",
+    "write",
+    "lock",
+]
+
+FORMATS: Dict[str, str] = {"json": ".json", "snapshot": ".snap"}
+SECTIONS = _mmap_index.SECTIONS
+LISTS_DIR = "lists"
+DEFAULT_LIST = "default"
+_LIST_NAME = _re.compile(r"\w[\w.-]*")
+
+TodoData = Dict[str, List[Dict[str, str]]]
+Change = _search.Change
+lock = _generations.lock
+
+
+def empty() -> TodoData:
+    """A fresh, empty todo index"""
+    return {"todos": [], "finished": []}
+
+
+def index_path(todol_dir: _Path, store_format: str = "", list_name: str = "") -> _Path:
+    """The path of the todo index in `todol_dir`
+
+    Parameters
+    ----------
+    todol_dir : Path
+        The todol config directory.
+    store_format : str, optional
+        One of :py:data:`FORMATS`, or a format provided by a plugin. Defaults
+        to ``TODOL_STORE_FORMAT`` or JSON.
+    list_name : str, optional
+        The named list to use. Defaults to the default list.
+
+    Raises
+    ------
+    ValueError
+        The store format is unknown or the list name is invalid.
+
+    """
+    store_format = store_format or _os.environ.get("TODOL_STORE_FORMAT", "json")
+    suffix = FORMATS.get(store_format) or "." + store_format
+    if store_format not in FORMATS and _plugins.storage(store_format) is None:
+        raise ValueError(
+            f"Unknown store format {store_format!r} "
+            f"(choose from {', '.join(FORMATS)})"
+        )
+    if not list_name or list_name == DEFAULT_LIST:
+        return todol_dir.joinpath("todos" + suffix)
+    if not _LIST_NAME.fullmatch(list_name):
+        raise ValueError(
+            f"Invalid list name {list_name!r} "
+            "(use letters, digits, _, . and -, starting with a letter or digit)"
+        )
+    return todol_dir.joinpath(LISTS_DIR, list_name + suffix)
+
+
+def lists(todol_dir: _Path, store_format: str = "") -> Dict[str, _Path]:
+    """The index of every list in `todol_dir`, by name, default list first
+
+    Lists stored in another format are included, like :py:func:`read` falls
+    back to them.
+    """
+    found = {}
+    suffixes = {*FORMATS.values(), index_path(todol_dir, store_format).suffix}
+    for name in [DEFAULT_LIST] + sorted(
+        {
+            path.stem
+            for path in todol_dir.joinpath(LISTS_DIR).glob("*")
+            if path.suffix in suffixes and _LIST_NAME.fullmatch(path.stem)
+        }
+    ):
+        path = index_path(todol_dir, store_format, name)
+        if path.exists() or path.with_suffix(FORMATS["json"]).exists():
+            found[name] = path
+    return found
+
+
+def counts(path: _Path) -> Dict[str, int]:
+    """The number of todos in each section of the index at `path`
+
+    Only reads the header of the index's sidecar, unless it is out of date.
+
+    Raises
+    ------
+    OSError
+        The index does not exist.
+
+    """
+    found = _mmap_index.read_counts(path)
+    if found is None:
+        _metrics.incr("store.counts_fallbacks")
+        todos = read(path)
+        found = {section: len(todos[section]) for section in SECTIONS}
+    return found
+
+
+def _read_raw(path: _Path) -> Tuple[bytes, _Path]:
+    """The content of the index at `path`, and the path it was actually read from"""
+    try:
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            if not path.is_symlink():
+                raise
+            # The generation was collected as it was opened: read the newer one
+            raw = path.read_bytes()
+    except FileNotFoundError:
+        # Fall back to a JSON index so switching formats needs no conversion
+        legacy = path.with_suffix(FORMATS["json"])
+        if legacy == path or not legacy.exists():
+            raise
+        raw = legacy.read_bytes()
+        path = legacy
+    _metrics.gauge("store.bytes", len(raw))
+    return raw, path
+
+
+def _is_snapshot(raw: bytes) -> bool:
+    return raw.startswith(_snapshot.MAGIC)
+
+
+def _backend(path: _Path) -> Optional[Any]:
+    """The plugin storing indexes with the suffix of `path`, if not a built-in one"""
+    if path.suffix in FORMATS.values():
+        return None
+    return _plugins.storage(path.suffix[1:])
+
+
+def _loads(path: _Path, raw: bytes) -> TodoData:
+    if _is_snapshot(raw):
+        return _snapshot.loads(raw)
+    backend = _backend(path)
+    if backend is not None:
+        return backend.loads(raw)  # type: ignore
+    return _json.loads(raw)  # type: ignore
+
+
+def read(path: _Path) -> TodoData:
+    """Read the todo index at `path`
+
+    Raises
+    ------
+    OSError
+        The index does not exist.
+
+    """
+    with _metrics.timer("store.load"):
+        raw, source = _read_raw(path)
+        todos = _loads(source, raw)
+    assert isinstance(todos, dict)
+    _metrics.gauge("store.todos", len(todos["todos"]))
+    _metrics.gauge("store.finished", len(todos["finished"]))
+    return todos
+
+
+def read_containers(path: _Path) -> Dict[str, TodoContainer]:
+    """Read the todo index at `path` as :py:class:`TodoContainer` objects"""
+    with _metrics.timer("store.load"):
+        raw, source = _read_raw(path)
+        if _is_snapshot(raw):
+            containers = _snapshot.load_containers(raw)
+        else:
+            containers = {
+                section: TodoContainer(todos)
+                for section, todos in _loads(source, raw).items()
+            }
+    _metrics.gauge("store.todos", len(containers["todos"]))
+    _metrics.gauge("store.finished", len(containers["finished"]))
+    return containers
+
+
+def iter_data(path: _Path) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """Stream ``(section, data)`` for every todo in the index at `path`.
+
+    Uses constant memory when the index's sidecar is up to date.
+
+    Raises
+    ------
+    OSError
+        The index does not exist.
+
+    """
+    mapped = _mmap_index.open_for(path)
+    if mapped is None:
+        todos = read(path)
+        for section in SECTIONS:
+            for data in todos[section]:
+                yield section, data
+        return
+    with mapped:
+        for section in SECTIONS:
+            for data in mapped[section].data():
+                yield section, data
+
+
+def write(
+    path: _Path, todos: TodoData, changes: Optional[Iterable[Change]] = None
+) -> int:
+    """Write `todos` to the index at `path` and refresh its sidecars.
+
+    Parameters
+    ----------
+    path : Path
+        The todo index.
+    todos : TodoData
+        The whole, updated todo index.
+    changes : Iterable[Change], optional
+        What changed since the index was read, as ``(action, section, data)``
+        tuples where action is ``"add"`` or ``"remove"``. Lets sidecars
+        update incrementally; without it they are rebuilt when next needed.
+
+    Returns
+    -------
+    int
+        The number of bytes written.
+
+    """
+    try:
+        previous = path.stat()
+    except OSError:
+        previous = None
+    with _metrics.timer("store.save"):
+        backend = _backend(path)
+        if path.suffix == FORMATS["snapshot"]:
+            raw = _snapshot.dumps(todos)
+        elif backend is not None:
+            raw = backend.dumps(todos)
+        else:
+            raw = _json.dumps(todos).encode()
+        _metrics.gauge("store.generation", _generations.publish(path, raw))
+        written = len(raw) + _mmap_index.write(path, todos)
+        written += _names.write(path, todos["todos"])
+        if changes is not None and previous is not None:
+            stamp = (previous.st_size, previous.st_mtime_ns)
+            changes = list(changes)
+            _search.apply(path, stamp, changes)
+            _stats.apply(path, stamp, changes)
+            _dedupe.apply(path, stamp, changes)
+    _metrics.incr("store.bytes_written", written)
+    return written
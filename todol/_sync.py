@@ -0,0 +1,360 @@
+"""Three-way synchronization of two todo indexes.
+
+Records are identified by a digest of their section and content, so both
+indexes are multisets of digests. Merging them against the multiset they
+had in common after their last sync (the base) keeps every change made on
+either side since:
+
+- a record changed on one side only takes that side's count;
+- a record changed the same way on both sides is taken once;
+- otherwise the additions and removals of both sides are combined.
+
+What changed on each side since the last sync is read from the log of its
+journal (see :py:mod:`todol._journal`), so a sync costs as much as the
+changes it merges and only reads (and writes) the indexes it changes. If
+the log doesn't cover a side's changes (it was edited by hand, or more
+writes were made than the journal keeps), both indexes are read in full
+and merged against the base instead. Either way each index then only gets
+the records it is missing added and the ones it should lose removed.
+
+The base is kept next to each index, in the ``sync`` directory, as a
+header followed by the digests added to and removed from it. The header
+holds the stamp of the index after the sync, an identifier of the sync
+(telling whether both sides' bases are the same) and how many digests
+follow. Syncs merged from the logs append to it, and it is rewritten as
+the sorted digests of the base once they outnumber it.
+
+"""
+import collections as _collections
+import contextlib as _contextlib
+import hashlib as _hashlib
+import json as _json
+import os as _os
+import struct as _struct
+import tempfile as _tempfile
+from pathlib import Path as _Path
+from typing import Any, Counter, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from . import _journal, _store
+
+__all__ = ["Result", "digest", "state_path", "merge", "merge_changes", "sync"]
+
+MAGIC = b"TODOLSYN"
+VERSION = 2
+# Magic, version, index size and modification time, sync id, number of
+# additions and removals that follow, number of digests in the base
+_HEADER = _struct.Struct("<8sHqq8sQQ")
+_DIGEST_SIZE = 16
+_ADD, _REMOVE = b"+", b"-"
+_OP_SIZE = 1 + _DIGEST_SIZE
+_SLACK = 64  # Additions and removals a base may hold besides its digests
+
+Record = Tuple[str, Dict[str, Any]]
+
+
+class Result(NamedTuple):
+    """The changes a sync made to each index"""
+
+    local: List[_store.Change]
+    remote: List[_store.Change]
+
+
+class _State(NamedTuple):
+    stamp: _journal.Stamp
+    sync: bytes
+    count: int
+    size: int
+
+
+def digest(section: str, data: Dict[str, Any]) -> bytes:
+    """The identity of a record: a hash of its section and content"""
+    return _hashlib.blake2b(
+        _json.dumps([section, data], sort_keys=True, separators=(",", ":")).encode(
+            errors="surrogatepass"
+        ),
+        digest_size=_DIGEST_SIZE,
+    ).digest()
+
+
+def state_path(index_path: _Path, peer_path: _Path) -> _Path:
+    """Where the base of syncing `index_path` with `peer_path` is kept"""
+    # Not resolving the index itself, which links to its current generation
+    peer_path = peer_path.parent.resolve().joinpath(peer_path.name)
+    peer = _hashlib.blake2b(
+        str(peer_path).encode(errors="surrogatepass"), digest_size=8
+    ).hexdigest()
+    return index_path.parent.joinpath("sync", f"{index_path.stem}-{peer}")
+
+
+def _load_state(path: _Path) -> Optional[_State]:
+    try:
+        with path.open("rb") as state:
+            magic, version, *stamp, sync, count, size = _HEADER.unpack(
+                state.read(_HEADER.size)
+            )
+    except (OSError, _struct.error):
+        return None
+    if magic != MAGIC or version != VERSION:
+        return None
+    return _State(tuple(stamp), sync, count, size)  # type: ignore
+
+
+def _load_base(path: _Path, state: _State) -> Counter[bytes]:
+    try:
+        raw = path.read_bytes()
+    except OSError:
+        return _collections.Counter()
+    base: Counter[bytes] = _collections.Counter()
+    # Anything past the count is left over from an interrupted append
+    end = min(_HEADER.size + state.count * _OP_SIZE, len(raw))
+    for start in range(_HEADER.size, end - _OP_SIZE + 1, _OP_SIZE):
+        key = raw[start + 1 : start + _OP_SIZE]
+        base[key] += 1 if raw[start : start + 1] == _ADD else -1
+    return +base
+
+
+def _header(index_path: _Path, sync: bytes, count: int, size: int) -> bytes:
+    stamp = _journal.stamp(index_path) or (0, 0)
+    return _HEADER.pack(MAGIC, VERSION, *stamp, sync, count, size)
+
+
+def _save_state(
+    path: _Path, index_path: _Path, sync: bytes, base: Counter[bytes]
+) -> None:
+    path.parent.mkdir(exist_ok=True)
+    digests = sorted(base.elements())
+    raw = _header(index_path, sync, len(digests), len(digests)) + b"".join(
+        _ADD + key for key in digests
+    )
+    descriptor, temporary = _tempfile.mkstemp(dir=str(path.parent), prefix=".")
+    try:
+        with open(descriptor, "wb") as state:
+            state.write(raw)
+        _os.replace(temporary, str(path))
+    except OSError:
+        _os.unlink(temporary)
+        raise
+
+
+def _append_state(
+    path: _Path, index_path: _Path, state: _State, sync: bytes, delta: Counter[bytes]
+) -> None:
+    """Move the base at `path` by `delta`, as of a sync of `index_path`"""
+    ops = b"".join(
+        (_ADD if count > 0 else _REMOVE) + key
+        for key, count in delta.items()
+        for _ in range(abs(count))
+    )
+    count = state.count + len(ops) // _OP_SIZE
+    size = state.size + sum(delta.values())
+    if count > 2 * size + _SLACK:  # Mostly churn by now: rewrite it
+        base = _load_base(path, state)
+        base.update(delta)
+        _save_state(path, index_path, sync, +base)
+        return
+    with path.open("r+b") as output:
+        # The digests first: until the header counts them, they are ignored
+        output.seek(_HEADER.size + state.count * _OP_SIZE)
+        output.write(ops)
+        output.truncate()
+        output.flush()
+        _os.fsync(output.fileno())
+        output.seek(0)
+        output.write(_header(index_path, sync, count, size))
+
+
+def _records(todos: _store.TodoData) -> Dict[bytes, Record]:
+    return {
+        digest(section, data): (section, data)
+        for section in _store.SECTIONS
+        for data in todos[section]
+    }
+
+
+def _counts(todos: _store.TodoData) -> Counter[bytes]:
+    return _collections.Counter(
+        digest(section, data) for section in _store.SECTIONS for data in todos[section]
+    )
+
+
+def _changes(
+    have: Counter[bytes], want: Counter[bytes], records: Dict[bytes, Record]
+) -> List[_store.Change]:
+    changes: List[_store.Change] = []
+    for key, (section, data) in records.items():
+        difference = want[key] - have[key]
+        action = "add" if difference > 0 else "remove"
+        changes.extend((action, section, data) for _ in range(abs(difference)))
+    # Removals first, so moving a todo between sections reads naturally
+    changes.sort(key=lambda change: change[0] == "add")
+    return changes
+
+
+def merge(
+    base: Counter[bytes], local: _store.TodoData, remote: _store.TodoData
+) -> Result:
+    """The changes that bring `local` and `remote` to their three-way merge"""
+    local_counts, remote_counts = _counts(local), _counts(remote)
+    merged: Counter[bytes] = _collections.Counter()
+    for key in local_counts.keys() | remote_counts.keys():
+        ours, theirs, common = local_counts[key], remote_counts[key], base[key]
+        if ours == common or ours == theirs:
+            merged[key] = theirs
+        elif theirs == common:
+            merged[key] = ours
+        else:
+            merged[key] = max(ours + theirs - common, 0)
+    # Added records keep the order they have locally, then remotely
+    records = _records(local)
+    for key, record in _records(remote).items():
+        records.setdefault(key, record)
+    return Result(
+        _changes(local_counts, merged, records),
+        _changes(remote_counts, merged, records),
+    )
+
+
+def _net(
+    changes: Iterable[_store.Change],
+) -> Tuple[Counter[bytes], Dict[bytes, Record]]:
+    """How many times each record was added (or, if negative, removed)"""
+    net: Counter[bytes] = _collections.Counter()
+    records: Dict[bytes, Record] = {}
+    for action, section, data in changes:
+        key = digest(section, data)
+        net[key] += 1 if action == "add" else -1
+        records.setdefault(key, (section, data))
+    return net, records
+
+
+def merge_changes(
+    local: Iterable[_store.Change], remote: Iterable[_store.Change]
+) -> Result:
+    """The changes that bring two indexes to their three-way merge
+
+    Like :py:func:`merge`, from the changes made to each index since the
+    base instead of the whole indexes. Removing a record more times than
+    an index has it is left for the caller to skip.
+    """
+    ours, records = _net(local)
+    theirs, remote_records = _net(remote)
+    for key, record in remote_records.items():
+        records.setdefault(key, record)
+    to_local: Counter[bytes] = _collections.Counter()
+    to_remote: Counter[bytes] = _collections.Counter()
+    for key in ours.keys() | theirs.keys():
+        # Each side gets what the other changed, unless both did the same
+        if ours[key] != theirs[key]:
+            to_local[key], to_remote[key] = theirs[key], ours[key]
+    empty: Counter[bytes] = _collections.Counter()
+    return Result(
+        _changes(empty, to_local, records), _changes(empty, to_remote, records)
+    )
+
+
+def _read(path: _Path) -> _store.TodoData:
+    try:
+        return _store.read(path)
+    except FileNotFoundError:
+        return _store.empty()
+
+
+def _write(path: _Path, todos: _store.TodoData, changes: List[_store.Change]) -> None:
+    previous = _journal.stamp(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _store.write(path, todos, changes)
+    _journal.record(path, "sync", changes, previous)
+
+
+def sync(local_path: _Path, remote_path: _Path) -> Result:
+    """Synchronize the todo indexes at `local_path` and `remote_path`
+
+    Missing indexes are created. Both indexes journal the changes made to
+    them, so a sync can be undone on either side.
+
+    Returns
+    -------
+    Result
+        The changes made to each index.
+
+    """
+    # Both writer locks, always taken in the same order so that syncs in
+    # opposite directions can't deadlock
+    with _contextlib.ExitStack() as locks:
+        for path in sorted(
+            {
+                _Path(_os.path.abspath(str(local_path))),
+                _Path(_os.path.abspath(str(remote_path))),
+            }
+        ):
+            locks.enter_context(_store.lock(path))
+        return _sync(local_path, remote_path)
+
+
+def _update(path: _Path, changes: List[_store.Change]) -> List[_store.Change]:
+    """Apply `changes` to the index at `path`, returning those that were
+
+    Removals of records it no longer has (removed on both sides, more
+    times than it had them) are skipped.
+    """
+    if not changes:
+        return changes
+    todos = _read(path)
+    applied: List[_store.Change] = []
+    for change in changes:
+        action, section, data = change
+        if action == "add":
+            todos[section].append(data)
+        elif data in todos[section]:
+            todos[section].remove(data)
+        else:
+            continue
+        applied.append(change)
+    if applied:
+        _write(path, todos, applied)
+    return applied
+
+
+def _sync(local_path: _Path, remote_path: _Path) -> Result:
+    local_state_path = state_path(local_path, remote_path)
+    remote_state_path = state_path(remote_path, local_path)
+    local_state = _load_state(local_state_path)
+    remote_state = _load_state(remote_state_path)
+    base: Counter[bytes] = _collections.Counter()
+    if (
+        local_state is not None
+        and remote_state is not None
+        and local_state.sync == remote_state.sync
+    ):
+        local_changes = _journal.since(local_path, local_state.stamp)
+        remote_changes = _journal.since(remote_path, remote_state.stamp)
+        if local_changes is not None and remote_changes is not None:
+            if not local_changes and not remote_changes:
+                return Result([], [])  # Neither changed since the last sync
+            result = merge_changes(local_changes, remote_changes)
+            result = Result(
+                _update(local_path, result.local), _update(remote_path, result.remote)
+            )
+            # The base moves to the merged records, the same on both sides
+            delta, _ = _net(local_changes + result.local)
+            sync_id = _os.urandom(8)
+            _append_state(local_state_path, local_path, local_state, sync_id, delta)
+            _append_state(remote_state_path, remote_path, remote_state, sync_id, delta)
+            return result
+        base = _load_base(local_state_path, local_state)
+
+    # The journals don't cover the changes: compare the whole indexes
+    local, remote = _read(local_path), _read(remote_path)
+    result = merge(base, local, remote)
+    for path, todos, changes in (
+        (local_path, local, result.local),
+        (remote_path, remote, result.remote),
+    ):
+        if changes or not path.exists():
+            _journal.apply(todos, changes)
+            _write(path, todos, changes)
+    merged = _counts(local)
+    sync_id = _os.urandom(8)
+    _save_state(local_state_path, local_path, sync_id, merged)
+    _save_state(remote_state_path, remote_path, sync_id, merged)
+    return result
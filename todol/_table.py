@@ -0,0 +1,135 @@
+"""Rendering rows of text as a table fitting the terminal.
+
+Widths are measured in terminal cells: East Asian wide and fullwidth
+characters take two, combining marks and other zero-width characters
+none. Each cell is measured once, column by column; the flexible column is
+then shrunk to fit, ellipsizing the cells that don't, and the table is
+returned as one string so it can be written with a single call.
+
+"""
+import functools as _functools
+import re as _re
+import unicodedata as _unicodedata
+from typing import Iterable, List, Sequence, Tuple
+
+__all__ = ["ELLIPSIS", "width", "fit", "printable", "render"]
+
+ELLIPSIS = "\N{HORIZONTAL ELLIPSIS}"
+_NARROW = _re.compile(r"[\x20-\x7e]*")  # Printable ASCII is one cell per character
+_MIN_FLEXIBLE = 8
+
+
+@_functools.lru_cache(maxsize=4096)
+def _char_width(char: str) -> int:
+    if _unicodedata.combining(char) or _unicodedata.category(char) in (
+        "Mn",
+        "Me",
+        "Cf",
+    ):
+        return 0
+    return 2 if _unicodedata.east_asian_width(char) in ("W", "F") else 1
+
+
+def width(text: str) -> int:
+    """The number of terminal cells `text` takes"""
+    if _NARROW.fullmatch(text):
+        return len(text)
+    return sum(map(_char_width, text))
+
+
+def fit(text: str, limit: int) -> Tuple[str, int]:
+    """Ellipsize `text` to at most `limit` cells. Returns it and its width"""
+    used = width(text)
+    if used <= limit:
+        return text, used
+    if limit <= 0:
+        return "", 0
+    kept: List[str] = []
+    used = 0
+    for char in text:
+        char_width = _char_width(char)
+        if used + char_width > limit - 1:
+            break
+        kept.append(char)
+        used += char_width
+    return "".join(kept) + ELLIPSIS, used + 1
+
+
+def printable(text: str) -> str:
+    """`text` with control characters (e.g. newlines) escaped"""
+    return text if text.isprintable() else repr(text)[1:-1]
+
+
+def render(
+    rows: Iterable[Sequence[str]],
+    max_width: int,
+    flexible: int = 0,
+    styles: Sequence[str] = (),
+    reset: str = "",
+    prefix: str = "",
+) -> str:
+    """Render `rows` of cells as lines no wider than `max_width`
+
+    Parameters
+    ----------
+    rows : Iterable[Sequence[str]]
+        The cells of each row. Every row has the same number of cells.
+    max_width : int
+        The width of the terminal.
+    flexible : int, optional
+        The column that is shrunk (and its cells ellipsized) to fit. It is
+        never shrunk below 8 cells, so very narrow terminals still wrap.
+    styles : Sequence[str], optional
+        An escape sequence to start each column's cells with (e.g. a color).
+    reset : str, optional
+        The escape sequence ending a styled cell.
+    prefix : str, optional
+        Printed before every row.
+
+    Returns
+    -------
+    str
+        The lines of the table, each ending with a newline.
+
+    """
+    columns: List[Sequence[str]] = list(zip(*rows))
+    if not columns:
+        return ""
+    # Columns that are all ASCII (most of them) are measured with one match
+    cell_widths = [
+        list(map(len if _NARROW.fullmatch("".join(cells)) else width, cells))
+        for cells in columns
+    ]
+    widths = [max(column_widths) for column_widths in cell_widths]
+
+    # Columns are separated by two spaces; empty columns take no space
+    shown = [column for column, column_width in enumerate(widths) if column_width]
+    fixed = width(prefix) + sum(
+        widths[column] + 2 for column in shown if column != flexible
+    )
+    limit = max(max_width - fixed - 1, _MIN_FLEXIBLE)
+    if widths[flexible] > limit:
+        fitted = [
+            fit(cell, limit) if cell_width > limit else (cell, cell_width)
+            for cell, cell_width in zip(columns[flexible], cell_widths[flexible])
+        ]
+        columns[flexible] = [cell for cell, _ in fitted]
+        cell_widths[flexible] = [cell_width for _, cell_width in fitted]
+        widths[flexible] = limit
+
+    # Whole columns are styled and padded at once, then joined row by row
+    parts: List[Sequence[str]] = [[prefix] * len(columns[0])]
+    for column in shown:
+        cells = columns[column]
+        if column < len(styles) and styles[column]:
+            style = styles[column]
+            cells = [f"{style}{cell}{reset}" if cell else cell for cell in cells]
+        if column != shown[-1]:
+            padded = widths[column] + 2
+            cells = [
+                cell + " " * (padded - cell_width)
+                for cell, cell_width in zip(cells, cell_widths[column])
+            ]
+        parts.append(cells)
+    # Rows with empty trailing cells would otherwise end with spaces
+    return "\n".join(line.rstrip(" ") for line in map("".join, zip(*parts))) + "\n"
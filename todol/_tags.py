@@ -0,0 +1,148 @@
+"""Tags and priorities, and a bitset index to filter todos by them.
+
+Tags are stored in a todo's data as a list under ``tags`` and priorities
+as one of :py:data:`PRIORITIES` under ``priority``. :py:class:`TagIndex`
+maps every tag and priority to an ``int`` used as a bitset of the
+positions of the todos having it, so filters are evaluated with a few
+bitwise operations however many todos there are, and only the matching
+positions are ever visited. Building it takes a pass over every todo,
+though, so it only pays off when the same todos are filtered repeatedly;
+filtering once is a single pass of :py:func:`matches`.
+
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+__all__ = ["TAGS", "PRIORITY", "PRIORITIES", "tag", "matches", "TagIndex", "describe"]
+
+TAGS = "tags"
+PRIORITY = "priority"
+PRIORITIES = ("high", "medium", "low")
+
+
+def tag(text: str) -> str:
+    """Normalize the tag `text`
+
+    Raises
+    ------
+    ValueError
+        `text` is empty or contains whitespace.
+
+    """
+    normalized = text.strip().lstrip("#+").lower()
+    if not normalized or len(normalized.split()) != 1:
+        raise ValueError(f"Invalid tag {text!r}")
+    return normalized
+
+
+def matches(
+    data: Dict[str, Any],
+    tags: Sequence[str] = (),
+    excluded: Sequence[str] = (),
+    priorities: Sequence[str] = (),
+) -> bool:
+    """Whether the todo `data` has all of `tags`, none of `excluded` and any
+    of `priorities` (if given)"""
+    if priorities and data.get(PRIORITY) not in priorities:
+        return False
+    found = data.get(TAGS, ())
+    # Plain loops: the fewest steps for the few tags a todo has
+    for name in tags:
+        if name not in found:
+            return False
+    for name in excluded:
+        if name in found:
+            return False
+    return True
+
+
+class TagIndex:
+    """Bitsets of the positions of the todos with each tag and priority
+
+    Parameters
+    ----------
+    todos : Iterable
+        The data of each todo (or any objects with a ``data`` attribute
+        holding it), in order.
+
+    """
+
+    def __init__(self, todos: Iterable[Any]) -> None:
+        tagged: Dict[str, List[int]] = {}
+        prioritized: Dict[str, List[int]] = {}
+        size = 0
+        for position, todo in enumerate(todos):
+            data = getattr(todo, "data", todo)
+            for name in data.get(TAGS, ()):
+                tagged.setdefault(name, []).append(position)
+            priority = data.get(PRIORITY)
+            if priority is not None:
+                prioritized.setdefault(priority, []).append(position)
+            size = position + 1
+        self.size = size
+        self._all = (1 << size) - 1
+        self._tags = {name: self._bitset(found) for name, found in tagged.items()}
+        self._priorities = {
+            name: self._bitset(found) for name, found in prioritized.items()
+        }
+
+    def _bitset(self, positions: List[int]) -> int:
+        # Setting bits of an int one by one would copy it every time
+        bits = bytearray(self.size // 8 + 1)
+        for position in positions:
+            bits[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(bits, "little")
+
+    def tags(self) -> List[str]:
+        """Every tag in use, sorted"""
+        return sorted(self._tags)
+
+    def select(
+        self,
+        tags: Sequence[str] = (),
+        excluded: Sequence[str] = (),
+        priorities: Sequence[str] = (),
+    ) -> int:
+        """The bitset of the todos with all of `tags`, none of `excluded`
+        and any of `priorities` (if given)"""
+        mask = self._all
+        for name in tags:
+            mask &= self._tags.get(name, 0)
+        for name in excluded:
+            mask &= ~self._tags.get(name, 0)
+        if priorities:
+            wanted = 0
+            for priority in priorities:
+                wanted |= self._priorities.get(priority, 0)
+            mask &= wanted
+        return mask
+
+    @staticmethod
+    def positions(mask: int) -> Iterator[int]:
+        """The positions set in the bitset `mask`, in increasing order"""
+        bits = bin(mask)[:1:-1]  # Least significant bit first
+        position = bits.find("1")
+        while position >= 0:
+            yield position
+            position = bits.find("1", position + 1)
+
+    def filter(
+        self,
+        todos: Sequence[Any],
+        tags: Sequence[str] = (),
+        excluded: Sequence[str] = (),
+        priorities: Sequence[str] = (),
+    ) -> List[Any]:
+        """The todos of `todos` (which this index was built from) matching
+        :py:meth:`select`"""
+        return [
+            todos[position]
+            for position in self.positions(self.select(tags, excluded, priorities))
+        ]
+
+
+def describe(data: Dict[str, Any]) -> Optional[str]:
+    """A short description of the priority and tags of a todo, if any"""
+    words = [f"#{name}" for name in data.get(TAGS, ())]
+    if data.get(PRIORITY):
+        words.insert(0, f"({data[PRIORITY]})")
+    return " ".join(words) or None
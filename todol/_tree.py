@@ -0,0 +1,83 @@
+"""Subtasks, and an adjacency index to walk them as trees.
+
+A todo becomes a subtask by naming its parent under ``parent`` in its data.
+:py:class:`TreeIndex` maps every todo to the positions of its children in
+a single pass, so a subtree is then visited in time proportional to its
+size, however long the list is. Todos whose parent isn't in the list (e.g.
+it was finished on its own) are roots, and so are the todos of a cycle.
+
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+__all__ = ["PARENT", "TreeIndex"]
+
+PARENT = "parent"
+
+
+class TreeIndex:
+    """The children of every todo, by position
+
+    Parameters
+    ----------
+    todos : Iterable
+        The data of each todo (or any objects with a ``data`` attribute
+        holding it), in order.
+
+    """
+
+    def __init__(self, todos: Iterable[Any]) -> None:
+        positions: Dict[str, int] = {}
+        parents: List[Optional[str]] = []
+        for position, todo in enumerate(todos):
+            data = getattr(todo, "data", todo)
+            positions.setdefault(data["todo"], position)  # The first of a name
+            parents.append(data.get(PARENT))
+        self.size = len(parents)
+        self._children: List[List[int]] = [[] for _ in parents]
+        self._roots: List[int] = []
+        for position, parent in enumerate(parents):
+            found = positions.get(parent) if parent is not None else None
+            if found is None or found == position:
+                self._roots.append(position)
+            else:
+                self._children[found].append(position)
+
+    def children(self, position: int) -> List[int]:
+        """The positions of the children of the todo at `position`, in order"""
+        return self._children[position]
+
+    def walk(self, start: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """Walk the subtree at `start` (or every tree) depth first
+
+        Yields
+        ------
+        Tuple[int, int]
+            The depth (0 for `start` or the roots) and position of every
+            todo, parents before their children.
+
+        """
+        seen: Set[int] = set()
+        starts = [start] if start is not None else self._roots
+        for root in starts:
+            yield from self._walk(root, seen)
+        if start is None:
+            # Todos in cycles have no root; each cycle is shown from its first
+            for position in range(self.size):
+                if position not in seen:
+                    yield from self._walk(position, seen)
+
+    def _walk(self, root: int, seen: Set[int]) -> Iterator[Tuple[int, int]]:
+        stack = [(0, root)]
+        while stack:
+            depth, position = stack.pop()
+            if position in seen:
+                continue
+            seen.add(position)
+            yield depth, position
+            stack.extend(
+                (depth + 1, child) for child in reversed(self._children[position])
+            )
+
+    def subtree(self, position: int) -> List[int]:
+        """The positions of the todo at `position` and all its descendants"""
+        return [found for _, found in self.walk(position)]
@@ -0,0 +1,365 @@
+"""An asyncio API to todol, for embedding it in async services.
+
+:py:class:`Store` adds, finishes and removes todos without blocking the
+event loop: the index is read and written in an executor. Mutations are
+queued, and every mutation queued during a loop tick (or while the
+previous write was in progress) is applied in order to a single read of
+the index and saved with a single write, journaled as one entry so that
+``todol undo`` reverts them together. Hundreds of concurrent requests thus
+cost a handful of writes, and each of them resumes with its own result
+(or exception) once its batch is written::
+
+    async with Store() as store:
+        await store.add("buy milk", tags=["errands"])
+        await store.finish("buy milk")
+        async for todo in store:
+            print(todo.name, todo.due_date)
+
+Writes take the same lock as the command line, so both can use the same
+index at once.
+
+"""
+import asyncio as _asyncio
+import datetime as _datetime
+import os as _os
+import warnings as _warnings
+from concurrent.futures import Executor
+from pathlib import Path as _Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from . import _journal, _plugins, _recurrence, _stats, _store, _tags, _tree, _utils
+from .todo_objects import Todo, TodoContainer
+
+__all__ = ["Store"]
+
+Target = Union[str, Callable[[Todo], bool]]
+
+
+class _Batch:
+    """The todos a batch of mutations is applied to, read once"""
+
+    def __init__(self, todos: _store.TodoData) -> None:
+        self.todos = TodoContainer(todos["todos"])
+        self.finished = todos["finished"]
+        self.changes: List[_store.Change] = []
+        self.hooks: List[Tuple[str, Dict[str, str]]] = []
+
+    def pop(self, target: Target) -> List[Todo]:
+        """Pop the todo named `target` with its subtasks, or every todo it matches"""
+        if isinstance(target, str):
+            return self.todos.pop_subtree({"todo": target, "due_date": _utils.today()})
+        popped = self.todos.pop_matching(target)
+        if not popped:
+            raise IndexError("No todos matched!")
+        return popped
+
+    def dumps(self) -> _store.TodoData:
+        return {"todos": _utils.deserialize(self.todos), "finished": self.finished}
+
+
+Mutation = Callable[[_Batch], Any]
+Pending = Tuple[str, Mutation, "_asyncio.Future[Any]"]
+
+
+class Store:
+    """The todos of a todol list, for use from coroutines
+
+    Parameters
+    ----------
+    config_dir : Union[str, Path], optional
+        The todol directory. Defaults to ``TODOL_CONFIG_DIR`` or
+        ``~/.config/todol``.
+    list_name : str, optional
+        The named list to use. Defaults to the default list.
+    executor : Executor, optional
+        Where the index is read and written. Defaults to the default
+        executor of the event loop.
+
+    Raises
+    ------
+    ValueError
+        The list name or the store format is invalid.
+
+    """
+
+    def __init__(
+        self,
+        config_dir: Optional[Union[str, _Path]] = None,
+        list_name: str = "",
+        *,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        todol_dir = _Path(
+            config_dir or _os.environ.get("TODOL_CONFIG_DIR", "~/.config/todol")
+        ).expanduser()
+        self.index_path = _store.index_path(todol_dir, list_name=list_name)
+        self._executor = executor
+        self._pending: List[Pending] = []
+        self._flushing: Optional["_asyncio.Future[None]"] = None
+
+    def __repr__(self) -> str:
+        return f"Store({str(self.index_path)!r})"
+
+    async def __aenter__(self) -> "Store":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.flush()
+
+    def __aiter__(self) -> AsyncIterator[Todo]:
+        return self.iterate()
+
+    async def add(
+        self,
+        name: str,
+        due_date: Optional[Union[str, _datetime.date]] = None,
+        *,
+        tags: Sequence[str] = (),
+        priority: Optional[str] = None,
+        every: Optional[str] = None,
+        parent: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """Add a todo, like ``todol add``
+
+        Parameters
+        ----------
+        name : str
+            The todo.
+        due_date : Union[str, datetime.date], optional
+            When it is due, as a date or in ISO 8601 format. Defaults to
+            tomorrow.
+        tags : Sequence[str], optional
+            Its tags.
+        priority : str, optional
+            One of :py:data:`todol._tags.PRIORITIES`.
+        every : str, optional
+            Make it recur, e.g. every ``1d``, ``2w`` or ``weekly``.
+        parent : str, optional
+            Make it a subtask of this todo. Will be fuzzy matched.
+
+        Returns
+        -------
+        Dict[str, str]
+            The data of the todo added.
+
+        Raises
+        ------
+        ValueError
+            One of the arguments is invalid.
+        IndexError
+            The parent todo could not be found.
+
+        """
+        if isinstance(due_date, str):
+            due_date = _utils.iso_str_to_datetime(due_date)
+        new_todo = {
+            "todo": _utils.sim_str(name),
+            "due_date": str(due_date or _utils.tomorrow()),
+        }
+        if every is not None:
+            new_todo[_recurrence.KEY] = _recurrence.rule(every)
+        if tags:
+            new_todo[_tags.TAGS] = list(dict.fromkeys(map(_tags.tag, tags)))
+        if priority is not None:
+            if priority not in _tags.PRIORITIES:
+                raise ValueError(
+                    f"Invalid priority {priority!r} "
+                    f"(choose from {', '.join(_tags.PRIORITIES)})"
+                )
+            new_todo[_tags.PRIORITY] = priority
+
+        def mutation(batch: _Batch) -> Dict[str, str]:
+            data = dict(new_todo)
+            if parent is not None:
+                found = batch.todos.get(parent)
+                if found is None:
+                    raise IndexError("Could not find the parent todo!")
+                data[_tree.PARENT] = found.name
+            batch.todos.add_todo(data)
+            batch.changes.append(("add", "todos", data))
+            batch.hooks.append(("on_add", data))
+            return data
+
+        return await self._submit("add", mutation)  # type: ignore
+
+    async def finish(self, todo: Target) -> List[Dict[str, str]]:
+        """Finish a todo with its subtasks, like ``todol finish``
+
+        Recurring todos move on to their next occurrence instead.
+
+        Parameters
+        ----------
+        todo : Union[str, Callable[[Todo], bool]]
+            The todo to finish (fuzzy matched), or a predicate (such as a
+            :py:class:`todol._select.Selector`) every todo to finish matches.
+
+        Returns
+        -------
+        List[Dict[str, str]]
+            The data of the todos finished.
+
+        Raises
+        ------
+        IndexError
+            The todo does not exist, or no todo matched.
+
+        """
+
+        def mutation(batch: _Batch) -> List[Dict[str, str]]:
+            popped = batch.pop(todo)
+            for finished in popped:
+                batch.changes.append(("remove", "todos", finished.data))
+                batch.hooks.append(("on_finish", finished.data))
+                if finished.every is not None:
+                    advanced = dict(
+                        finished.data,
+                        due_date=str(
+                            _recurrence.advance(finished.due_date, finished.every)
+                        ),
+                    )
+                    batch.todos.add_todo(advanced)
+                    batch.changes.append(("add", "todos", advanced))
+                    continue
+                record = dict(
+                    finished.data, **{_stats.FINISHED_ON: str(_utils.today())}
+                )
+                batch.finished.append(record)
+                batch.changes.append(("add", "finished", record))
+            return [finished.data for finished in popped]
+
+        return await self._submit("finish", mutation)  # type: ignore
+
+    async def remove(self, todo: Target) -> List[Dict[str, str]]:
+        """Remove a todo with its subtasks without finishing it, like ``todol remove``
+
+        Parameters
+        ----------
+        todo : Union[str, Callable[[Todo], bool]]
+            The todo to remove (fuzzy matched), or a predicate every todo to
+            remove matches.
+
+        Returns
+        -------
+        List[Dict[str, str]]
+            The data of the todos removed.
+
+        Raises
+        ------
+        IndexError
+            The todo does not exist, or no todo matched.
+
+        """
+
+        def mutation(batch: _Batch) -> List[Dict[str, str]]:
+            removed = batch.pop(todo)
+            batch.changes.extend(("remove", "todos", item.data) for item in removed)
+            return [item.data for item in removed]
+
+        return await self._submit("remove", mutation)  # type: ignore
+
+    async def read(self) -> Dict[str, TodoContainer]:
+        """The todos of every section, once the pending mutations are written"""
+        await self.flush()
+        loop = _asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, self._read)
+
+    async def iterate(self, section: str = "todos") -> AsyncIterator[Todo]:
+        """Iterate over the todos of `section` (``todos`` or ``finished``)
+
+        The pending mutations are written first.
+        """
+        for todo in (await self.read())[section]:
+            yield todo
+
+    async def flush(self) -> None:
+        """Wait until every mutation queued so far is written"""
+        if self._flushing is not None and not self._flushing.done():
+            # Shielded: a cancelled caller must not cancel the others' write
+            await _asyncio.shield(self._flushing)
+
+    def _submit(self, command: str, mutation: Mutation) -> "_asyncio.Future[Any]":
+        loop = _asyncio.get_event_loop()
+        future = loop.create_future()
+        self._pending.append((command, mutation, future))
+        if self._flushing is None or self._flushing.done():
+            # Starts once the coroutines ready in this tick have queued theirs
+            self._flushing = loop.create_task(self._flush_pending())
+        return future
+
+    async def _flush_pending(self) -> None:
+        loop = _asyncio.get_event_loop()
+        # Whatever is queued while a batch is written goes in the next one
+        while self._pending:
+            batch = [pending for pending in self._pending if not pending[2].done()]
+            self._pending = []
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(self._executor, self._apply, batch)
+            except Exception as exception:  # pylint: disable=broad-except
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(exception)
+                continue
+            for (_, _, future), (error, result) in zip(batch, results):
+                if future.done():  # Cancelled while written
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _read(self) -> Dict[str, TodoContainer]:
+        try:
+            return _store.read_containers(self.index_path)
+        except OSError:  # It doesn't exist yet
+            return {section: TodoContainer([]) for section in _store.SECTIONS}
+
+    def _apply(self, pending: List[Pending]) -> List[Tuple[Optional[Exception], Any]]:
+        """Apply the `pending` mutations in a single write, in the executor
+
+        Returns
+        -------
+        List[Tuple[Optional[Exception], Any]]
+            The exception raised by each mutation (which then changed
+            nothing), or None and its result.
+
+        """
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        results: List[Tuple[Optional[Exception], Any]] = []
+        commands: Dict[str, None] = {}
+        with _store.lock(self.index_path):
+            try:
+                todos = _store.read(self.index_path)
+            except OSError:  # It doesn't exist yet
+                todos = _store.empty()
+            batch = _Batch(todos)
+            for command, mutation, _ in pending:
+                try:
+                    results.append((None, mutation(batch)))
+                except (IndexError, ValueError) as exception:
+                    results.append((exception, None))
+                    continue
+                commands[command] = None
+            if batch.changes:
+                previous = _journal.stamp(self.index_path)
+                _store.write(self.index_path, batch.dumps(), batch.changes)
+                _journal.record(
+                    self.index_path, ", ".join(commands), batch.changes, previous
+                )
+        for hook, data in batch.hooks:
+            for name, exception in _plugins.fire(hook, data):
+                _warnings.warn(
+                    f"Plugin {name!r} failed on {hook}: {exception}", RuntimeWarning
+                )
+        return results
@@ -1,9 +1,20 @@
 """Abstract object repsentations of a todo."""
 
 import datetime
-from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
-
-from . import _utils
+import itertools
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from . import _metrics, _parallel, _recurrence, _tags, _tree, _utils
 
 
 class Todo(_utils.Deserializable):  # TODO: Add a delay method
@@ -15,6 +26,20 @@ class Todo(_utils.Deserializable):  # TODO: Add a delay method
         self._due_date = _utils.iso_str_to_datetime(str(todo_data["due_date"]))
         self._id = todo_data.get("id", "unknown")
 
+    @classmethod
+    def _from_parts(cls, todo_data: Dict[str, str], due_date: datetime.date) -> "Todo":
+        """Create a todo whose due date has already been parsed.
+
+        Used by loaders (e.g. binary snapshots) that can skip
+        per-item ISO 8601 parsing.
+        """
+        todo = cls.__new__(cls)
+        todo._internal_data = todo_data
+        todo._todo_name = todo_data["todo"]
+        todo._due_date = due_date
+        todo._id = todo_data.get("id", "unknown")
+        return todo
+
     def __str__(self) -> str:
         return f"{self._todo_name}, due at {self._due_date}"
 
@@ -61,6 +86,35 @@ class Todo(_utils.Deserializable):  # TODO: Add a delay method
         """The date when the todo is due"""
         return self._due_date
 
+    @property
+    def tags(self) -> List[str]:
+        """The tags of the todo"""
+        return self._internal_data.get(_tags.TAGS, [])  # type: ignore
+
+    @property
+    def priority(self) -> Optional[str]:
+        """The priority of the todo, if it has one"""
+        return self._internal_data.get(_tags.PRIORITY)
+
+    @property
+    def parent(self) -> Optional[str]:
+        """The name of the todo this is a subtask of, if it is one"""
+        return self._internal_data.get(_tree.PARENT)
+
+    @property
+    def every(self) -> Optional[str]:
+        """The recurrence rule of the todo, if it recurs"""
+        return self._internal_data.get(_recurrence.KEY)
+
+    def occurrences(self) -> Iterator[datetime.date]:
+        """Lazily generate the dates the todo is due at, starting with :py:attr:`due_date`
+
+        Infinite for recurring todos. Otherwise, only yields the due date.
+        """
+        if self.every is None:
+            return iter((self._due_date,))
+        return _recurrence.occurrences(self._due_date, self.every)
+
     @due_date.setter
     def due_date(self, new_value: Union[datetime.date, str]) -> None:
         try:
@@ -86,11 +140,13 @@ class Todo(_utils.Deserializable):  # TODO: Add a delay method
 class TodoContainer(_utils.Deserializable):
     """A list-like container for todos"""
 
-    def __init__(self, todos: Iterable[Dict[str, str]]):
-        self._todos: List[Todo] = [Todo(item) for item in todos]
-        self._indexed_todos: Dict[Tuple[str, datetime.date], Todo] = {
-            (todo.name, todo.due_date): todo for todo in self._todos
-        }
+    def __init__(self, todos: Iterable[Union[Dict[str, str], Todo]]):
+        self._todos: List[Todo] = [
+            item if isinstance(item, Todo) else Todo(item) for item in todos
+        ]
+        self._lookup: Optional[Dict[Tuple[str, datetime.date], Todo]] = None
+        self._tag_index: Optional[_tags.TagIndex] = None
+        self._tree_index: Optional[_tree.TreeIndex] = None
 
     def __repr__(self) -> str:
         return f"TodoContainer({self._todos})"
@@ -116,6 +172,7 @@ class TodoContainer(_utils.Deserializable):
 
     def pop(self, index: int = -1) -> Todo:
         """The pop method similar to :py:obj:`list`"""
+        self._changed()
         return self._todos.pop(index)
 
     def pop_thing(self, thing: Union[Dict[str, str], Todo]) -> Todo:
@@ -137,6 +194,7 @@ class TodoContainer(_utils.Deserializable):
             The todo does not exist or could not be found.
 
         """
+        self._changed()
         try:
             return self._todos.pop(
                 self._todos.index(
@@ -150,8 +208,112 @@ class TodoContainer(_utils.Deserializable):
 
     def remove(self, thing: Todo) -> None:
         """The remove method similar to :py:obj:`list`"""
+        self._changed()
         self._todos.remove(thing)
 
+    def _changed(self) -> None:
+        """Drop the indexes of the todos, which are rebuilt when next needed"""
+        self._lookup = None
+        self._tag_index = None
+        self._tree_index = None
+
+    @property
+    def _indexed_todos(self) -> Dict[Tuple[str, datetime.date], Todo]:
+        """The todos by name and due date, searched by :py:meth:`get`"""
+        if self._lookup is None:
+            self._lookup = {(todo.name, todo.due_date): todo for todo in self._todos}
+        return self._lookup
+
+    @property
+    def tag_index(self) -> _tags.TagIndex:
+        """The bitset index of the tags and priorities of the todos
+
+        Built when first needed, and again after the container changes.
+        """
+        if self._tag_index is None:
+            self._tag_index = _tags.TagIndex(self._todos)
+        return self._tag_index
+
+    def filter(
+        self,
+        tags: Sequence[str] = (),
+        excluded: Sequence[str] = (),
+        priorities: Sequence[str] = (),
+    ) -> List[Todo]:
+        """The todos with all of `tags`, none of `excluded` and any of `priorities`"""
+        return self.tag_index.filter(self._todos, tags, excluded, priorities)
+
+    @property
+    def tree_index(self) -> _tree.TreeIndex:
+        """The adjacency index of the subtasks of the todos
+
+        Built when first needed, and again after the container changes.
+        """
+        if self._tree_index is None:
+            self._tree_index = _tree.TreeIndex(self._todos)
+        return self._tree_index
+
+    def tree(self) -> Iterator[Tuple[int, Todo]]:
+        """Every todo with its depth, parents followed by their subtasks"""
+        for depth, position in self.tree_index.walk():
+            yield depth, self._todos[position]
+
+    def subtree(self, thing: Todo) -> List[Todo]:
+        """`thing` (which must be in the container) and all its subtasks"""
+        return [
+            self._todos[position]
+            for position in self.tree_index.subtree(self._todos.index(thing))
+        ]
+
+    def pop_subtree(self, thing: Union[Dict[str, str], Todo]) -> List[Todo]:
+        """Find and pop a todo along with all its subtasks
+
+        Only the todos of the subtree are visited once the todo is found.
+
+        Returns
+        -------
+        List[Todo]
+            The todo popped, followed by its subtasks, parents first.
+
+        Raises
+        ------
+        IndexError
+            The todo does not exist or could not be found.
+
+        """
+        try:
+            position = self._todos.index(
+                self.get(  # type: ignore
+                    thing.name if isinstance(thing, Todo) else Todo(thing).name
+                )
+            )
+        except ValueError as exception:
+            raise IndexError("That todo doesn't exist!") from exception
+        positions = self.tree_index.subtree(position)
+        popped = [self._todos[found] for found in positions]
+        for found in sorted(positions, reverse=True):
+            del self._todos[found]
+        self._changed()
+        return popped
+
+    def pop_matching(self, predicate: Callable[[Todo], bool]) -> List[Todo]:
+        """Pop every todo `predicate` is true for, in a single pass
+
+        Returns
+        -------
+        List[Todo]
+            The todos popped, in order.
+
+        """
+        kept: List[Todo] = []
+        popped: List[Todo] = []
+        for todo in self._todos:
+            (popped if predicate(todo) else kept).append(todo)
+        if popped:
+            self._todos = kept
+            self._changed()
+        return popped
+
     def get(
         self, todo_name_or_dict: Union[str, Todo, Dict[str, str]], fuzzy_limit: int = 5
     ) -> Optional[Todo]:
@@ -171,18 +333,63 @@ class TodoContainer(_utils.Deserializable):
                     "Invalid dictionary structure for `todo_name_or_dict`"
                 ) from exception
 
-        for metadata, todo in self._indexed_todos.items():
-            if (
-                isinstance(todo_name_or_dict, (Todo, dict))
-                and todo_name_or_dict == todo
-            ):
-                return todo
-            # By fuzzy matching
-            if _utils.fuzzy_match(metadata[0], todo_name, limit=fuzzy_limit):
-                return todo
+        if _parallel.enabled(len(self._indexed_todos)):
+            return self._get_parallel(todo_name_or_dict, todo_name, fuzzy_limit)
+
+        comparisons = pruned = 0
+        try:
+            for metadata, todo in self._indexed_todos.items():
+                if (
+                    isinstance(todo_name_or_dict, (Todo, dict))
+                    and todo_name_or_dict == todo
+                ):
+                    return todo
+                # Names whose lengths differ by more than the limit can't match
+                if abs(len(metadata[0]) - len(todo_name)) > fuzzy_limit >= 0:
+                    pruned += 1
+                    continue
+                # By fuzzy matching
+                comparisons += 1
+                if _utils.fuzzy_match(metadata[0], todo_name, limit=fuzzy_limit):
+                    return todo
+        finally:
+            _metrics.incr("fuzzy.comparisons", comparisons)
+            _metrics.incr("fuzzy.pruned", pruned)
 
         return None
 
+    def _get_parallel(
+        self,
+        todo_name_or_dict: Union[str, Todo, Dict[str, str]],
+        todo_name: str,
+        fuzzy_limit: int,
+    ) -> Optional[Todo]:
+        """:py:meth:`get`, with the fuzzy matching spread across processes"""
+        todos = list(self._indexed_todos.values())
+        # Equal todos are found here; the first of them bounds the fuzzy scan
+        exact = len(todos)
+        if isinstance(todo_name_or_dict, (Todo, dict)):
+            exact = next(
+                (
+                    position
+                    for position, todo in enumerate(todos)
+                    if todo_name_or_dict == todo
+                ),
+                exact,
+            )
+        position, comparisons, pruned = _parallel.first_match(
+            [name for name, _ in itertools.islice(self._indexed_todos, exact)],
+            todo_name,
+            fuzzy_limit,
+        )
+        _metrics.incr("fuzzy.comparisons", comparisons)
+        _metrics.incr("fuzzy.pruned", pruned)
+        _metrics.incr("fuzzy.parallel_scans")
+        if position >= 0:
+            return todos[position]
+        return todos[exact] if exact < len(todos) else None
+
     def add_todo(self, todo: Union[Dict[str, str], Todo]) -> None:
         """Adds a todo to the list of todos. Return the todo if it exists"""
+        self._changed()
         self._todos.append(todo if isinstance(todo, Todo) else Todo(todo))